@@ -0,0 +1,296 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import Dataset_Output
+import Instrumentation
+import Shard_Pool
+
+# Cross-generator benchmark and profiling harness.
+#
+# Every generator is driven through its importable functions as a pipeline
+# of named phases (generation, DataFrame build, type conversion, sort,
+# write), each fed the previous phase's result, for a sweep of row counts.
+# Each (target, rows) case runs in a fresh spawned process so its peak RSS
+# is its own high-water mark rather than the largest case's so far. Runs
+# are appended to a JSON history, and every case is compared with the
+# same case in the previous run to flag regressions.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_HISTORY = 'benchmark_history.json'
+DEFAULT_TOLERANCE = 0.15 # fractional slowdown flagged as a regression
+ROW_PATH_LIMIT = 100_000 # the row-by-row fraud generator is skipped above this
+MIN_COMPARE_SECONDS = 0.05 # phases faster than this are too noisy to compare
+
+def _script(file_name):
+    return Shard_Pool.load_script(os.path.join(SCRIPT_DIR, file_name))
+
+def _categories(columns):
+    """Fresh copy of a script's CATEGORICAL_COLUMNS (encode_categoricals extends the lists)."""
+    return {column: list(values) for column, values in columns.items()}
+
+def _write(categorical_columns, path, file_format, row_group_size, compression):
+    return lambda df: Dataset_Output.write_frame(df, path, file_format, categorical_columns,
+                                                 row_group_size, compression)
+
+# --- Targets ---
+# Each returns [(phase, function of the previous phase's result), ...]
+
+def fraud_phases(rows, path, file_format, row_group_size, compression):
+    fraud = _script('Fraud_DataSet.py')
+    # Pools come from the on-disk cache before timing starts; fraud_identity_pools times building them
+    pools = fraud.load_identity_pools(min(fraud.IDENTITY_POOL_SIZE, rows))
+    return [
+        ('generation', lambda _: fraud.generate_fraud_dataset_batch(rows, pools=pools)),
+        ('type conversion', lambda df: Dataset_Output.encode_categoricals(df, _categories(fraud.CATEGORICAL_COLUMNS))),
+        ('write', _write(fraud.CATEGORICAL_COLUMNS, path, file_format, row_group_size, compression)),
+    ]
+
+def fraud_identity_pools_phases(rows, path, file_format, row_group_size, compression):
+    fraud = _script('Fraud_DataSet.py')
+    return [('identity pools', lambda _: fraud.build_identity_pools(min(fraud.IDENTITY_POOL_SIZE, rows)))]
+
+def fraud_row_path_phases(rows, path, file_format, row_group_size, compression):
+    fraud = _script('Fraud_DataSet.py')
+    pools = fraud.load_identity_pools(min(fraud.IDENTITY_POOL_SIZE, rows))
+    return [
+        ('generation', lambda _: fraud.generate_fraud_dataset(rows, pools=pools)),
+        ('type conversion', lambda df: Dataset_Output.encode_categoricals(df, _categories(fraud.CATEGORICAL_COLUMNS))),
+        ('write', _write(fraud.CATEGORICAL_COLUMNS, path, file_format, row_group_size, compression)),
+    ]
+
+def pax8_phases(rows, path, file_format, row_group_size, compression):
+    pax8 = _script('Pax8_Sample.py')
+    return [
+        ('generation', lambda _: pax8.generate_subscription_facts(0, rows)),
+        ('DataFrame build', pax8.facts_to_wide),
+        ('type conversion', lambda df: Dataset_Output.encode_categoricals(df, _categories(pax8.CATEGORICAL_COLUMNS))),
+        ('write', _write(pax8.CATEGORICAL_COLUMNS, path, file_format, row_group_size, compression)),
+    ]
+
+def platform_phases(rows, path, file_format, row_group_size, compression):
+    fleet = _script('Platform_Science.py')
+    return [
+        ('generation', lambda _: fleet.generate_telematics_data(0, rows)),
+        ('type conversion', lambda df: Dataset_Output.encode_categoricals(df, _categories(fleet.CATEGORICAL_COLUMNS))),
+        ('write', _write(fleet.CATEGORICAL_COLUMNS, path, file_format, row_group_size, compression)),
+    ]
+
+def circle_phases(rows, path, file_format, row_group_size, compression):
+    circle = _script('Senior Data Analyst - Circle.py')
+    return [
+        ('generation', lambda _: circle.generate_circle_events(0, rows, num_users=max(rows // 50, 1))),
+        ('sort', circle.finalize_circle_dataset),
+        ('type conversion', lambda df: Dataset_Output.encode_categoricals(df, _categories(circle.CATEGORICAL_COLUMNS))),
+        ('write', _write(circle.CATEGORICAL_COLUMNS, path, file_format, row_group_size, compression)),
+    ]
+
+def fizzbuzz_phases(rows, path, file_format, row_group_size, compression):
+    fizzbuzz = _script('FizzBuzz.py')
+
+    def write_lines(lines):
+        with open(path, 'w') as handle:
+            handle.write('\n'.join(lines) + '\n')
+    return [
+        ('generation', lambda _: fizzbuzz.fizzbuzz_lines(1, rows + 1)),
+        ('write', write_lines),
+    ]
+
+def fizzbuzz_engine_phases(rows, path, file_format, row_group_size, compression):
+    fizzbuzz = _script('FizzBuzz.py')
+    # Chunks are built while they are written, so this is one phase
+    return [('write', lambda _: fizzbuzz.write_fizzbuzz(path, 1, rows + 1))]
+
+TARGETS = {
+    'fraud': fraud_phases,
+    'fraud_identity_pools': fraud_identity_pools_phases,
+    'fraud_row_path': fraud_row_path_phases,
+    'pax8': pax8_phases,
+    'platform': platform_phases,
+    'circle': circle_phases,
+    'fizzbuzz': fizzbuzz_phases,
+    'fizzbuzz_engine': fizzbuzz_engine_phases,
+}
+PHASES = ['identity pools', 'generation', 'DataFrame build', 'type conversion', 'sort', 'write']
+ROW_LIMITS = {'fraud_row_path': ROW_PATH_LIMIT}
+TEXT_TARGETS = {'fizzbuzz', 'fizzbuzz_engine'} # write plain text whatever the --format
+
+# --- Measurement ---
+
+def peak_rss_mb():
+    """This process's peak resident set size in MB (None where resource is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_case(target, rows, output_dir, file_format='csv', row_group_size=Dataset_Output.DEFAULT_ROW_GROUP_SIZE,
+             compression=Dataset_Output.DEFAULT_COMPRESSION):
+    """Run one target's phases for rows rows and return its timings and memory.
+
+    Meant to run in a fresh process: peak_rss_mb is a process high-water
+    mark, and baseline_rss_mb is that mark once the script is imported.
+    spans holds the total seconds of each instrumented stage inside the
+    phases (see Instrumentation).
+    """
+    extension = '.txt' if target in TEXT_TARGETS else Dataset_Output.FORMAT_EXTENSIONS[file_format]
+    path = os.path.join(output_dir, f'{target}_{rows}{extension}')
+    phases = TARGETS[target](rows, path, file_format, row_group_size, compression)
+    baseline = peak_rss_mb()
+
+    timings = {}
+    result = None
+    Instrumentation.enable()
+    for phase, function in phases:
+        started = time.perf_counter()
+        result = function(result)
+        timings[phase] = round(time.perf_counter() - started, 4)
+    Instrumentation.disable()
+    total = sum(timings.values())
+    output_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+    if os.path.exists(path):
+        os.remove(path)
+    return {
+        'target': target, 'rows': rows, 'format': 'text' if target in TEXT_TARGETS else file_format,
+        'seconds': round(total, 4), 'rows_per_sec': round(rows / total) if total else None,
+        'phases': timings, 'output_mb': round(output_bytes / 1e6, 2),
+        'baseline_rss_mb': baseline, 'peak_rss_mb': peak_rss_mb(),
+        'spans': {row['span']: row['total_s'] for row in Instrumentation.summary()},
+    }
+
+def run_isolated(target, rows, output_dir, *options):
+    """run_case in a freshly spawned process, so each case reports its own peak RSS."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(Shard_Pool.call_script, os.path.abspath(__file__), 'run_case',
+                               target, rows, output_dir, *options).result()
+
+def run_suite(targets=tuple(TARGETS), sizes=DEFAULT_SIZES, file_format='csv', repeat=1, isolate=True,
+              row_group_size=Dataset_Output.DEFAULT_ROW_GROUP_SIZE, compression=Dataset_Output.DEFAULT_COMPRESSION):
+    """Benchmark every target at every size; keeps the fastest of repeat runs per case."""
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for target in targets:
+            for rows in sizes:
+                if rows > ROW_LIMITS.get(target, rows):
+                    continue
+                runs = []
+                for _ in range(repeat):
+                    options = (target, rows, output_dir, file_format, row_group_size, compression)
+                    runs.append(run_isolated(*options) if isolate else run_case(*options))
+                best = min(runs, key=lambda run: run['seconds'])
+                best['peak_rss_mb'] = max((run['peak_rss_mb'] for run in runs if run['peak_rss_mb'] is not None),
+                                          default=None)
+                results.append(best)
+                print(f"{target:>16} {rows:>12,} rows  {best['seconds']:>9.3f}s  "
+                      f"{best['rows_per_sec'] or 0:>12,} rows/s  peak {best['peak_rss_mb']} MB", flush=True)
+    return results
+
+# --- History ---
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_metadata():
+    """Where and on what a run was measured."""
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def load_history(path=DEFAULT_HISTORY):
+    """Previous runs, oldest first ([] if the file does not exist yet)."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as handle:
+        return json.load(handle)
+
+def append_history(run, path=DEFAULT_HISTORY):
+    """Add a run to the JSON history file."""
+    history = load_history(path)
+    history.append(run)
+    with open(path, 'w') as handle:
+        json.dump(history, handle, indent=1)
+    return history
+
+def find_regressions(results, previous, tolerance=DEFAULT_TOLERANCE, min_seconds=MIN_COMPARE_SECONDS):
+    """Cases and phases more than tolerance slower than the same case in a previous run's results.
+
+    Timings that took under min_seconds before are skipped as noise.
+    """
+    baseline = {(case['target'], case['rows'], case['format']): case for case in previous}
+    regressions = []
+    for case in results:
+        before = baseline.get((case['target'], case['rows'], case['format']))
+        if before is None:
+            continue
+        for phase, seconds in [('total', case['seconds'])] + list(case['phases'].items()):
+            old = before['seconds'] if phase == 'total' else before['phases'].get(phase)
+            if old and old >= min_seconds and seconds > old * (1 + tolerance):
+                regressions.append({'target': case['target'], 'rows': case['rows'], 'phase': phase,
+                                    'before_s': old, 'after_s': seconds,
+                                    'slowdown': f"{seconds / old - 1:+.0%}"})
+    return regressions
+
+def results_table(results):
+    """One row per case with a column per phase (seconds), in pipeline order."""
+    table = pd.DataFrame([{'target': case['target'], 'rows': case['rows'], 'format': case['format'],
+                           'rows_per_sec': case['rows_per_sec'], 'peak_rss_mb': case['peak_rss_mb'],
+                           **case['phases'], 'total_s': case['seconds']} for case in results])
+    phases = [phase for phase in PHASES if phase in table.columns]
+    return table[['target', 'rows', 'format', 'rows_per_sec', 'peak_rss_mb'] + phases + ['total_s']]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dataset generators across row counts.")
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="row counts to sweep")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per case; the fastest is kept")
+    parser.add_argument('--in-process', action='store_true',
+                        help="run cases in this process (faster, but peak RSS is cumulative)")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSON file runs are appended to")
+    parser.add_argument('--no-history', action='store_true', help="do not record this run")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="fractional slowdown against the previous run reported as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit with status 1 on regressions")
+    Dataset_Output.add_output_arguments(parser)
+    args = parser.parse_args()
+
+    results = run_suite(args.targets, args.sizes, args.format, args.repeat, not args.in_process,
+                        args.row_group_size, args.compression)
+    print()
+    print(results_table(results).to_markdown(index=False))
+
+    history = load_history(args.history)
+    regressions = find_regressions(results, history[-1]['results'], args.tolerance) if history else []
+    if regressions:
+        print(f"\nRegressions against the run of {history[-1]['timestamp']}:")
+        print(pd.DataFrame(regressions).to_markdown(index=False))
+    if not args.no_history:
+        append_history({**run_metadata(), 'results': results}, args.history)
+        print(f"\nRun recorded in '{args.history}'")
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
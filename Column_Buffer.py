@@ -0,0 +1,217 @@
+import sys
+from array import array
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Typed column buffers for row-at-a-time generators.
+#
+# A ColumnBuffer replaces a dict of Python lists: numbers, flags and
+# timestamps go into array.array columns (8 bytes or less per value, no
+# per-value objects), low-cardinality strings are interned to int32 codes
+# plus one list of categories, and only genuinely unique strings stay as
+# Python objects. Each column has the same append() a list has, so
+# row-building code like data['NumSales'].append(n) is unchanged.
+# to_frame() / to_arrow() wrap the arrays without copying them.
+
+_EPOCH = datetime(1970, 1, 1)
+
+class NumericColumn:
+    """int64, float64 or bool values in an array.array."""
+    __slots__ = ('dtype', 'values')
+    TYPECODES = {'int64': 'q', 'float64': 'd', 'bool': 'b'}
+
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.values = array(self.TYPECODES[dtype])
+
+    def append(self, value):
+        self.values.append(value)
+
+    def pop(self):
+        return self.values.pop()
+
+    def __len__(self):
+        return len(self.values)
+
+    def to_numpy(self):
+        values = np.frombuffer(self.values, dtype=np.int8 if self.dtype == 'bool' else self.dtype)
+        return values.view(np.bool_) if self.dtype == 'bool' else values
+
+class DatetimeColumn:
+    """Naive datetimes stored as int64 microseconds since the epoch."""
+    __slots__ = ('values',)
+
+    def __init__(self):
+        self.values = array('q')
+
+    def append(self, value):
+        delta = value - _EPOCH
+        self.values.append((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
+    def pop(self):
+        return self.values.pop()
+
+    def __len__(self):
+        return len(self.values)
+
+    def to_numpy(self):
+        return np.frombuffer(self.values, dtype=np.int64).view('datetime64[us]')
+
+class CategoryColumn:
+    """Strings interned to int32 codes; None is stored as code -1."""
+    __slots__ = ('codes', 'categories', 'lookup', 'interned')
+
+    def __init__(self, categories=()):
+        self.codes = array('i')
+        self.categories = list(categories)
+        self.lookup = {category: code for code, category in enumerate(self.categories)}
+        self.interned = False # whether the last append added a category
+
+    def append(self, value):
+        self.interned = False
+        if value is None:
+            self.codes.append(-1)
+            return
+        code = self.lookup.get(value)
+        if code is not None:
+            self.codes.append(code)
+            return
+        # Grow the codes first, so a refused append interns nothing
+        self.codes.append(len(self.categories))
+        self.lookup[value] = len(self.categories)
+        self.categories.append(value)
+        self.interned = True
+
+    def pop(self):
+        """Undo the last append, including the category it interned (append_row's rollback)."""
+        self.codes.pop()
+        if self.interned:
+            del self.lookup[self.categories.pop()]
+            self.interned = False
+
+    def __len__(self):
+        return len(self.codes)
+
+    def to_numpy(self):
+        return np.frombuffer(self.codes, dtype=np.int32)
+
+class StringColumn:
+    """High-cardinality strings (IDs, emails) kept as Python objects."""
+    __slots__ = ('values',)
+
+    def __init__(self):
+        self.values = []
+
+    def append(self, value):
+        self.values.append(value)
+
+    def pop(self):
+        return self.values.pop()
+
+    def __len__(self):
+        return len(self.values)
+
+    def to_numpy(self):
+        return np.array(self.values, dtype=object)
+
+def new_column(kind):
+    """Column for a schema kind: int64, float64, bool, datetime, category, string or a category list."""
+    if isinstance(kind, (list, tuple)):
+        return CategoryColumn(kind)
+    if kind in NumericColumn.TYPECODES:
+        return NumericColumn(kind)
+    if kind == 'datetime':
+        return DatetimeColumn()
+    if kind == 'category':
+        return CategoryColumn()
+    if kind == 'string':
+        return StringColumn()
+    raise ValueError(f"Unknown column kind: {kind}")
+
+class ColumnBuffer:
+    """Dict-like set of typed columns built from a {name: kind} schema.
+
+    The arrays handed out by to_frame()/to_arrow() share memory with the
+    buffer, so stop appending once they have been taken (array.array
+    refuses to grow while a view of it exists, raising BufferError).
+    append_row() is all-or-nothing in that case; appending to single
+    columns is not.
+    """
+    __slots__ = ('columns',)
+
+    def __init__(self, schema):
+        self.columns = {name: new_column(kind) for name, kind in schema.items()}
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def append_row(self, row):
+        """Append one value per column from a mapping.
+
+        If any column refuses the value (a missing key, or BufferError
+        while an exported frame is alive), the columns already appended
+        are rolled back before the error propagates, so every column
+        keeps the same length.
+        """
+        appended = []
+        try:
+            for name, column in self.columns.items():
+                column.append(row[name])
+                appended.append(column)
+        except BaseException:
+            # Columns that grew have no live views, so they can shrink again
+            for column in appended:
+                column.pop()
+            raise
+
+    def to_frame(self):
+        """DataFrame over the buffers; category columns become pandas categoricals."""
+        data = {}
+        for name, column in self.columns.items():
+            if isinstance(column, CategoryColumn):
+                data[name] = pd.Categorical.from_codes(column.to_numpy(), column.categories)
+            else:
+                data[name] = column.to_numpy()
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """pyarrow Table over the buffers; category columns become dictionary arrays."""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("to_arrow requires pyarrow (pip install pyarrow)") from e
+        arrays = []
+        for column in self.columns.values():
+            if isinstance(column, CategoryColumn):
+                codes = column.to_numpy()
+                arrays.append(pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0),
+                                                             pa.array(column.categories, type=pa.string())))
+            elif isinstance(column, StringColumn):
+                arrays.append(pa.array(column.values, type=pa.string()))
+            else:
+                arrays.append(pa.array(column.to_numpy()))
+        return pa.Table.from_arrays(arrays, names=list(self.columns))
+
+    def nbytes(self):
+        """Approximate buffer memory in bytes (strings counted by their object size)."""
+        total = 0
+        for column in self.columns.values():
+            if isinstance(column, StringColumn):
+                total += sys.getsizeof(column.values) + sum(sys.getsizeof(value) for value in column.values)
+            elif isinstance(column, CategoryColumn):
+                total += column.codes.buffer_info()[1] * column.codes.itemsize
+                total += sum(sys.getsizeof(value) for value in column.categories)
+            else:
+                total += column.values.buffer_info()[1] * column.values.itemsize
+        return total
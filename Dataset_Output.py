@@ -0,0 +1,177 @@
+import pandas as pd
+
+import Instrumentation
+
+# Shared output layer for the dataset generators.
+#
+# Frames can be written as CSV, Parquet or Arrow IPC (Feather v2 is the
+# same file format). Low-cardinality string columns are stored as
+# dictionary/categorical columns; their categories are carried from chunk
+# to chunk so every chunk of a streamed file shares one growing dictionary.
+
+FILE_FORMATS = ['csv', 'parquet', 'arrow', 'feather']
+FORMAT_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow', 'feather': '.feather'}
+DEFAULT_ROW_GROUP_SIZE = 1_000_000
+DEFAULT_COMPRESSION = 'zstd'
+
+def infer_format(path):
+    """File format for a path, from its extension (CSV if unknown)."""
+    lowered = path.lower()
+    if lowered.endswith(('.parquet', '.pq')):
+        return 'parquet'
+    if lowered.endswith(('.arrow', '.ipc')):
+        return 'arrow'
+    if lowered.endswith('.feather'):
+        return 'feather'
+    return 'csv'
+
+def output_path(base_name, file_format):
+    """base_name plus the extension for file_format, e.g. ('fleet_telematics_data', 'parquet')."""
+    return base_name + FORMAT_EXTENSIONS[file_format]
+
+def add_output_arguments(parser):
+    """Add the shared --format / --row-group-size / --compression options to a script's parser."""
+    parser.add_argument('--format', choices=FILE_FORMATS, default='csv', help="output file format")
+    parser.add_argument('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE,
+                        help="rows per Parquet row group / Arrow record batch")
+    parser.add_argument('--compression', default=DEFAULT_COMPRESSION,
+                        help="Parquet/Arrow compression codec (e.g. zstd, lz4, snappy, none)")
+
+def encode_categoricals(df, categories):
+    """Return df with the columns named in categories stored as pandas categoricals.
+
+    categories maps column -> list of known categories. Values not seen
+    before are appended to the list in place, so codes already handed out
+    never change and the next chunk extends the same dictionary. Columns
+    that are already categoricals over an extension of the known list
+    (a frame encoded earlier) keep their codes and are not re-encoded.
+    """
+    df = df.copy(deep=False)
+    for column, known in categories.items():
+        if column not in df.columns:
+            continue
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            existing = list(df[column].cat.categories)
+            if existing[:len(known)] == known:
+                known.extend(existing[len(known):])
+                continue
+        known_set = set(known)
+        new_values = [value for value in pd.unique(df[column].dropna()) if value not in known_set]
+        known.extend(sorted(new_values, key=str))
+        df[column] = pd.Categorical(df[column], categories=known)
+    return df
+
+def _category_state(categorical_columns):
+    """Normalize a list of names or a {name: categories} dict into fresh per-write state."""
+    if not categorical_columns:
+        return {}
+    if isinstance(categorical_columns, dict):
+        return {column: list(values) for column, values in categorical_columns.items()}
+    return {column: [] for column in categorical_columns}
+
+def _to_arrow(chunk, pa, dictionary_columns):
+    """Arrow table for a chunk with dictionary columns fixed to int32 indices.
+
+    Fixing the index width keeps the schema identical as dictionaries grow.
+    """
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    for column in dictionary_columns:
+        if column in table.column_names:
+            position = table.schema.get_field_index(column)
+            value_type = table.schema.field(position).type.value_type
+            table = table.set_column(position, pa.field(column, pa.dictionary(pa.int32(), value_type)),
+                                     table.column(position).cast(pa.dictionary(pa.int32(), value_type)))
+    return table
+
+def write_chunks(chunks, path, file_format=None, categorical_columns=None,
+                 row_group_size=DEFAULT_ROW_GROUP_SIZE, compression=DEFAULT_COMPRESSION):
+    """Append DataFrame chunks to a CSV, Parquet or Arrow IPC file, one chunk in memory at a time.
+
+    The format is taken from the file extension unless file_format is given.
+    categorical_columns is a list of column names, or a dict of column name
+    to known categories, to store as dictionary columns. row_group_size
+    sets rows per Parquet row group or Arrow record batch. Returns the
+    number of rows written.
+    """
+    if file_format is None:
+        file_format = infer_format(path)
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    categories = _category_state(categorical_columns)
+
+    rows = 0
+    if file_format == 'csv':
+        for index, chunk in enumerate(chunks):
+            with Instrumentation.span('output.write_csv', rows=len(chunk)):
+                chunk.to_csv(path, mode='w' if index == 0 else 'a', header=index == 0, index=False)
+            rows += len(chunk)
+            Instrumentation.count('output.rows', len(chunk))
+        return rows
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(f"Writing {file_format} requires pyarrow (pip install pyarrow)") from e
+    if compression in (None, 'none'):
+        compression = None
+
+    writer = None
+    schema = None
+    try:
+        for chunk in chunks:
+            with Instrumentation.span('output.encode', rows=len(chunk)):
+                table = _to_arrow(encode_categoricals(chunk, categories), pa, categories)
+            if writer is None:
+                schema = table.schema
+                if file_format == 'parquet':
+                    writer = pq.ParquetWriter(path, schema, compression=compression or 'none')
+                else:
+                    options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+                    writer = pa.ipc.new_file(path, schema, options=options)
+            with Instrumentation.span(f'output.write_{file_format}', rows=len(chunk)):
+                table = table.cast(schema)
+                if file_format == 'parquet':
+                    writer.write_table(table, row_group_size=row_group_size)
+                else:
+                    writer.write_table(table, max_chunksize=row_group_size)
+            rows += len(chunk)
+            Instrumentation.count('output.rows', len(chunk))
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def write_frame(df, path, file_format=None, categorical_columns=None,
+                row_group_size=DEFAULT_ROW_GROUP_SIZE, compression=DEFAULT_COMPRESSION):
+    """Write one DataFrame with write_chunks; see there for the options."""
+    return write_chunks([df], path, file_format, categorical_columns, row_group_size, compression)
+
+def read_chunks(path, chunk_size=DEFAULT_ROW_GROUP_SIZE, columns=None, parse_dates=None, file_format=None):
+    """Read a CSV, Parquet or Arrow IPC file back as DataFrames of at most chunk_size rows.
+
+    columns limits the columns read; parse_dates lists CSV columns to parse
+    as datetimes (Parquet/Arrow keep their stored types).
+    """
+    if file_format is None:
+        file_format = infer_format(path)
+    if file_format == 'csv':
+        yield from pd.read_csv(path, usecols=columns, parse_dates=parse_dates, chunksize=chunk_size)
+        return
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(f"Reading {file_format} requires pyarrow (pip install pyarrow)") from e
+    if file_format == 'parquet':
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+        return
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for position in range(reader.num_record_batches):
+            batch = reader.get_batch(position)
+            if columns is not None:
+                batch = batch.select(columns)
+            for offset in range(0, max(batch.num_rows, 1), chunk_size):
+                yield batch.slice(offset, chunk_size).to_pandas()
@@ -3,17 +3,270 @@
 # For multiples of three, it prints "fizz" instead of the number.
 # For multiples of five, it prints "buzz" instead of the number.
 # For multiples of both three and five, it prints "FizzBuzz".
+#
+# Further down, the same rules drive a high-throughput engine for any
+# range (python FizzBuzz.py --start 1 --stop 1000000000 --output out.txt).
 
-# Loop through numbers from 1 to 100
-for number in range(1, 101):  # The range function generates numbers from 1 to 100.
+import argparse
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+def fizzbuzz(number):
+    """The FizzBuzz word for one number, or the number itself as text."""
     # Check if the number is a multiple of both three and five
     if number % 3 == 0 and number % 5 == 0:  # % is the modulus operator. It checks for remainders.
-        print("FizzBuzz")  # If the number is divisible by both, print "FizzBuzz".
+        return "FizzBuzz"  # Divisible by both: the word is "FizzBuzz".
     # Check if the number is a multiple of three
-    elif number % 3 == 0:  # If the number is divisible by 3, print "fizz".
-        print("fizz")
+    elif number % 3 == 0:  # Divisible by 3: the word is "fizz".
+        return "fizz"
     # Check if the number is a multiple of five
-    elif number % 5 == 0:  # If the number is divisible by 5, print "buzz".
-        print("buzz")
+    elif number % 5 == 0:  # Divisible by 5: the word is "buzz".
+        return "buzz"
+    else:
+        return str(number)  # Otherwise the number itself, as text.
+
+def fizzbuzz_lines(start=1, stop=101):
+    """FizzBuzz output for numbers start..stop-1, one line per number."""
+    return [fizzbuzz(number) for number in range(start, stop)]
+
+# --- High-throughput engine ---
+# Rules are (divisor, word) pairs checked in order, like the if/elif chain
+# above: the first divisor that divides a number gives its word. Which
+# rule applies depends only on the number modulo the period (the least
+# common multiple of the divisors, 15 for the default rules), so a block
+# of `period` numbers that starts on a multiple of the period always has
+# the same layout. For numbers of one digit count that layout is a fixed
+# byte template: words and newlines never move and every number occupies
+# the same columns. A chunk is a 2-D uint8 array holding the template once
+# per block, so each number slot is a column range filled four digits at a
+# time from a lookup table, and consecutive chunks share their trailing
+# digits (see iter_template_chunks). The few numbers outside whole blocks
+# (range edges, digit-count changes, zero and negatives) are formatted
+# with NumPy string conversion instead, and numbers or divisors beyond
+# int64 with Python ints. Chunks go out as large binary
+# writes; --workers formats ranges in worker processes, written in order.
+
+DEFAULT_RULES = ((15, 'FizzBuzz'), (3, 'fizz'), (5, 'buzz'))
+DEFAULT_CHUNK_BYTES = 1 << 22 # output bytes per chunk
+MAX_TEMPLATE_PERIOD = 1 << 16 # longer periods skip the template path
+NUMBERS_PER_TASK = 1 << 24 # numbers per worker task in multi-process mode
+INT64_LIMIT = 2 ** 63 - 1 # the NumPy paths handle numbers in (-INT64_LIMIT, INT64_LIMIT)
+_DIGITS4 = np.array([list(f'{value:04d}'.encode()) for value in range(10_000)], dtype=np.uint8)
+
+def compile_rules(rules=DEFAULT_RULES):
+    """Period and per-residue rule choice (-1 for "print the number") for a rule list."""
+    rules = [(int(divisor), str(word)) for divisor, word in rules]
+    if any(divisor < 1 for divisor, _ in rules):
+        raise ValueError("divisors must be positive integers")
+    period = math.lcm(*(divisor for divisor, _ in rules)) if rules else 1
+    compiled = {'rules': rules, 'period': period,
+                'words': np.array([word for _, word in rules] + [''], dtype=object), 'residues': None,
+                'int64': all(divisor < INT64_LIMIT for divisor, _ in rules)}
+    if period <= MAX_TEMPLATE_PERIOD:
+        compiled['residues'] = _rule_choice(compiled, np.arange(period, dtype=np.int64))
+    return compiled
+
+def _rule_choice(compiled, numbers):
+    """Index of the first matching rule per number, -1 where none matches."""
+    choice = np.full(len(numbers), -1, dtype=np.int64)
+    for index in range(len(compiled['rules']) - 1, -1, -1):
+        choice[numbers % compiled['rules'][index][0] == 0] = index
+    return choice
+
+def format_numbers(compiled, start, stop):
+    """Output bytes for start..stop-1 via NumPy string conversion (the general path)."""
+    if stop <= start:
+        return b''
+    if start <= -INT64_LIMIT or stop > INT64_LIMIT or not compiled['int64']:
+        return format_python_numbers(compiled, start, stop)
+    numbers = np.arange(start, stop, dtype=np.int64)
+    choice = _rule_choice(compiled, numbers)
+    text = numbers.astype(str).astype(object)
+    matched = choice >= 0
+    text[matched] = compiled['words'][choice[matched]]
+    return ('\n'.join(text) + '\n').encode()
+
+def format_python_numbers(compiled, start, stop):
+    """Output bytes for start..stop-1 with Python ints, for numbers and divisors too large for int64."""
+    lines = []
+    for number in range(start, stop):
+        for divisor, word in compiled['rules']:
+            if number % divisor == 0:
+                lines.append(word)
+                break
+        else:
+            lines.append(str(number))
+    return ('\n'.join(lines) + '\n').encode() if lines else b''
+
+def _block_template(compiled, digits):
+    """Byte template of one period-aligned block of `digits`-digit numbers, and its digit columns."""
+    template, columns, offsets = bytearray(), [], []
+    for offset, choice in enumerate(compiled['residues']):
+        if choice >= 0:
+            template += compiled['words'][choice].encode()
+        else:
+            columns.append(len(template))
+            offsets.append(offset)
+            template += b'0' * digits
+        template += b'\n'
+    return (np.frombuffer(bytes(template), dtype=np.uint8), np.array(columns, dtype=np.int64),
+            np.array(offsets, dtype=np.int64))
+
+def _fill_digits(view, column, values, first_digit, width):
+    """Write values as zero-padded `width`-digit ASCII at digit first_digit.. of the slot at column, every row."""
+    position = first_digit + width
+    while position > first_digit:
+        group = min(4, position - first_digit)
+        position -= group
+        digits = _DIGITS4[values % 10_000 if group == 4 else values]
+        view[:, column + position:column + position + group] = digits[:, 4 - group:]
+        values = values // 10_000
+
+def iter_template_chunks(compiled, start, stop, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Chunks for whole period blocks in [start, stop); every number there must have the same digit count.
+
+    Yields memoryviews of one reused buffer, each valid until the next
+    chunk is requested.
+    """
+    period = compiled['period']
+    digits = len(str(start))
+    template, columns, offsets = _block_template(compiled, digits)
+    # Chunks advance by lcm(period, 10**fixed) numbers, so the last `fixed`
+    # digits of every slot repeat from chunk to chunk and are written once.
+    # The leading digits of a slot only step a few times within a chunk,
+    # so later chunks rewrite them as runs of rows sharing one value.
+    fixed = 0
+    while fixed < digits and math.lcm(period, 10 ** (fixed + 1)) // period * len(template) <= chunk_bytes:
+        fixed += 1
+    scale = 10 ** fixed
+    blocks_per_chunk = math.lcm(period, scale) // period
+    leading = digits - fixed
+    use_runs = (period // math.gcd(period, scale) + 1) * 16 <= blocks_per_chunk
+    buffer = np.tile(template, (min(blocks_per_chunk, (stop - start) // period), 1))
+    block_starts = period * np.arange(len(buffer), dtype=np.int64)
+    for first in range(start, stop, blocks_per_chunk * period):
+        blocks = min(blocks_per_chunk, (stop - first) // period)
+        view = buffer[:blocks]
+        for column, offset in zip(columns, offsets):
+            base = first + offset
+            if first == start or not use_runs:
+                numbers = base + block_starts[:blocks]
+                if first == start:
+                    _fill_digits(view, column, numbers % scale, leading, fixed)
+                _fill_digits(view, column, numbers // scale, 0, leading)
+                continue
+            # Rows i with base + period*i in [value*scale, (value+1)*scale) share their leading digits
+            for value in range(base // scale, (base + period * (blocks - 1)) // scale + 1):
+                row_start = max(0, -((base - value * scale) // period))
+                row_stop = min(blocks, -((base - (value + 1) * scale) // period))
+                view[row_start:row_stop, column:column + leading] = np.frombuffer(str(value).encode(), dtype=np.uint8)
+        yield memoryview(view).cast('B')
+
+def iter_fizzbuzz_chunks(start=1, stop=101, rules=DEFAULT_RULES, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Output for numbers start..stop-1 as a sequence of bytes-like chunks, in order.
+
+    Template chunks are views of a reused buffer: write or copy each one
+    before asking for the next.
+    """
+    compiled = rules if isinstance(rules, dict) else compile_rules(rules)
+    period = compiled['period']
+    step = max(1, chunk_bytes // 8) # numbers per general-path chunk
+    position = start
+    while position < stop:
+        if position < 1 or position >= INT64_LIMIT or compiled['residues'] is None:
+            segment_stop = min(stop, 1) if position < 1 and compiled['residues'] is not None else stop
+            for first in range(position, segment_stop, step):
+                yield format_numbers(compiled, first, min(first + step, segment_stop))
+            position = segment_stop
+            continue
+        # One digit count at a time: whole blocks take the template path, the edges the general one
+        segment_stop = min(stop, 10 ** len(str(position)), INT64_LIMIT)
+        block_start = -(-position // period) * period
+        block_stop = segment_stop // period * period
+        if block_start >= block_stop:
+            yield format_numbers(compiled, position, segment_stop)
+        else:
+            if position < block_start:
+                yield format_numbers(compiled, position, block_start)
+            yield from iter_template_chunks(compiled, block_start, block_stop, chunk_bytes)
+            if block_stop < segment_stop:
+                yield format_numbers(compiled, block_stop, segment_stop)
+        position = segment_stop
+
+def fizzbuzz_bytes(start, stop, rules=DEFAULT_RULES, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Output for start..stop-1 as one bytes object (the worker task of the multi-process mode)."""
+    return b''.join(bytes(chunk) for chunk in iter_fizzbuzz_chunks(start, stop, rules, chunk_bytes))
+
+def write_fizzbuzz(output=None, start=1, stop=101, rules=DEFAULT_RULES, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                   workers=1, numbers_per_task=NUMBERS_PER_TASK):
+    """Write output for start..stop-1 to a path, a binary file object or stdout (None); returns bytes written.
+
+    workers > 1 formats ranges of numbers_per_task numbers in worker
+    processes, at most two per worker in flight, and writes them in order.
+    """
+    compiled = compile_rules(rules)
+    if output is None:
+        sys.stdout.flush()
+        handle, close = sys.stdout.buffer, False
+    elif isinstance(output, (str, os.PathLike)):
+        handle, close = open(output, 'wb'), True
     else:
-        print(number)  # If none of the above conditions are met, print the number itself.
+        handle, close = output, False
+
+    written = 0
+    try:
+        if workers == 1:
+            for chunk in iter_fizzbuzz_chunks(start, stop, compiled, chunk_bytes):
+                written += handle.write(chunk)
+            return written
+
+        # Resolve the worker function by file path, so it works when this file runs as __main__
+        import Shard_Pool
+        script_path = os.path.abspath(__file__)
+        tasks = iter(range(start, stop, numbers_per_task))
+        pending = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                while len(pending) < 2 * workers:
+                    first = next(tasks, None)
+                    if first is None:
+                        break
+                    pending.append(executor.submit(Shard_Pool.call_script, script_path, 'fizzbuzz_bytes', first,
+                                                   min(first + numbers_per_task, stop), rules, chunk_bytes))
+                if not pending:
+                    break
+                written += handle.write(pending.pop(0).result())
+        return written
+    finally:
+        if close:
+            handle.close()
+        else:
+            handle.flush()
+
+def parse_rule(text):
+    """Parse a --rule value such as '7=Bazz'."""
+    divisor, _, word = text.partition('=')
+    return int(divisor), word
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FizzBuzz for any range, with custom divisor=word rules.")
+    parser.add_argument('--start', type=int, default=1)
+    parser.add_argument('--stop', type=int, default=101, help="first number not printed")
+    parser.add_argument('--rule', type=parse_rule, action='append', metavar='DIVISOR=WORD',
+                        help="replace the default rules; checked in the order given (e.g. --rule 15=FizzBuzz "
+                             "--rule 3=fizz --rule 5=buzz)")
+    parser.add_argument('--output', help="write to this file instead of stdout")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes formatting ranges in order")
+    parser.add_argument('--chunk-bytes', type=int, default=DEFAULT_CHUNK_BYTES)
+    args = parser.parse_args()
+
+    try:
+        # By default this prints the numbers from 1 to 100, as it always has
+        write_fizzbuzz(args.output, args.start, args.stop, args.rule or DEFAULT_RULES, args.chunk_bytes, args.workers)
+    except BrokenPipeError:
+        # Output piped into something that stopped reading (e.g. head)
+        sys.stderr.close()
@@ -1,137 +1,539 @@
-import pandas as pd
-import numpy as np
-from faker import Faker
-import random
-from datetime import datetime, timedelta
-import ipaddress
-
-# Set random seed for reproducibility
-np.random.seed(42)
-fake = Faker()
-
-def generate_fraud_dataset(num_records=10000, fraud_percentage=0.1):
-    """Generate a dataset with fraud patterns."""
-    
-    # Calculate number of fraud records
-    num_fraud = int(num_records * fraud_percentage)
-    
-    data = {
-        'SellerID': [],
-        'Email': [],
-        'AccountCreationDate': [],
-        'PhysicalLocation': [],
-        'IPAddress': [],
-        'CreditCardNumber': [],
-        'NumSales': [],
-        'InventoryCount': [],
-        # Additional columns
-        'LastLoginDate': [],
-        'AccountStatus': [],
-        'VerificationLevel': [],
-        'ReturnRate': [],
-        'AverageTransactionValue': [],
-        'CustomerRating': [],
-        'FailedLoginAttempts': [],
-        'PaymentMethodsCount': [],
-        'ShippingSpeedAvg': [],
-        'ListingUpdateFrequency': [],
-        'DisputeCount': [],
-        'IsFraud': []
-    }
-
-    # Generate legitimate records
-    for _ in range(num_records - num_fraud):
-        data = add_legitimate_record(data)
-
-    # Generate fraud patterns
-    fraud_patterns = [
-        generate_shared_credentials() for _ in range(int(num_fraud/3))
-    ]
-    
-    # Add fraud records
-    for _ in range(num_fraud):
-        if random.random() < 0.3 and fraud_patterns:  # 30% chance to use shared credentials
-            pattern = random.choice(fraud_patterns)
-            data = add_fraud_record(data, shared_credentials=pattern)
-        else:
-            data = add_fraud_record(data)
-
-    df = pd.DataFrame(data)
-    return df
-
-def generate_shared_credentials():
-    """Generate shared credentials for fraud patterns."""
-    return {
-        'email': fake.email(),
-        'ip': fake.ipv4(),
-        'credit_card': fake.credit_card_number()
-    }
-
-def add_legitimate_record(data):
-    """Add a legitimate record to the dataset."""
-    creation_date = fake.date_time_between(start_date='-2y', end_date='now')
-    
-    data['SellerID'].append(fake.uuid4())
-    data['Email'].append(fake.email())
-    data['AccountCreationDate'].append(creation_date)
-    data['PhysicalLocation'].append(fake.city())
-    data['IPAddress'].append(fake.ipv4())
-    data['CreditCardNumber'].append(fake.credit_card_number())
-    data['NumSales'].append(random.randint(0, 1000))
-    data['InventoryCount'].append(random.randint(0, 500))
-    
-    # Additional columns
-    data['LastLoginDate'].append(fake.date_time_between(start_date=creation_date))
-    data['AccountStatus'].append(random.choice(['Active', 'Active', 'Active', 'Suspended', 'Pending']))
-    data['VerificationLevel'].append(random.choice([1, 2, 3]))
-    data['ReturnRate'].append(round(random.uniform(0, 0.15), 3))
-    data['AverageTransactionValue'].append(round(random.uniform(10, 500), 2))
-    data['CustomerRating'].append(round(random.uniform(4, 5), 1))
-    data['FailedLoginAttempts'].append(random.randint(0, 3))
-    data['PaymentMethodsCount'].append(random.randint(1, 4))
-    data['ShippingSpeedAvg'].append(round(random.uniform(1, 5), 1))
-    data['ListingUpdateFrequency'].append(random.randint(1, 30))
-    data['DisputeCount'].append(random.randint(0, 2))
-    data['IsFraud'].append(0)
-    
-    return data
-
-def add_fraud_record(data, shared_credentials=None):
-    """Add a fraudulent record to the dataset."""
-    creation_date = fake.date_time_between(start_date='-6m', end_date='now')
-    
-    data['SellerID'].append(fake.uuid4())
-    data['Email'].append(shared_credentials['email'] if shared_credentials else fake.email())
-    data['AccountCreationDate'].append(creation_date)
-    data['PhysicalLocation'].append(fake.city())
-    data['IPAddress'].append(shared_credentials['ip'] if shared_credentials else fake.ipv4())
-    data['CreditCardNumber'].append(shared_credentials['credit_card'] if shared_credentials else fake.credit_card_number())
-    data['NumSales'].append(random.randint(50, 5000))  # Higher sales volume
-    data['InventoryCount'].append(random.randint(0, 100))
-    
-    # Additional columns with fraud patterns
-    data['LastLoginDate'].append(fake.date_time_between(start_date=creation_date))
-    data['AccountStatus'].append(random.choice(['Active', 'Active', 'Flagged', 'Under Review']))
-    data['VerificationLevel'].append(random.choice([1, 1, 1, 2]))  # Lower verification levels
-    data['ReturnRate'].append(round(random.uniform(0.2, 0.4), 3))  # Higher return rates
-    data['AverageTransactionValue'].append(round(random.uniform(400, 2000), 2))  # Higher transaction values
-    data['CustomerRating'].append(round(random.uniform(2, 3.5), 1))  # Lower ratings
-    data['FailedLoginAttempts'].append(random.randint(3, 10))  # More failed attempts
-    data['PaymentMethodsCount'].append(random.randint(1, 2))  # Fewer payment methods
-    data['ShippingSpeedAvg'].append(round(random.uniform(3, 7), 1))  # Slower shipping
-    data['ListingUpdateFrequency'].append(random.randint(20, 50))  # More frequent updates
-    data['DisputeCount'].append(random.randint(3, 10))  # More disputes
-    data['IsFraud'].append(1)
-    
-    return data
-
-if __name__ == "__main__":
-    # Generate dataset
-    df = generate_fraud_dataset(num_records=10000, fraud_percentage=0.1)
-    
-    # Save to CSV
-    df.to_csv('fraud_analysis_dataset.csv', index=False)
-    print(f"Generated dataset with {len(df)} records")
-    print(f"Fraud records: {df['IsFraud'].sum()}")
-    print("\nSample of fraud patterns:")
+import pandas as pd
+import numpy as np
+import faker
+from faker import Faker
+import random
+from datetime import datetime, timedelta
+import ipaddress
+import argparse
+import os
+import time
+import uuid
+
+import Column_Buffer
+import Dataset_Output
+import Shard_Pool
+
+# Set random seed for reproducibility
+np.random.seed(42)
+
+# Column types for the row-by-row generator's buffer
+ROW_SCHEMA = {
+    'SellerID': 'string',
+    'Email': 'string',
+    'AccountCreationDate': 'datetime',
+    'PhysicalLocation': 'category',
+    'IPAddress': 'string',
+    'CreditCardNumber': 'string',
+    'NumSales': 'int64',
+    'InventoryCount': 'int64',
+    # Additional columns
+    'LastLoginDate': 'datetime',
+    'AccountStatus': 'category',
+    'VerificationLevel': 'int64',
+    'ReturnRate': 'float64',
+    'AverageTransactionValue': 'float64',
+    'CustomerRating': 'float64',
+    'FailedLoginAttempts': 'int64',
+    'PaymentMethodsCount': 'int64',
+    'ShippingSpeedAvg': 'float64',
+    'ListingUpdateFrequency': 'int64',
+    'DisputeCount': 'int64',
+    'IsFraud': 'int64',
+}
+
+def generate_fraud_dataset(num_records=10000, fraud_percentage=0.1, pools=None):
+    """Generate a dataset with fraud patterns.
+
+    Identities are drawn from pools (see load_identity_pools) rather than
+    from Faker per row; by default they come from the on-disk cache.
+    """
+    if pools is None:
+        pools = load_identity_pools(min(IDENTITY_POOL_SIZE, max(num_records, 1)))
+    now = datetime.now().replace(microsecond=0)
+    
+    # Calculate number of fraud records
+    num_fraud = int(num_records * fraud_percentage)
+    num_legit = num_records - num_fraud
+    
+    data = Column_Buffer.ColumnBuffer(ROW_SCHEMA)
+
+    # Generate legitimate records
+    for sequence_number in range(num_legit):
+        data = add_legitimate_record(data, pools, sequence_number, now)
+
+    # Generate fraud patterns
+    fraud_patterns = [
+        generate_shared_credentials(pools, num_records + pattern) for pattern in range(int(num_fraud/3))
+    ]
+    
+    # Add fraud records
+    for sequence_number in range(num_legit, num_records):
+        if random.random() < 0.3 and fraud_patterns:  # 30% chance to use shared credentials
+            pattern = random.choice(fraud_patterns)
+            data = add_fraud_record(data, pools, sequence_number, now, shared_credentials=pattern)
+        else:
+            data = add_fraud_record(data, pools, sequence_number, now)
+
+    return batch_dtypes(data.to_frame())
+
+def batch_dtypes(df):
+    """Give a row-path frame the batch engine's dtypes: plain strings and second-resolution dates."""
+    for name, kind in ROW_SCHEMA.items():
+        if kind == 'category':
+            df[name] = df[name].to_numpy(dtype=str)
+        elif kind == 'datetime':
+            df[name] = df[name].to_numpy().astype('datetime64[s]')
+    return df
+
+def _pool_value(pool):
+    return str(pool[random.randrange(len(pool))])
+
+def generate_shared_credentials(pools, sequence_number):
+    """Generate shared credentials for fraud patterns (or one record's own), drawn from the pools."""
+    return {
+        'email': f"{_pool_value(pools['email_user'])}{sequence_number}@{_pool_value(pools['email_domain'])}",
+        'ip': str(ipaddress.IPv4Address(random.randint(IPV4_LOW, IPV4_HIGH))),
+        'credit_card': _pool_value(pools['credit_card'])
+    }
+
+def random_account_dates(max_age, now):
+    """AccountCreationDate and LastLoginDate for one record (creation <= login <= now)."""
+    age = random.randint(0, int(max_age.total_seconds()))
+    return now - timedelta(seconds=age), now - timedelta(seconds=int(age * random.random()))
+
+def random_seller_id():
+    """A version 4 UUID string, in the form fake.uuid4() produced."""
+    return str(uuid.UUID(int=random.getrandbits(128), version=4))
+
+def add_legitimate_record(data, pools, sequence_number, now):
+    """Add a legitimate record to the dataset."""
+    creation_date, last_login = random_account_dates(LEGITIMATE_ACCOUNT_AGE, now)
+    identity = generate_shared_credentials(pools, sequence_number)
+    
+    data.append_row({
+        'SellerID': random_seller_id(),
+        'Email': identity['email'],
+        'AccountCreationDate': creation_date,
+        'PhysicalLocation': _pool_value(pools['city']),
+        'IPAddress': identity['ip'],
+        'CreditCardNumber': identity['credit_card'],
+        'NumSales': random.randint(0, 1000),
+        'InventoryCount': random.randint(0, 500),
+
+        # Additional columns
+        'LastLoginDate': last_login,
+        'AccountStatus': random.choice(['Active', 'Active', 'Active', 'Suspended', 'Pending']),
+        'VerificationLevel': random.choice([1, 2, 3]),
+        'ReturnRate': round(random.uniform(0, 0.15), 3),
+        'AverageTransactionValue': round(random.uniform(10, 500), 2),
+        'CustomerRating': round(random.uniform(4, 5), 1),
+        'FailedLoginAttempts': random.randint(0, 3),
+        'PaymentMethodsCount': random.randint(1, 4),
+        'ShippingSpeedAvg': round(random.uniform(1, 5), 1),
+        'ListingUpdateFrequency': random.randint(1, 30),
+        'DisputeCount': random.randint(0, 2),
+        'IsFraud': 0,
+    })
+    
+    return data
+
+def add_fraud_record(data, pools, sequence_number, now, shared_credentials=None):
+    """Add a fraudulent record to the dataset."""
+    creation_date, last_login = random_account_dates(FRAUD_ACCOUNT_AGE, now)
+    identity = shared_credentials or generate_shared_credentials(pools, sequence_number)
+    
+    data.append_row({
+        'SellerID': random_seller_id(),
+        'Email': identity['email'],
+        'AccountCreationDate': creation_date,
+        'PhysicalLocation': _pool_value(pools['city']),
+        'IPAddress': identity['ip'],
+        'CreditCardNumber': identity['credit_card'],
+        'NumSales': random.randint(50, 5000),  # Higher sales volume
+        'InventoryCount': random.randint(0, 100),
+
+        # Additional columns with fraud patterns
+        'LastLoginDate': last_login,
+        'AccountStatus': random.choice(['Active', 'Active', 'Flagged', 'Under Review']),
+        'VerificationLevel': random.choice([1, 1, 1, 2]),  # Lower verification levels
+        'ReturnRate': round(random.uniform(0.2, 0.4), 3),  # Higher return rates
+        'AverageTransactionValue': round(random.uniform(400, 2000), 2),  # Higher transaction values
+        'CustomerRating': round(random.uniform(2, 3.5), 1),  # Lower ratings
+        'FailedLoginAttempts': random.randint(3, 10),  # More failed attempts
+        'PaymentMethodsCount': random.randint(1, 2),  # Fewer payment methods
+        'ShippingSpeedAvg': round(random.uniform(3, 7), 1),  # Slower shipping
+        'ListingUpdateFrequency': random.randint(20, 50),  # More frequent updates
+        'DisputeCount': random.randint(3, 10),  # More disputes
+        'IsFraud': 1,
+    })
+    
+    return data
+
+# Column distributions used by the batch engine. Each entry mirrors the
+# matching random call in add_legitimate_record / add_fraud_record:
+#   ('int', low, high)            -> random.randint(low, high)
+#   ('uniform', low, high, ndigits) -> round(random.uniform(low, high), ndigits)
+#   ('choice', options)           -> random.choice(options)
+LEGITIMATE_DISTRIBUTIONS = {
+    'NumSales': ('int', 0, 1000),
+    'InventoryCount': ('int', 0, 500),
+    'AccountStatus': ('choice', ['Active', 'Active', 'Active', 'Suspended', 'Pending']),
+    'VerificationLevel': ('choice', [1, 2, 3]),
+    'ReturnRate': ('uniform', 0, 0.15, 3),
+    'AverageTransactionValue': ('uniform', 10, 500, 2),
+    'CustomerRating': ('uniform', 4, 5, 1),
+    'FailedLoginAttempts': ('int', 0, 3),
+    'PaymentMethodsCount': ('int', 1, 4),
+    'ShippingSpeedAvg': ('uniform', 1, 5, 1),
+    'ListingUpdateFrequency': ('int', 1, 30),
+    'DisputeCount': ('int', 0, 2),
+}
+
+FRAUD_DISTRIBUTIONS = {
+    'NumSales': ('int', 50, 5000),  # Higher sales volume
+    'InventoryCount': ('int', 0, 100),
+    'AccountStatus': ('choice', ['Active', 'Active', 'Flagged', 'Under Review']),
+    'VerificationLevel': ('choice', [1, 1, 1, 2]),  # Lower verification levels
+    'ReturnRate': ('uniform', 0.2, 0.4, 3),  # Higher return rates
+    'AverageTransactionValue': ('uniform', 400, 2000, 2),  # Higher transaction values
+    'CustomerRating': ('uniform', 2, 3.5, 1),  # Lower ratings
+    'FailedLoginAttempts': ('int', 3, 10),  # More failed attempts
+    'PaymentMethodsCount': ('int', 1, 2),  # Fewer payment methods
+    'ShippingSpeedAvg': ('uniform', 3, 7, 1),  # Slower shipping
+    'ListingUpdateFrequency': ('int', 20, 50),  # More frequent updates
+    'DisputeCount': ('int', 3, 10),  # More disputes
+}
+
+# Account age windows: two years for legitimate sellers, six months for fraud
+LEGITIMATE_ACCOUNT_AGE = timedelta(days=730)
+FRAUD_ACCOUNT_AGE = timedelta(days=182)
+
+# Low-cardinality columns stored as dictionary columns in Parquet/Arrow output
+CATEGORICAL_COLUMNS = {
+    'AccountStatus': ['Active', 'Suspended', 'Pending', 'Flagged', 'Under Review'],
+}
+
+COLUMN_ORDER = [
+    'SellerID', 'Email', 'AccountCreationDate', 'PhysicalLocation', 'IPAddress',
+    'CreditCardNumber', 'NumSales', 'InventoryCount', 'LastLoginDate',
+    'AccountStatus', 'VerificationLevel', 'ReturnRate', 'AverageTransactionValue',
+    'CustomerRating', 'FailedLoginAttempts', 'PaymentMethodsCount',
+    'ShippingSpeedAvg', 'ListingUpdateFrequency', 'DisputeCount', 'IsFraud'
+]
+
+def draw_columns(rng, distributions, size):
+    """Draw one NumPy array per column from a distributions table."""
+    columns = {}
+    for name, spec in distributions.items():
+        kind = spec[0]
+        if kind == 'int':
+            columns[name] = rng.integers(spec[1], spec[2] + 1, size=size)
+        elif kind == 'uniform':
+            columns[name] = np.round(rng.uniform(spec[1], spec[2], size=size), spec[3])
+        elif kind == 'choice':
+            columns[name] = np.asarray(spec[1])[rng.integers(0, len(spec[1]), size=size)]
+        else:
+            raise ValueError(f"Unknown distribution kind: {kind}")
+    return columns
+
+def draw_account_dates(rng, size, max_age, now):
+    """Draw AccountCreationDate and LastLoginDate arrays (creation <= login <= now)."""
+    now = np.datetime64(now, 's')
+    max_age_seconds = int(max_age.total_seconds())
+    age = rng.integers(0, max_age_seconds + 1, size=size)
+    creation = now - age.astype('timedelta64[s]')
+    # Last login falls uniformly between account creation and now
+    since_login = (age * rng.random(size)).astype('timedelta64[s]')
+    return creation, now - since_login
+
+# Identity pools: Faker output is generated once into bounded pools and
+# sampled by index, so no Faker call happens per row.
+IDENTITY_POOL_SIZE = 100_000
+# Next to this script, so every working directory shares one cache
+IDENTITY_POOL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.identity_pools')
+# Public unicast IPv4 range (classes A-C), drawn as plain integers
+IPV4_LOW = int(ipaddress.IPv4Address('1.0.0.0'))
+IPV4_HIGH = int(ipaddress.IPv4Address('223.255.255.255'))
+_OCTETS = np.array([str(i) for i in range(256)])
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+def build_identity_pools(pool_size=IDENTITY_POOL_SIZE, seed=42):
+    """Build bounded pools of email parts, cities and card numbers with a seeded Faker."""
+    pool_fake = Faker()
+    pool_fake.seed_instance(seed)
+    return {
+        'email_user': np.array([pool_fake.user_name() for _ in range(pool_size)]),
+        'email_domain': np.array([pool_fake.free_email_domain() for _ in range(pool_size)]),
+        'city': np.array([pool_fake.city() for _ in range(pool_size)]),
+        'credit_card': np.array([pool_fake.credit_card_number() for _ in range(pool_size)]),
+    }
+
+def load_identity_pools(pool_size=IDENTITY_POOL_SIZE, seed=42, cache_dir=IDENTITY_POOL_CACHE_DIR):
+    """Load identity pools from the on-disk cache, building and saving them on a miss.
+
+    Pass cache_dir=None to always build in memory.
+    """
+    if cache_dir is None:
+        return build_identity_pools(pool_size, seed)
+
+    # Faker's data changes between releases, so the version is part of the key
+    path = os.path.join(cache_dir, f"identity_pools_{pool_size}_{seed}_faker{faker.VERSION}.npz")
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            return {name: cached[name] for name in cached.files}
+
+    pools = build_identity_pools(pool_size, seed)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(path, **pools)
+    return pools
+
+def sample_pool(pool, rng, size):
+    """Sample values from a pool by random index."""
+    return pool[rng.integers(0, len(pool), size=size)]
+
+def format_emails(users, domains, sequence_numbers):
+    """Join user names and domains into emails; the sequence number keeps each address unique."""
+    local_parts = np.char.add(users, np.asarray(sequence_numbers).astype(str))
+    return np.char.add(np.char.add(local_parts, '@'), domains)
+
+def sample_emails(pools, rng, sequence_numbers):
+    """Build one email per sequence number from randomly sampled pool entries."""
+    size = len(sequence_numbers)
+    users = sample_pool(pools['email_user'], rng, size)
+    domains = sample_pool(pools['email_domain'], rng, size)
+    return format_emails(users, domains, sequence_numbers)
+
+def format_ipv4(addresses):
+    """Dotted-quad strings for an array of integer IPv4 addresses."""
+    text = _OCTETS[addresses >> 24]
+    for shift in (16, 8, 0):
+        text = np.char.add(np.char.add(text, '.'), _OCTETS[(addresses >> shift) & 0xFF])
+    return text
+
+def random_ipv4(rng, size):
+    """Dotted-quad IPv4 strings from random integers in the public unicast range."""
+    return format_ipv4(rng.integers(IPV4_LOW, IPV4_HIGH + 1, size=size))
+
+def random_uuid4(rng, size):
+    """Version 4 UUID strings from random bytes, laid out as uuid.UUID(version=4) does."""
+    raw = rng.integers(0, 256, size=(size, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    digits = np.empty((size, 32), dtype=np.uint8)
+    digits[:, 0::2] = _HEX_DIGITS[raw >> 4]
+    digits[:, 1::2] = _HEX_DIGITS[raw & 0x0F]
+    text = np.full((size, 36), ord('-'), dtype=np.uint8)
+    for start, stop, offset in ((0, 8, 0), (9, 13, 8), (14, 18, 12), (19, 23, 16), (24, 36, 20)):
+        text[:, start:stop] = digits[:, offset:offset + stop - start]
+    return text.view('S36').ravel().astype(str)
+
+def draw_identities(pools, rng, sequence_numbers):
+    """Draw the identity columns for a block of sellers from the pools."""
+    size = len(sequence_numbers)
+    return {
+        'SellerID': random_uuid4(rng, size),
+        'Email': sample_emails(pools, rng, sequence_numbers),
+        'PhysicalLocation': sample_pool(pools['city'], rng, size),
+        'IPAddress': random_ipv4(rng, size),
+        'CreditCardNumber': sample_pool(pools['credit_card'], rng, size),
+    }
+
+def _mix64(values):
+    """SplitMix64 finalizer: a stateless hash from uint64 keys to uint64 values."""
+    z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def pattern_credentials(pools, pattern_ids, pattern_key, num_records):
+    """Shared credentials for fraud-ring patterns, derived from the pattern id alone.
+
+    Every chunk that picks pattern k gets the same email, IP and card without
+    a pattern table being kept in memory, so rings span chunks.
+    """
+    salt = _mix64(np.array([pattern_key], dtype=np.uint64))[0]
+    keys = (np.asarray(pattern_ids, dtype=np.uint64) * np.uint64(4)) ^ salt
+    hashes = [_mix64(keys + np.uint64(offset)) for offset in range(4)]
+
+    def pick(pool, hashed):
+        return pool[(hashed % np.uint64(len(pool))).astype(np.int64)]
+
+    span = np.uint64(IPV4_HIGH - IPV4_LOW + 1)
+    addresses = (hashes[2] % span).astype(np.int64) + IPV4_LOW
+    return {
+        'Email': format_emails(pick(pools['email_user'], hashes[0]),
+                               pick(pools['email_domain'], hashes[1]),
+                               num_records + np.asarray(pattern_ids, dtype=np.int64)),
+        'IPAddress': format_ipv4(addresses),
+        'CreditCardNumber': pick(pools['credit_card'], hashes[3]),
+    }
+
+def generate_fraud_chunk(start, stop, num_records, fraud_percentage=0.1, seed=42, pools=None,
+                         now=None, chunk_index=0, seed_sequence=None):
+    """Generate rows [start, stop) of a num_records-row fraud dataset column-wise.
+
+    Rows below the legitimate/fraud split are legitimate, as in
+    generate_fraud_dataset. Each chunk draws from its own child of
+    SeedSequence(seed), so a chunk's rows depend only on the seed, the
+    chunk index and its row range. seed_sequence overrides that child
+    (Shard_Pool.run_sharded passes the same one).
+    """
+    if seed_sequence is None:
+        seed_sequence = np.random.SeedSequence(seed, spawn_key=(chunk_index,))
+    rng = np.random.default_rng(seed_sequence)
+    if pools is None:
+        pools = load_identity_pools(min(IDENTITY_POOL_SIZE, max(num_records, 1)), seed)
+    if now is None:
+        now = datetime.now().replace(microsecond=0)
+
+    num_fraud = int(num_records * fraud_percentage)
+    num_legit = num_records - num_fraud
+    legit_stop = min(max(num_legit, start), stop)
+    num_chunk_legit = legit_stop - start
+    num_chunk_fraud = stop - legit_stop
+
+    legit = draw_columns(rng, LEGITIMATE_DISTRIBUTIONS, num_chunk_legit)
+    legit['AccountCreationDate'], legit['LastLoginDate'] = draw_account_dates(
+        rng, num_chunk_legit, LEGITIMATE_ACCOUNT_AGE, now)
+    legit['IsFraud'] = np.zeros(num_chunk_legit, dtype=np.int64)
+    legit.update(draw_identities(pools, rng, np.arange(start, legit_stop)))
+
+    fraud = draw_columns(rng, FRAUD_DISTRIBUTIONS, num_chunk_fraud)
+    fraud['AccountCreationDate'], fraud['LastLoginDate'] = draw_account_dates(
+        rng, num_chunk_fraud, FRAUD_ACCOUNT_AGE, now)
+    fraud['IsFraud'] = np.ones(num_chunk_fraud, dtype=np.int64)
+    fraud.update(draw_identities(pools, rng, np.arange(legit_stop, stop)))
+
+    # 30% of fraud records reuse one of the shared credential patterns
+    num_patterns = int(num_fraud/3)
+    if num_patterns and num_chunk_fraud:
+        shared = rng.random(num_chunk_fraud) < 0.3
+        picks = rng.integers(0, num_patterns, size=int(shared.sum()))
+        patterns = pattern_credentials(pools, picks, seed, num_records)
+        for column, values in patterns.items():
+            fraud[column] = fraud[column].astype(np.result_type(fraud[column], values))
+            fraud[column][shared] = values
+
+    data = {
+        column: np.concatenate([np.asarray(legit[column]), np.asarray(fraud[column])])
+        for column in COLUMN_ORDER
+    }
+    return pd.DataFrame(data, index=pd.RangeIndex(start, stop))
+
+def generate_fraud_dataset_batch(num_records=10000, fraud_percentage=0.1, seed=42, pools=None):
+    """Generate the fraud dataset column-wise, one NumPy draw per column and class.
+
+    Produces the same columns, row layout (legitimate rows first) and
+    per-class distributions as generate_fraud_dataset. Identity columns are
+    sampled from pools (see load_identity_pools); by default a pool no larger
+    than num_records is loaded from the on-disk cache (built on first use).
+    """
+    return generate_fraud_chunk(0, num_records, num_records, fraud_percentage, seed, pools)
+
+def iter_fraud_dataset_chunks(num_records=10000, fraud_percentage=0.1, chunk_size=1_000_000,
+                              seed=42, pools=None):
+    """Yield the fraud dataset as DataFrames of at most chunk_size rows."""
+    if pools is None:
+        pools = load_identity_pools(min(IDENTITY_POOL_SIZE, max(num_records, 1)), seed)
+    now = datetime.now().replace(microsecond=0)
+    for chunk_index, start in enumerate(range(0, num_records, chunk_size)):
+        stop = min(start + chunk_size, num_records)
+        yield generate_fraud_chunk(start, stop, num_records, fraud_percentage, seed, pools,
+                                   now=now, chunk_index=chunk_index)
+
+def generate_fraud_dataset_sharded(num_records=10000, fraud_percentage=0.1, seed=42, pools=None,
+                                   shard_size=Shard_Pool.DEFAULT_SHARD_SIZE, workers=None):
+    """Generate the fraud dataset across worker processes.
+
+    Output depends on seed and shard_size only, never on workers, and
+    matches iter_fraud_dataset_chunks with chunk_size=shard_size.
+    """
+    if pools is None:
+        pools = load_identity_pools(min(IDENTITY_POOL_SIZE, max(num_records, 1)), seed)
+    return Shard_Pool.run_sharded(
+        generate_fraud_chunk, num_records, seed=seed, shard_size=shard_size, workers=workers,
+        shard_kwargs={'num_records': num_records, 'fraud_percentage': fraud_percentage,
+                      'seed': seed, 'pools': pools, 'now': datetime.now().replace(microsecond=0)})
+
+def write_fraud_dataset(path, num_records=10000, fraud_percentage=0.1, chunk_size=1_000_000,
+                        seed=42, pools=None, file_format=None,
+                        row_group_size=Dataset_Output.DEFAULT_ROW_GROUP_SIZE,
+                        compression=Dataset_Output.DEFAULT_COMPRESSION):
+    """Stream a fraud dataset of any size to CSV, Parquet or Arrow with flat peak memory."""
+    chunks = iter_fraud_dataset_chunks(num_records, fraud_percentage, chunk_size, seed, pools)
+    return Dataset_Output.write_chunks(chunks, path, file_format, CATEGORICAL_COLUMNS,
+                                       row_group_size, compression)
+
+def benchmark_generation(sizes=(10_000, 1_000_000, 10_000_000), row_path_limit=1_000_000,
+                         fraud_percentage=0.1):
+    """Compare rows/sec of the row-by-row and batch generators.
+
+    The row-by-row path is skipped above row_path_limit since it takes
+    hours at 10M rows.
+    """
+    results = []
+    for size in sizes:
+        result = {'rows': size, 'row_rows_per_sec': None}
+        if size <= row_path_limit:
+            started = time.perf_counter()
+            generate_fraud_dataset(num_records=size, fraud_percentage=fraud_percentage)
+            result['row_rows_per_sec'] = size / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        generate_fraud_dataset_batch(num_records=size, fraud_percentage=fraud_percentage)
+        result['batch_rows_per_sec'] = size / (time.perf_counter() - started)
+        results.append(result)
+
+    print(f"{'rows':>12} {'row path rows/s':>18} {'batch rows/s':>15} {'speedup':>9}")
+    for result in results:
+        row_rate = result['row_rows_per_sec']
+        batch_rate = result['batch_rows_per_sec']
+        row_text = f"{row_rate:,.0f}" if row_rate else "skipped"
+        speedup = f"{batch_rate / row_rate:.1f}x" if row_rate else "-"
+        print(f"{result['rows']:>12,} {row_text:>18} {batch_rate:>15,.0f} {speedup:>9}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the fraud analysis dataset.")
+    parser.add_argument('--batch', action='store_true', help="use the column-wise batch engine")
+    parser.add_argument('--benchmark', action='store_true', help="compare row and batch engines")
+    parser.add_argument('--stream', metavar='PATH',
+                        help="stream chunks to PATH (.csv, .parquet, .arrow or .feather) instead of building one frame")
+    parser.add_argument('--num-records', type=int, default=10000)
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="generate with the batch engine across this many worker processes")
+    Dataset_Output.add_output_arguments(parser)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_generation()
+        raise SystemExit
+
+    if args.stream:
+        rows = write_fraud_dataset(args.stream, num_records=args.num_records, fraud_percentage=0.1,
+                                   chunk_size=args.chunk_size, pools=load_identity_pools(seed=42),
+                                   row_group_size=args.row_group_size, compression=args.compression)
+        print(f"Streamed {rows} records to {args.stream}")
+        raise SystemExit
+
+    # Generate dataset
+    if args.workers:
+        pools = load_identity_pools(seed=42)
+        df = generate_fraud_dataset_sharded(num_records=args.num_records, fraud_percentage=0.1,
+                                            pools=pools, workers=args.workers)
+    elif args.batch:
+        pools = load_identity_pools(seed=42)
+        df = generate_fraud_dataset_batch(num_records=args.num_records, fraud_percentage=0.1, pools=pools)
+    else:
+        df = generate_fraud_dataset(num_records=args.num_records, fraud_percentage=0.1)
+    
+    # Save to CSV (or the --format chosen)
+    Dataset_Output.write_frame(df, Dataset_Output.output_path('fraud_analysis_dataset', args.format),
+                               categorical_columns=CATEGORICAL_COLUMNS,
+                               row_group_size=args.row_group_size, compression=args.compression)
+    print(f"Generated dataset with {len(df)} records")
+    print(f"Fraud records: {df['IsFraud'].sum()}")
+    print("\nSample of fraud patterns:")
     print(df[df['IsFraud'] == 1].head())
\ No newline at end of file
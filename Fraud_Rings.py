@@ -0,0 +1,184 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+import Dataset_Output
+
+# Shared-credential fraud ring detection over Fraud_DataSet output.
+#
+# Each credential is hashed to a uint64 once (streamed from the file, so
+# only 8 bytes per credential stay in memory). Records are linked when they
+# share at least min_shared credentials: every min_shared-sized combination
+# of credential columns is hashed into one key, keys are grouped by sorting,
+# and each group links its members to its first record. The links are
+# merged with an array union-find (hook roots onto the smaller root, then
+# compress paths by pointer jumping), so the whole pass is a few sorts and
+# some vectorized sweeps instead of pairwise comparisons.
+#
+# Requiring two shared credentials is the default because legitimate
+# sellers can collide on one: card numbers are drawn from a finite pool.
+# Planted rings share all three.
+
+CREDENTIAL_COLUMNS = ['Email', 'IPAddress', 'CreditCardNumber']
+LABEL_COLUMN = 'IsFraud'
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def hash_credentials(chunk, columns=CREDENTIAL_COLUMNS):
+    """(rows, columns) uint64 hashes of the credential values; missing values hash to 0."""
+    hashes = np.empty((len(chunk), len(columns)), dtype=np.uint64)
+    for position, column in enumerate(columns):
+        values = chunk[column]
+        hashes[:, position] = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        hashes[values.isna().to_numpy(), position] = 0
+    return hashes
+
+def load_credential_hashes(chunks, columns=CREDENTIAL_COLUMNS):
+    """Hash a chunk stream into (credential hashes, IsFraud labels or None, SellerIDs or None)."""
+    hashes, labels, sellers = [], [], []
+    for chunk in chunks:
+        hashes.append(hash_credentials(chunk, columns))
+        if LABEL_COLUMN in chunk:
+            labels.append(chunk[LABEL_COLUMN].to_numpy(dtype=np.int8))
+        if 'SellerID' in chunk:
+            sellers.append(chunk['SellerID'].to_numpy(dtype=object))
+    if not hashes:
+        return np.empty((0, len(columns)), dtype=np.uint64), None, None
+    return (np.concatenate(hashes),
+            np.concatenate(labels) if len(labels) == len(hashes) else None,
+            np.concatenate(sellers) if len(sellers) == len(hashes) else None)
+
+def read_credential_hashes(path, chunk_size=1_000_000, with_seller_ids=False):
+    """Stream a fraud dataset file (CSV, Parquet or Arrow) into credential hashes and labels."""
+    columns = CREDENTIAL_COLUMNS + [LABEL_COLUMN] + (['SellerID'] if with_seller_ids else [])
+    return load_credential_hashes(Dataset_Output.read_chunks(path, chunk_size, columns=columns))
+
+def combination_keys(hashes, combination):
+    """One uint64 key per row for a combination of credential columns (0 if any is missing)."""
+    key = np.zeros(len(hashes), dtype=np.uint64)
+    missing = np.zeros(len(hashes), dtype=bool)
+    with np.errstate(over='ignore'):
+        for position in combination:
+            column = hashes[:, position]
+            missing |= column == 0
+            key = (key ^ column) * _GOLDEN + np.uint64(position + 1)
+            key ^= key >> np.uint64(29)
+    key[missing] = 0
+    return key
+
+def key_links(keys, max_group_size=None):
+    """(row, first row of its group) pairs for rows sharing a non-zero key.
+
+    Groups larger than max_group_size (hub values such as a shared
+    corporate IP) are skipped.
+    """
+    if not len(keys):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    order = np.argsort(keys, kind='stable')
+    ordered = keys[order]
+    starts = np.flatnonzero(np.concatenate([[True], ordered[1:] != ordered[:-1]]))
+    sizes = np.diff(np.append(starts, len(ordered)))
+    keep = (sizes > 1) & (ordered[starts] != 0)
+    if max_group_size is not None:
+        keep &= sizes <= max_group_size
+    group_first = np.repeat(order[starts], sizes)
+    in_group = np.repeat(keep, sizes)
+    members = order[in_group]
+    return members, group_first[in_group]
+
+def union_find(num_nodes, left, right):
+    """Root (smallest node id) of every node after uniting each left/right pair."""
+    parent = np.arange(num_nodes, dtype=np.int64)
+    while True:
+        root_left, root_right = parent[left], parent[right]
+        pending = root_left != root_right
+        if not pending.any():
+            return parent
+        high = np.maximum(root_left[pending], root_right[pending])
+        low = np.minimum(root_left[pending], root_right[pending])
+        np.minimum.at(parent, high, low)
+        # Path compression: jump every node to its root. Each round doubles
+        # how far up every node points, so it takes about log2(tree depth)
+        # rounds; the number of hooking rounds has no such bound.
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+def detect_fraud_rings(hashes, min_shared=2, max_group_size=None):
+    """Clusters of records sharing at least min_shared credentials.
+
+    Returns a DataFrame of clustered rows only, with 'row' (position in the
+    input), 'cluster' (0 = largest cluster) and 'cluster_size', sorted by
+    cluster then row.
+    """
+    members, firsts = [], []
+    for combination in itertools.combinations(range(hashes.shape[1]), min_shared):
+        linked, first = key_links(combination_keys(hashes, combination), max_group_size)
+        members.append(linked)
+        firsts.append(first)
+    members = np.concatenate(members) if members else np.empty(0, dtype=np.int64)
+    firsts = np.concatenate(firsts) if firsts else np.empty(0, dtype=np.int64)
+
+    # Union-find over the linked rows only, relabelled 0..k-1
+    nodes, compact = np.unique(np.concatenate([members, firsts]), return_inverse=True)
+    roots = union_find(len(nodes), compact[:len(members)], compact[len(members):])
+    _, cluster, sizes = np.unique(roots, return_inverse=True, return_counts=True)
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[np.lexsort((np.arange(len(sizes)), -sizes))] = np.arange(len(sizes))
+    clusters = pd.DataFrame({'row': nodes, 'cluster': rank[cluster], 'cluster_size': sizes[cluster]})
+    return clusters.sort_values(['cluster', 'row'], ignore_index=True)
+
+def evaluate_rings(clusters, is_fraud):
+    """Precision/recall of 'clustered' as a fraud prediction against the IsFraud labels.
+
+    Recall is over every fraud record; only the ones that reused a ring's
+    credentials with another record are detectable this way, which
+    bounds recall well below 1 (30% of fraud records reuse a pattern).
+    """
+    flagged = np.zeros(len(is_fraud), dtype=bool)
+    flagged[clusters['row'].to_numpy()] = True
+    fraud = np.asarray(is_fraud).astype(bool)
+    true_positives = int((flagged & fraud).sum())
+    precision = true_positives / flagged.sum() if flagged.any() else 0.0
+    recall = true_positives / fraud.sum() if fraud.any() else 0.0
+    return {
+        'records': len(fraud),
+        'fraud_records': int(fraud.sum()),
+        'clusters': int(clusters['cluster'].nunique()),
+        'clustered_records': int(flagged.sum()),
+        'largest_cluster': int(clusters['cluster_size'].max()) if len(clusters) else 0,
+        'precision': round(float(precision), 4),
+        'recall': round(float(recall), 4),
+        'f1': round(float(2 * precision * recall / (precision + recall)), 4) if precision + recall else 0.0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect shared-credential fraud rings in a fraud dataset file.")
+    parser.add_argument('path', help="fraud_analysis_dataset CSV, Parquet or Arrow file")
+    parser.add_argument('--min-shared', type=int, default=2, choices=[1, 2, 3],
+                        help="credentials two records must share to be linked")
+    parser.add_argument('--max-group-size', type=int, default=None,
+                        help="ignore credential values shared by more records than this")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--output', help="write clustered rows (with SellerID) to this file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    hashes, labels, sellers = read_credential_hashes(args.path, args.chunk_size, with_seller_ids=bool(args.output))
+    loaded = time.perf_counter()
+    clusters = detect_fraud_rings(hashes, args.min_shared, args.max_group_size)
+    detected = time.perf_counter()
+    print(f"Hashed {len(hashes):,} records in {loaded - started:.1f}s, clustered in {detected - loaded:.1f}s")
+    if labels is not None:
+        for metric, value in evaluate_rings(clusters, labels).items():
+            print(f"{metric}: {value}")
+    if args.output:
+        clusters['SellerID'] = sellers[clusters['row'].to_numpy()]
+        if labels is not None:
+            clusters[LABEL_COLUMN] = labels[clusters['row'].to_numpy()]
+        Dataset_Output.write_frame(clusters, args.output)
+        print(f"Clusters written to '{args.output}'")
@@ -0,0 +1,261 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import Dataset_Output
+
+# Rule-based batch fraud scoring for Fraud_DataSet records.
+#
+# A rule set (column, operator, value, weight) is compiled once into NumPy
+# ufuncs and typed constants; scoring a batch is then one vectorized
+# comparison and one masked add per rule, with no per-row Python.
+# Dictionary/categorical columns are compared on their integer codes
+# through a cached lookup table, so AccountStatus never goes through
+# string comparisons. Batches can be DataFrames, Arrow record batches or
+# tables, or dicts of arrays; chunk streams can be scored on a thread pool
+# (the ufuncs release the GIL).
+
+# Weights follow the gaps between FRAUD_DISTRIBUTIONS and
+# LEGITIMATE_DISTRIBUTIONS in Fraud_DataSet.py
+DEFAULT_RULES = [
+    {'column': 'ReturnRate', 'op': '>', 'value': 0.15, 'weight': 3.0},
+    {'column': 'DisputeCount', 'op': '>=', 'value': 3, 'weight': 3.0},
+    {'column': 'FailedLoginAttempts', 'op': '>', 'value': 3, 'weight': 2.0},
+    {'column': 'CustomerRating', 'op': '<', 'value': 4.0, 'weight': 2.0},
+    {'column': 'AverageTransactionValue', 'op': '>', 'value': 500, 'weight': 2.0},
+    {'column': 'AccountStatus', 'op': 'in', 'value': ['Flagged', 'Under Review'], 'weight': 3.0},
+    {'column': 'VerificationLevel', 'op': '==', 'value': 1, 'weight': 1.0},
+    {'column': 'ShippingSpeedAvg', 'op': '>', 'value': 5.0, 'weight': 1.0},
+    {'column': 'ListingUpdateFrequency', 'op': '>', 'value': 30, 'weight': 1.0},
+    {'column': 'NumSales', 'op': '>', 'value': 1000, 'weight': 1.0},
+    {'column': 'InventoryCount', 'op': '<=', 'value': 100, 'weight': 0.5},
+]
+DEFAULT_THRESHOLD = 6.0
+OPERATORS = {
+    '>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal,
+    '==': np.equal, '!=': np.not_equal,
+}
+
+def compile_rules(rules=DEFAULT_RULES, threshold=DEFAULT_THRESHOLD):
+    """Compile a rule list into the form score_batch evaluates.
+
+    Each rule is {'column', 'op', 'value', 'weight'}; op is a comparison
+    ('>', '>=', '<', '<=', '==', '!='), 'between' (value = (low, high),
+    inclusive) or 'in' (value = list of allowed values).
+    """
+    compiled = []
+    for rule in rules:
+        op = rule['op']
+        if op == 'between':
+            low, high = rule['value']
+            steps = [(np.greater_equal, low), (np.less_equal, high)]
+        elif op == 'in':
+            steps = [('in', frozenset(rule['value']))]
+        elif op in OPERATORS:
+            steps = [(OPERATORS[op], rule['value'])]
+        else:
+            raise ValueError(f"Unknown rule operator: {op}")
+        compiled.append((rule['column'], steps, np.float32(rule['weight'])))
+    return {'rules': compiled, 'columns': sorted({column for column, _, _ in compiled}),
+            'threshold': np.float32(threshold)}
+
+def _column(batch, name):
+    """(values, categories) for a batch column; categories is set for dictionary/categorical columns."""
+    if isinstance(batch, pd.DataFrame):
+        series = batch[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series.cat.codes.to_numpy(), series.cat.categories
+        return series.to_numpy(), None
+    if isinstance(batch, dict):
+        return np.asarray(batch[name]), None
+    column = batch.column(name)
+    if hasattr(column, 'combine_chunks'):
+        column = column.combine_chunks()
+    if hasattr(column, 'dictionary'):
+        return column.indices.fill_null(-1).to_numpy(), column.dictionary.to_pandas()
+    return column.to_numpy(zero_copy_only=False), None
+
+@lru_cache(maxsize=256)
+def _category_table(categories, allowed):
+    """Code -> matches lookup for an 'in' rule; code -1 (missing) picks the trailing False."""
+    return np.array([category in allowed for category in categories] + [False])
+
+def _rule_mask(values, categories, steps):
+    """Boolean mask of the rows matching one compiled rule."""
+    mask = None
+    for op, value in steps:
+        if op == 'in':
+            if categories is not None:
+                step = _category_table(tuple(categories), value)[values]
+            else:
+                step = pd.Series(values).isin(value).to_numpy()
+        elif categories is not None:
+            step = op(np.asarray(categories)[values], value) & (values >= 0)
+        else:
+            step = op(values, value)
+        mask = step if mask is None else mask & step
+    return mask
+
+def score_batch(compiled, batch):
+    """float32 fraud score per row: the summed weights of the rules each row matches."""
+    columns = {name: _column(batch, name) for name in compiled['columns']}
+    rows = len(next(iter(columns.values()))[0]) if columns else len(batch)
+    scores = np.zeros(rows, dtype=np.float32)
+    for name, steps, weight in compiled['rules']:
+        values, categories = columns[name]
+        np.add(scores, weight, out=scores, where=_rule_mask(values, categories, steps))
+    return scores
+
+def flag_batch(compiled, batch):
+    """Scores and flags (score >= threshold) for a batch."""
+    scores = score_batch(compiled, batch)
+    return scores, scores >= compiled['threshold']
+
+def score_chunks(compiled, chunks, workers=None):
+    """Score a chunk stream on a thread pool, yielding score arrays in chunk order.
+
+    workers=1 scores in the calling thread; None uses os.cpu_count().
+    """
+    for _, scores in scored_chunks(compiled, chunks, workers):
+        yield scores
+
+def scored_chunks(compiled, chunks, workers=None):
+    """Like score_chunks, but yields (chunk, scores) pairs.
+
+    The stream is read lazily: at most two chunks per worker are being
+    scored or waiting to be yielded at any time.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield chunk, score_batch(compiled, chunk)
+        return
+    chunks = iter(chunks)
+    pending = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.append((chunk, executor.submit(score_batch, compiled, chunk)))
+            if not pending:
+                return
+            chunk, future = pending.pop(0)
+            yield chunk, future.result()
+
+def confusion_counts(scores, is_fraud, threshold=DEFAULT_THRESHOLD):
+    """(flagged, fraud, true positive) counts for one batch; sum them across chunks."""
+    flagged = np.asarray(scores) >= threshold
+    fraud = np.asarray(is_fraud).astype(bool)
+    return np.array([flagged.sum(), fraud.sum(), (flagged & fraud).sum()], dtype=np.int64)
+
+def metrics_from_counts(counts):
+    """evaluate_scores' metrics from summed confusion_counts."""
+    flagged, fraud, true_positives = (int(value) for value in counts)
+    precision = true_positives / flagged if flagged else 0.0
+    recall = true_positives / fraud if fraud else 0.0
+    return {
+        'flagged': flagged,
+        'precision': round(float(precision), 4),
+        'recall': round(float(recall), 4),
+        'f1': round(float(2 * precision * recall / (precision + recall)), 4) if precision + recall else 0.0,
+    }
+
+def evaluate_scores(scores, is_fraud, threshold=DEFAULT_THRESHOLD):
+    """Precision, recall and F1 of score >= threshold against IsFraud."""
+    return metrics_from_counts(confusion_counts(scores, is_fraud, threshold))
+
+def benchmark_scoring(num_records=1_000_000, chunk_size=100_000, workers=(1, 2, 4),
+                      small_batch_sizes=(1, 10, 100, 1000), latency_samples=2000, compiled=None):
+    """Rows/sec for bulk and threaded chunk scoring, and latency percentiles for small batches.
+
+    Data comes from Fraud_DataSet's batch engine (needs faker). Returns
+    (throughput rows, latency rows) as lists of dicts, and prints both.
+    """
+    import pyarrow as pa
+    import Fraud_DataSet
+
+    if compiled is None:
+        compiled = compile_rules()
+    df = Fraud_DataSet.generate_fraud_dataset_batch(num_records)
+    df['AccountStatus'] = pd.Categorical(df['AccountStatus'])
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    chunks = [df.iloc[start:start + chunk_size] for start in range(0, num_records, chunk_size)]
+
+    throughput = []
+    for label, run in [('DataFrame bulk', lambda: score_batch(compiled, df)),
+                       ('Arrow table bulk', lambda: score_batch(compiled, table))]:
+        started = time.perf_counter()
+        run()
+        throughput.append({'path': label, 'rows_per_sec': round(num_records / (time.perf_counter() - started))})
+    for count in workers:
+        started = time.perf_counter()
+        for _ in score_chunks(compiled, chunks, workers=count):
+            pass
+        throughput.append({'path': f'{count} thread(s), {chunk_size:,}-row chunks',
+                           'rows_per_sec': round(num_records / (time.perf_counter() - started))})
+
+    latency = []
+    rng = np.random.default_rng(0)
+    for size in small_batch_sizes:
+        starts = rng.integers(0, max(num_records - size, 1), size=latency_samples)
+        timings = np.empty(latency_samples)
+        for position, start in enumerate(starts):
+            batch = df.iloc[start:start + size]
+            began = time.perf_counter()
+            score_batch(compiled, batch)
+            timings[position] = time.perf_counter() - began
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99]) * 1e6
+        latency.append({'batch_rows': size, 'p50_us': round(p50, 1), 'p95_us': round(p95, 1),
+                        'p99_us': round(p99, 1), 'max_us': round(timings.max() * 1e6, 1)})
+
+    print(pd.DataFrame(throughput).to_markdown(index=False))
+    print(pd.DataFrame(latency).to_markdown(index=False))
+    print(evaluate_scores(score_batch(compiled, df), df['IsFraud'], compiled['threshold']))
+    return throughput, latency
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score sellers in a fraud dataset file with the compiled rule set.")
+    parser.add_argument('path', nargs='?', help="fraud_analysis_dataset CSV, Parquet or Arrow file")
+    parser.add_argument('--benchmark', action='store_true', help="report rows/sec and small-batch latency")
+    parser.add_argument('--num-records', type=int, default=1_000_000, help="rows generated for --benchmark")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=None, help="scoring threads")
+    parser.add_argument('--output', help="write SellerID, FraudScore and FraudFlag to this file")
+    args = parser.parse_args()
+
+    compiled = compile_rules(threshold=args.threshold)
+    if args.benchmark or not args.path:
+        benchmark_scoring(args.num_records, compiled=compiled)
+        raise SystemExit
+
+    # One chunk at a time: score, count against IsFraud, hand the scores to the writer
+    counts = {'labelled': True, 'confusion': np.zeros(3, dtype=np.int64)}
+
+    def score_frames():
+        for chunk, scores in scored_chunks(compiled, Dataset_Output.read_chunks(args.path, args.chunk_size),
+                                           args.workers):
+            if 'IsFraud' in chunk:
+                counts['confusion'] += confusion_counts(scores, chunk['IsFraud'].to_numpy(), args.threshold)
+            else:
+                counts['labelled'] = False
+            yield pd.DataFrame({'SellerID': chunk['SellerID'].to_numpy(dtype=object), 'FraudScore': scores,
+                                'FraudFlag': scores >= args.threshold})
+
+    if args.output:
+        Dataset_Output.write_chunks(score_frames(), args.output)
+    else:
+        for _ in score_frames():
+            pass
+    if counts['labelled']:
+        print(metrics_from_counts(counts['confusion']))
+    if args.output:
+        print(f"Scores written to '{args.output}'")
@@ -0,0 +1,275 @@
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+# Named spans and counters around the generators' hot stages.
+#
+# Disabled (the default), span() hands back one shared no-op context
+# manager and count() returns after a flag check, so instrumented code
+# pays about a function call per stage. Enabled, every span records its
+# start, duration, thread and nesting, counters keep running totals plus
+# timestamped samples, and the result can be exported as a JSON-lines log
+# or a Chrome trace (open in chrome://tracing or ui.perfetto.dev). One
+# span name can additionally be profiled with cProfile or tracemalloc.
+#
+# Spans are recorded per process: shards generated in Shard_Pool worker
+# processes appear only as the parent's shards.generate span. Setting
+# GENERATOR_TRACE=path (with an optional {pid} placeholder) enables
+# recording at import and writes the trace at exit, in any process.
+
+TRACE_ENV = 'GENERATOR_TRACE'
+PROFILE_MODES = ['cprofile', 'tracemalloc']
+PROFILE_TOP = 25
+
+_state = {
+    'enabled': False,
+    'origin_ns': time.perf_counter_ns(),
+    'spans': [], 'counters': {}, 'samples': [],
+    'profile_span': None, 'profile_mode': 'cprofile', 'profiler': None, 'profile_depth': 0,
+    'profile_report': None, 'allocation_peak': 0,
+}
+_local = threading.local()
+
+class _NullSpan:
+    """What span() returns while instrumentation is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """One timed stage; set() attaches values (row counts, sizes) to it."""
+    __slots__ = ('name', 'args', 'start_ns', 'depth')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.depth = len(stack)
+        stack.append(self.name)
+        if self.name == _state['profile_span']:
+            _start_profile()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end_ns = time.perf_counter_ns()
+        if self.name == _state['profile_span']:
+            _stop_profile(self)
+        _local.stack.pop()
+        _state['spans'].append({
+            'name': self.name,
+            'start_us': (self.start_ns - _state['origin_ns']) / 1000,
+            'duration_us': (end_ns - self.start_ns) / 1000,
+            'depth': self.depth,
+            'parent': _local.stack[-1] if _local.stack else None,
+            'pid': os.getpid(), 'tid': threading.get_ident(),
+            'args': self.args,
+            'error': exc_info[0].__name__ if exc_info[0] is not None else None,
+        })
+        return False
+
+def span(name, **args):
+    """Context manager timing one stage: with span('circle.sort', rows=n): ..."""
+    if not _state['enabled']:
+        return _NULL_SPAN
+    return Span(name, args)
+
+def traced(name):
+    """Decorator recording every call of a function as a span."""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state['enabled']:
+                return function(*args, **kwargs)
+            with Span(name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(name, value=1):
+    """Add value to a named counter (rows generated, bytes written, ...)."""
+    if not _state['enabled']:
+        return
+    total = _state['counters'].get(name, 0) + value
+    _state['counters'][name] = total
+    _state['samples'].append((name, (time.perf_counter_ns() - _state['origin_ns']) / 1000, total))
+
+def is_enabled():
+    return _state['enabled']
+
+def enable(profile_span=None, profile_mode='cprofile'):
+    """Start recording, clearing anything recorded before.
+
+    profile_span names one span to run under cProfile (call statistics)
+    or tracemalloc (allocation peak and top allocating lines).
+    """
+    if profile_mode not in PROFILE_MODES:
+        raise ValueError(f"profile_mode must be one of {PROFILE_MODES}")
+    reset()
+    _state.update(enabled=True, profile_span=profile_span, profile_mode=profile_mode)
+
+def disable():
+    """Stop recording; what was recorded stays available until reset() or enable()."""
+    _state['enabled'] = False
+
+def reset():
+    """Drop recorded spans, counters and profile results."""
+    _state.update(origin_ns=time.perf_counter_ns(), spans=[], counters={}, samples=[],
+                  profiler=None, profile_depth=0, profile_report=None, allocation_peak=0)
+
+# --- Stage profiling ---
+
+def _start_profile():
+    _state['profile_depth'] += 1
+    if _state['profile_depth'] > 1:
+        return
+    if _state['profile_mode'] == 'cprofile':
+        if _state['profiler'] is None:
+            _state['profiler'] = cProfile.Profile()
+        _state['profiler'].enable()
+    else:
+        tracemalloc.start()
+
+def _stop_profile(current):
+    _state['profile_depth'] -= 1
+    if _state['profile_depth'] > 0:
+        return
+    if _state['profile_mode'] == 'cprofile':
+        _state['profiler'].disable()
+        output = io.StringIO()
+        pstats.Stats(_state['profiler'], stream=output).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        _state['profile_report'] = output.getvalue()
+        return
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    current.args['allocation_peak_mb'] = round(peak / 1e6, 2)
+    # Keep the allocation breakdown of the occurrence with the highest peak
+    if peak >= _state['allocation_peak']:
+        _state['allocation_peak'] = peak
+        lines = [f"Allocation peak {peak / 1e6:.1f} MB in {current.name}; top lines by size held at exit:"]
+        lines += [str(stat) for stat in snapshot.statistics('lineno')[:PROFILE_TOP]]
+        _state['profile_report'] = '\n'.join(lines)
+
+def profile_report():
+    """Text report for the profiled span (None if it has not run)."""
+    return _state['profile_report']
+
+# --- Export ---
+
+def spans():
+    """Finished spans in completion order."""
+    return list(_state['spans'])
+
+def counters():
+    """Counter totals."""
+    return dict(_state['counters'])
+
+def summary():
+    """Per span name: calls, total/mean/max seconds and share of the top-level time, slowest first."""
+    totals = {}
+    for record in _state['spans']:
+        entry = totals.setdefault(record['name'], {'span': record['name'], 'calls': 0, 'total_s': 0.0,
+                                                   'max_s': 0.0, 'depth': record['depth']})
+        seconds = record['duration_us'] / 1e6
+        entry['calls'] += 1
+        entry['total_s'] += seconds
+        entry['max_s'] = max(entry['max_s'], seconds)
+        entry['depth'] = min(entry['depth'], record['depth'])
+    top_level = sum(entry['total_s'] for entry in totals.values() if entry['depth'] == 0) or 1.0
+    rows = []
+    for entry in sorted(totals.values(), key=lambda entry: -entry['total_s']):
+        rows.append({'span': entry['span'], 'calls': entry['calls'], 'total_s': round(entry['total_s'], 4),
+                     'mean_s': round(entry['total_s'] / entry['calls'], 4), 'max_s': round(entry['max_s'], 4),
+                     'share': round(entry['total_s'] / top_level, 3)})
+    return rows
+
+def write_log(path):
+    """Write spans, then counter totals, as one JSON object per line."""
+    with open(path, 'w') as handle:
+        for record in _state['spans']:
+            handle.write(json.dumps({'type': 'span', **record}, default=str) + '\n')
+        for name, total in _state['counters'].items():
+            handle.write(json.dumps({'type': 'counter', 'name': name, 'value': total}) + '\n')
+    return path
+
+def chrome_trace_events():
+    """Spans as complete ('X') events and counters as counter ('C') events, in microseconds."""
+    events = [{'name': record['name'], 'ph': 'X', 'ts': record['start_us'], 'dur': record['duration_us'],
+               'pid': record['pid'], 'tid': record['tid'], 'args': record['args']}
+              for record in _state['spans']]
+    events += [{'name': name, 'ph': 'C', 'ts': timestamp, 'pid': os.getpid(), 'args': {name: total}}
+               for name, timestamp, total in _state['samples']]
+    return events
+
+def write_chrome_trace(path):
+    """Write a Chrome trace-event JSON file."""
+    with open(path, 'w') as handle:
+        json.dump({'traceEvents': chrome_trace_events(), 'displayTimeUnit': 'ms'}, handle, default=str)
+    return path
+
+def write_trace(path):
+    """JSON-lines log for .jsonl/.log paths, Chrome trace otherwise."""
+    if path.lower().endswith(('.jsonl', '.log')):
+        return write_log(path)
+    return write_chrome_trace(path)
+
+# --- Script integration ---
+
+def add_instrumentation_arguments(parser):
+    """Add the shared --trace / --profile-span / --profile-mode options to a script's parser."""
+    parser.add_argument('--trace', metavar='PATH',
+                        help="record stage spans and write them to PATH (.json Chrome trace, .jsonl log)")
+    parser.add_argument('--profile-span', metavar='NAME', help="profile one span, e.g. circle.sort")
+    parser.add_argument('--profile-mode', choices=PROFILE_MODES, default='cprofile')
+
+def start_from_args(args):
+    """Enable recording if --trace or --profile-span was given."""
+    if args.trace or args.profile_span:
+        enable(args.profile_span, args.profile_mode)
+
+def finish_from_args(args):
+    """Write the trace and print the span summary and profile report requested on the command line."""
+    if not is_enabled():
+        return
+    disable()
+    if args.trace:
+        write_trace(args.trace)
+        print(f"\nTrace written to '{args.trace}'")
+    for row in summary():
+        print(f"{row['span']:<32} {row['calls']:>6} calls {row['total_s']:>10.4f}s {row['share']:>7.1%}")
+    for name, total in counters().items():
+        print(f"{name:<32} {total:>,}")
+    if profile_report():
+        print(f"\n{profile_report()}")
+
+def _write_env_trace(path):
+    disable()
+    write_trace(path.replace('{pid}', str(os.getpid())))
+
+if os.environ.get(TRACE_ENV):
+    enable()
+    atexit.register(_write_env_trace, os.environ[TRACE_ENV])
@@ -1,84 +1,198 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 import numpy as np
-import ipywidgets as widgets
-from IPython.display import display
+import pandas as pd
+
+import Dataset_Output
+import Shard_Pool
 
-def generate_inventory_dashboard():
+# Importing this file has no side effects and only needs pandas/NumPy:
+# matplotlib and seaborn are imported when a figure is rendered, and
+# ipywidgets/IPython only by the interactive dashboard. Headless reports
+# render every warehouse view to PNG/SVG in worker processes on the
+# non-interactive Agg backend.
+
+# Dashboard panels: (metric, title, y-axis label, palette)
+PANELS = [
+    ('Inventory_Turnover', 'Inventory Turnover', 'Turnover Ratio', 'viridis'),
+    ('Stockout_Rate', 'Stockout Rate', 'Stockout Rate (%)', 'coolwarm'),
+    ('On_Time_Delivery', 'On-Time Delivery', 'Percentage (%)', 'Blues'),
+    ('Lost_Sales', 'Lost Sales', 'Amount ($)', 'Oranges'),
+    ('Return_Rate', 'Return Rate', 'Percentage (%)', 'Purples'),
+    ('Backorder_Rate', 'Backorder Rate', 'Percentage (%)', 'Reds'),
+]
+FIGURE_CACHE_SIZE = 64
+MAX_BAR_LABELS = 50
+REPORT_FORMATS = ['png', 'svg']
+REPORT_BATCH_SIZE = 25
+
+def generate_inventory_data(num_rows=100, warehouses=None):
+    """Sample inventory rows: one warehouse label and 12 metrics per row."""
     # Expanded Sample Data
     np.random.seed(42)
-    warehouses = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
-    num_warehouses = len(warehouses)
+    if warehouses is None:
+        warehouses = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
     
     data = {
-        'Warehouse': np.random.choice(warehouses, 100),
-        'Inventory_Turnover': np.random.uniform(1.5, 12, 100),
-        'Stockout_Rate': np.random.uniform(0, 20, 100),
-        'Order_Fulfillment_Time': np.random.uniform(12, 96, 100),
-        'Safety_Incidents': np.random.randint(0, 15, 100),
-        'On_Time_Delivery': np.random.uniform(75, 100, 100),
-        'Order_Accuracy': np.random.uniform(80, 100, 100),
-        'Carrying_Cost': np.random.uniform(3, 25, 100),
-        'Warehouse_Utilization': np.random.uniform(45, 98, 100),
-        'Order_Picking_Accuracy': np.random.uniform(85, 99, 100),
-        'Lost_Sales': np.random.uniform(5000, 50000, 100),
-        'Return_Rate': np.random.uniform(0, 10, 100),
-        'Backorder_Rate': np.random.uniform(0, 15, 100)
+        'Warehouse': np.random.choice(warehouses, num_rows),
+        'Inventory_Turnover': np.random.uniform(1.5, 12, num_rows),
+        'Stockout_Rate': np.random.uniform(0, 20, num_rows),
+        'Order_Fulfillment_Time': np.random.uniform(12, 96, num_rows),
+        'Safety_Incidents': np.random.randint(0, 15, num_rows),
+        'On_Time_Delivery': np.random.uniform(75, 100, num_rows),
+        'Order_Accuracy': np.random.uniform(80, 100, num_rows),
+        'Carrying_Cost': np.random.uniform(3, 25, num_rows),
+        'Warehouse_Utilization': np.random.uniform(45, 98, num_rows),
+        'Order_Picking_Accuracy': np.random.uniform(85, 99, num_rows),
+        'Lost_Sales': np.random.uniform(5000, 50000, num_rows),
+        'Return_Rate': np.random.uniform(0, 10, num_rows),
+        'Backorder_Rate': np.random.uniform(0, 15, num_rows)
     }
     
-    df = pd.DataFrame(data)
+    return pd.DataFrame(data)
+
+def build_warehouse_aggregates(df):
+    """Mean, 95% CI half-width and row count of every metric per warehouse, in one groupby.
+
+    The CI is the normal approximation 1.96 * std / sqrt(n), so no raw rows
+    are needed once this table exists.
+    """
+    metrics = [column for column in df.columns if column != 'Warehouse']
+    stats = df.groupby('Warehouse', observed=True, sort=True)[metrics].agg(['mean', 'std', 'count'])
+    for metric in metrics:
+        stats[(metric, 'ci')] = 1.96 * stats[(metric, 'std')].fillna(0) / np.sqrt(stats[(metric, 'count')])
+    return stats.sort_index(axis=1)
+
+def render_dashboard(aggregates, warehouse='All'):
+    """Draw the six panels from precomputed aggregates for one warehouse (or 'All')."""
+    selected = aggregates if warehouse == 'All' else aggregates.loc[[warehouse]]
+    labels = selected.index.astype(str)
+    positions = np.arange(len(labels))
+
+    from matplotlib.figure import Figure
+    import seaborn as sns
+
+    fig = Figure(figsize=(15, 8))
+    for number, (metric, title, ylabel, palette) in enumerate(PANELS, start=1):
+        ax = fig.add_subplot(2, 3, number)
+        mean, ci = selected[(metric, 'mean')].to_numpy(), selected[(metric, 'ci')].to_numpy()
+        if len(labels) <= MAX_BAR_LABELS:
+            ax.bar(positions, mean, yerr=ci, color=sns.color_palette(palette, len(labels)), capsize=2)
+            ax.set_xticks(positions, labels)
+        else:
+            # Thousands of warehouses: one filled step artist and one line collection instead of a patch per bar
+            ax.stairs(mean, np.arange(len(labels) + 1) - 0.5, fill=True, color=sns.color_palette(palette, 3)[1])
+            ax.vlines(positions, mean - ci, mean + ci, color='black', linewidth=0.5)
+            ax.set_xticks([])
+        ax.set_xlabel('Warehouse')
+        ax.set_title(title)
+        ax.set_ylabel(ylabel)
+    fig.tight_layout()
+    return fig
+
+def generate_inventory_dashboard(num_rows=100, warehouses=None):
+    """Interactive notebook dashboard with a warehouse dropdown."""
+    import ipywidgets as widgets
+    from IPython.display import display
+
+    df = generate_inventory_data(num_rows, warehouses)
     
     # Display Data
     print(df)
     
+    # Per-warehouse aggregates, computed once; filter changes only redraw them
+    aggregates = build_warehouse_aggregates(df)
+
     # Filters
     warehouse_filter = widgets.Dropdown(
-        options=['All'] + list(set(df['Warehouse'])),
+        options=['All'] + list(aggregates.index),
         value='All',
         description='Warehouse:'
     )
-    
+
+    @lru_cache(maxsize=FIGURE_CACHE_SIZE)
+    def dashboard_figure(warehouse):
+        return render_dashboard(aggregates, warehouse)
+
     def update_dashboard(warehouse):
-        filtered_df = df if warehouse == 'All' else df[df['Warehouse'] == warehouse]
-        
-        plt.figure(figsize=(15, 8))
-        
-        plt.subplot(2, 3, 1)
-        sns.barplot(x='Warehouse', y='Inventory_Turnover', data=filtered_df, palette='viridis')
-        plt.title('Inventory Turnover')
-        plt.ylabel('Turnover Ratio')
-        
-        plt.subplot(2, 3, 2)
-        sns.barplot(x='Warehouse', y='Stockout_Rate', data=filtered_df, palette='coolwarm')
-        plt.title('Stockout Rate')
-        plt.ylabel('Stockout Rate (%)')
-        
-        plt.subplot(2, 3, 3)
-        sns.barplot(x='Warehouse', y='On_Time_Delivery', data=filtered_df, palette='Blues')
-        plt.title('On-Time Delivery')
-        plt.ylabel('Percentage (%)')
-        
-        plt.subplot(2, 3, 4)
-        sns.barplot(x='Warehouse', y='Lost_Sales', data=filtered_df, palette='Oranges')
-        plt.title('Lost Sales')
-        plt.ylabel('Amount ($)')
-        
-        plt.subplot(2, 3, 5)
-        sns.barplot(x='Warehouse', y='Return_Rate', data=filtered_df, palette='Purples')
-        plt.title('Return Rate')
-        plt.ylabel('Percentage (%)')
-        
-        plt.subplot(2, 3, 6)
-        sns.barplot(x='Warehouse', y='Backorder_Rate', data=filtered_df, palette='Reds')
-        plt.title('Backorder Rate')
-        plt.ylabel('Percentage (%)')
-        
-        plt.tight_layout()
-        plt.show()
-    
+        display(dashboard_figure(warehouse))
+
     display(warehouse_filter)
     widgets.interactive(update_dashboard, warehouse=warehouse_filter)
-    
-# Run the dashboard function
-generate_inventory_dashboard()
+
+# --- Headless Reports ---
+def report_filename(warehouse, file_format):
+    """File name for a warehouse view, safe for any warehouse label."""
+    return 'inventory_dashboard_' + re.sub(r'[^\w.-]', '_', str(warehouse)) + '.' + file_format
+
+def render_report_batch(aggregates, views, output_dir, formats=('png',), dpi=100):
+    """Render views (warehouse labels or 'All') to files on the Agg backend; returns the paths."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    paths = []
+    for warehouse in views:
+        fig = render_dashboard(aggregates, warehouse)
+        FigureCanvasAgg(fig)  # draw on Agg whatever the session's backend is
+        for file_format in formats:
+            path = os.path.join(output_dir, report_filename(warehouse, file_format))
+            fig.savefig(path, format=file_format, dpi=dpi)
+            paths.append(path)
+    return paths
+
+def render_warehouse_reports(aggregates, output_dir, formats=('png',), views=None, workers=None,
+                             dpi=100, batch_size=REPORT_BATCH_SIZE):
+    """Render the 'All' view and every warehouse view to output_dir across worker processes.
+
+    views defaults to 'All' plus every warehouse in aggregates. Views are
+    sent to workers in batches of batch_size together with the (small)
+    aggregate table; workers=1 renders in-process. Returns the written paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if views is None:
+        views = ['All'] + list(aggregates.index)
+    batches = [views[start:start + batch_size] for start in range(0, len(views), batch_size)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(batches)))
+    if workers == 1:
+        return [path for batch in batches for path in render_report_batch(aggregates, batch, output_dir, formats, dpi)]
+
+    script_path = os.path.abspath(__file__)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(Shard_Pool.call_script, [script_path] * len(batches),
+                               ['render_report_batch'] * len(batches), [aggregates] * len(batches),
+                               batches, [output_dir] * len(batches), [tuple(formats)] * len(batches),
+                               [dpi] * len(batches))
+        return [path for paths in results for path in paths]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inventory Health Dashboard (interactive, or headless reports).")
+    parser.add_argument('--headless', metavar='OUTPUT_DIR', help="render every warehouse view to files in OUTPUT_DIR")
+    parser.add_argument('--input', help="inventory rows (CSV/Parquet/Arrow) instead of generated sample data")
+    parser.add_argument('--num-rows', type=int, default=100)
+    parser.add_argument('--num-warehouses', type=int, default=None,
+                        help="generate this many warehouses (W0001, ...) instead of A-J")
+    parser.add_argument('--formats', nargs='+', choices=REPORT_FORMATS, default=['png'])
+    parser.add_argument('--workers', type=int, default=None, help="rendering processes for --headless")
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args()
+
+    warehouses = None
+    if args.num_warehouses:
+        warehouses = [f"W{number:04d}" for number in range(1, args.num_warehouses + 1)]
+
+    if not args.headless:
+        # Run the dashboard function
+        generate_inventory_dashboard(args.num_rows, warehouses)
+    else:
+        if args.input:
+            df = pd.concat(Dataset_Output.read_chunks(args.input), ignore_index=True)
+        else:
+            df = generate_inventory_data(args.num_rows, warehouses)
+        paths = render_warehouse_reports(build_warehouse_aggregates(df), args.headless, args.formats,
+                                         workers=args.workers, dpi=args.dpi)
+        print(f"Rendered {len(paths)} report files to '{args.headless}'")
@@ -1,8 +1,12 @@
 import pandas as pd
 import numpy as np
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 import os # Added to potentially help with path construction if needed, though not strictly necessary here
+import argparse
+
+import Dataset_Output
+import Instrumentation
+import Shard_Pool
 
 # --- Configuration for Data Generation ---
 num_records = 2000  # Number of subscription events/transactions to generate
@@ -38,112 +42,476 @@ product_ids = list(products.keys())
 event_types = ["New Subscription", "Renewal", "Upgrade", "Downgrade", "Cancellation"]
 billing_status = ["Billed - Paid", "Billed - Pending Payment", "Billed - Overdue", "Not Billed Yet"]
 sales_reps = ["SR001", "SR002", "SR003", "SR004", "SR005"]
+billing_status_values = billing_status + ["N/A"] # "N/A" is used for cancellations
+
+# Low-cardinality columns stored as dictionary columns in Parquet/Arrow output
+CATEGORICAL_COLUMNS = {
+    "PartnerID": [str(partner_id) for partner_id in partner_ids],
+    "PartnerName": [info["name"] for info in partners.values()],
+    "PartnerSegment": sorted({info["segment"] for info in partners.values()}),
+    "PartnerRegion": sorted({info["region"] for info in partners.values()}),
+    "ProductID": [str(product_id) for product_id in product_ids],
+    "ProductName": [info["name"] for info in products.values()],
+    "VendorName": sorted({info["vendor"] for info in products.values()}),
+    "ProductCategory": sorted({info["category"] for info in products.values()}),
+    "EventType": event_types,
+    "BillingStatus": billing_status_values,
+    "SalesRepresentative": sales_reps,
+}
 
-# --- Helper Functions ---
-def random_date(start, end):
-    """Generate a random datetime between start and end."""
-    return start + timedelta(
-        # Get a random amount of seconds between start and end
-        seconds=random.randint(0, int((end - start).total_seconds())),
-    )
+# --- Lookup Tables for the Array Engine ---
+event_type_weights = [0.4, 0.3, 0.1, 0.05, 0.15]
+cancellation_code = event_types.index("Cancellation")
+new_subscription_code = event_types.index("New Subscription")
+not_applicable_billing_code = billing_status_values.index("N/A")
+is_infrastructure_product = np.array([products[product_id]["category"] == "Infrastructure" for product_id in product_ids])
+subscription_terms_days = np.array([30, 90, 365]) # Non-infra products have defined terms
+start_date64 = np.datetime64(start_date, 's')
+total_seconds = int((end_date - start_date).total_seconds())
+ONE_DAY = np.timedelta64(86400, 's')
+
+# Object lookup tables for the wide columns, indexed by fact keys/codes
+partner_lookup = {
+    "PartnerID": np.array([str(partner_id) for partner_id in partner_ids], dtype=object),
+    "PartnerName": np.array([partners[partner_id]["name"] for partner_id in partner_ids], dtype=object),
+    "PartnerSegment": np.array([partners[partner_id]["segment"] for partner_id in partner_ids], dtype=object),
+    "PartnerRegion": np.array([partners[partner_id]["region"] for partner_id in partner_ids], dtype=object),
+}
+product_lookup = {
+    "ProductID": np.array([str(product_id) for product_id in product_ids], dtype=object),
+    "ProductName": np.array([products[product_id]["name"] for product_id in product_ids], dtype=object),
+    "VendorName": np.array([products[product_id]["vendor"] for product_id in product_ids], dtype=object),
+    "ProductCategory": np.array([products[product_id]["category"] for product_id in product_ids], dtype=object),
+}
 
 # --- Generate Data ---
-data = []
-for i in range(num_records):
-    event_id = 50000 + i
-    partner_id = random.choice(partner_ids)
-    partner_info = partners[partner_id]
-    product_id = random.choice(product_ids)
-    product_info = products[product_id]
-    event_type = random.choices(event_types, weights=[0.4, 0.3, 0.1, 0.05, 0.15], k=1)[0]
-    event_date = random_date(start_date, end_date)
+@Instrumentation.traced('pax8.generate_facts')
+def generate_subscription_facts(start, stop, seed_sequence=None, seed=42):
+    """Fact rows (integer keys, dates, Quantity, MRR, codes) for events start..stop-1.
+
+    Every column is drawn as a typed array: dates are datetime64, and the
+    Infrastructure and Cancellation rules are applied as masks. All
+    randomness comes from seed_sequence (default SeedSequence(seed)), so a
+    shard's events are reproducible on any worker.
+    """
+    if seed_sequence is None:
+        seed_sequence = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_sequence)
+    size = stop - start
+
+    partner = rng.integers(0, len(partner_ids), size=size).astype(np.int16)
+    product = rng.integers(0, len(product_ids), size=size).astype(np.int16)
+    weights = np.array(event_type_weights)
+    event = rng.choice(len(event_types), size=size, p=weights / weights.sum()).astype(np.int8)
+    event_timestamp = start_date64 + rng.integers(0, total_seconds + 1, size=size) * np.timedelta64(1, 's')
+    event_date = event_timestamp.astype('datetime64[D]').astype('datetime64[s]')
 
     # Simulate some logic based on event type
-    quantity = random.randint(1, 250) if product_info["category"] != "Infrastructure" else 1
-    mrr = 0
-    if event_type != "Cancellation":
-         # Simulate MRR based on product and quantity, add some randomness
-         base_mrr = random.uniform(5, 50) if product_info["category"] != "Infrastructure" else random.uniform(50, 5000)
-         mrr = round(base_mrr * quantity * random.uniform(0.9, 1.1), 2)
-
-
-    sub_start_date = event_date - timedelta(days=random.randint(0, 30)) if event_type == "New Subscription" else event_date - timedelta(days=random.randint(30, 365))
-    sub_end_date = None
-    if event_type == "Cancellation":
-         sub_end_date = event_date + timedelta(days=random.randint(1, 30))
-         quantity = 0 # Cancelled means 0 quantity going forward
-         mrr = 0
-    elif product_info["category"] != "Infrastructure": # Assume non-infra has defined terms
-         sub_end_date = sub_start_date + timedelta(days=random.choice([30, 90, 365]))
-
-
-    data.append({
-        "EventID": event_id,
-        "PartnerID": partner_id,
-        "PartnerName": partner_info["name"],
-        "PartnerSegment": partner_info["segment"],
-        "PartnerRegion": partner_info["region"],
-        "ProductID": product_id,
-        "ProductName": product_info["name"],
-        "VendorName": product_info["vendor"],
-        "ProductCategory": product_info["category"],
-        "EventType": event_type,
-        "EventDate": event_date.date(), # Store as date object
-        "EventTimestamp": event_date, # Store full timestamp
-        "SubscriptionStartDate": sub_start_date.date(),
-        "SubscriptionEndDate": sub_end_date.date() if sub_end_date else None,
+    infrastructure = is_infrastructure_product[product]
+    cancellation = event == cancellation_code
+    quantity = np.where(infrastructure, 1, rng.integers(1, 251, size=size)).astype(np.int32)
+    # Simulate MRR based on product and quantity, add some randomness
+    base_mrr = np.where(infrastructure, rng.uniform(50, 5000, size=size), rng.uniform(5, 50, size=size))
+    mrr = np.round(base_mrr * quantity * rng.uniform(0.9, 1.1, size=size), 2)
+
+    sub_start_days = np.where(event == new_subscription_code,
+                              rng.integers(0, 31, size=size), rng.integers(30, 366, size=size))
+    sub_start_timestamp = event_timestamp - sub_start_days * ONE_DAY
+    term = subscription_terms_days[rng.integers(0, len(subscription_terms_days), size=size)]
+    cancel_days = rng.integers(1, 31, size=size)
+    sub_end_timestamp = np.where(cancellation, event_timestamp + cancel_days * ONE_DAY,
+                                 sub_start_timestamp + term * ONE_DAY)
+    sub_end_timestamp[~cancellation & infrastructure] = np.datetime64('NaT')
+
+    # Cancelled means 0 quantity and MRR going forward
+    quantity[cancellation] = 0
+    mrr[cancellation] = 0.0
+
+    billing = np.where(cancellation, not_applicable_billing_code,
+                       rng.integers(0, len(billing_status), size=size)).astype(np.int8)
+
+    columns = {
+        "EventID": 50000 + np.arange(start, stop, dtype=np.int64),
+        "PartnerKey": partner,
+        "ProductKey": product,
+        "EventTypeCode": event,
+        "BillingStatusCode": billing,
+        "SalesRepKey": rng.integers(0, len(sales_reps), size=size).astype(np.int8),
+        "EventDate": event_date,
+        "EventTimestamp": event_timestamp,
+        "SubscriptionStartDate": sub_start_timestamp.astype('datetime64[D]').astype('datetime64[s]'),
+        "SubscriptionEndDate": sub_end_timestamp.astype('datetime64[D]').astype('datetime64[s]'),
         "Quantity": quantity,
         "MonthlyRecurringRevenue (MRR)": mrr,
-        "BillingStatus": random.choice(billing_status) if event_type != "Cancellation" else "N/A",
-        "SalesRepresentative": random.choice(sales_reps),
-        "SupportTicketRelated": random.choices([True, False], weights=[0.1, 0.9], k=1)[0] # Small chance a support ticket was related
-    })
-
-# --- Create DataFrame ---
-df = pd.DataFrame(data)
-
-# Ensure correct data types
-df['EventDate'] = pd.to_datetime(df['EventDate'])
-df['EventTimestamp'] = pd.to_datetime(df['EventTimestamp'])
-df['SubscriptionStartDate'] = pd.to_datetime(df['SubscriptionStartDate'])
-df['SubscriptionEndDate'] = pd.to_datetime(df['SubscriptionEndDate'], errors='coerce') # Handle None -> NaT
-df['PartnerID'] = df['PartnerID'].astype(str) # Treat IDs as strings usually safer
-df['ProductID'] = df['ProductID'].astype(str)
-df['Quantity'] = df['Quantity'].astype(int)
-df['MonthlyRecurringRevenue (MRR)'] = df['MonthlyRecurringRevenue (MRR)'].astype(float)
-df['SupportTicketRelated'] = df['SupportTicketRelated'].astype(bool)
-
-# --- Display Sample Data and Info ---
-print("--- Sample Cloud Subscription Dataset ---")
-print(f"Generated {len(df)} records.")
-print("\n--- First 5 Rows ---")
-# Using markdown for potentially better display in some environments
-try:
-    print(df.head().to_markdown(index=False))
-except ImportError:
-     print(df.head()) # Fallback to default print
-
-
-print("\n--- DataFrame Info ---")
-df.info()
-
-print("\n--- Example Aggregation (MRR by Vendor) ---")
-# This is the type of analysis the BI Analyst would perform
-mrr_by_vendor = df.groupby('VendorName')['MonthlyRecurringRevenue (MRR)'].sum().reset_index()
-mrr_by_vendor = mrr_by_vendor.sort_values('MonthlyRecurringRevenue (MRR)', ascending=False)
-# Using markdown for potentially better display in some environments
-try:
-    print(mrr_by_vendor.to_markdown(index=False))
-except ImportError:
-    print(mrr_by_vendor) # Fallback to default print
-
-
-# --- Save DataFrame to CSV File ---
-csv_filename = "sample_pax8_subscription_data.csv"
-try:
-    df.to_csv(csv_filename, index=False, encoding='utf-8') # index=False prevents writing the pandas index as a column
-    print(f"\n--- Success ---")
-    print(f"Dataset successfully saved to: {os.path.abspath(csv_filename)}") # Show absolute path
-except Exception as e:
-    print(f"\n--- Error ---")
-    print(f"Could not save dataset to CSV: {e}")
\ No newline at end of file
+        "SupportTicketRelated": rng.random(size) < 0.1, # Small chance a support ticket was related
+    }
+    with Instrumentation.span('pax8.dataframe', rows=size):
+        return pd.DataFrame(columns)
+
+@Instrumentation.traced('pax8.facts_to_wide')
+def facts_to_wide(fact):
+    """Expand fact rows into the wide event layout with plain string columns."""
+    partner = fact["PartnerKey"].to_numpy()
+    product = fact["ProductKey"].to_numpy()
+    wide = {"EventID": fact["EventID"].to_numpy()}
+    for column, values in partner_lookup.items():
+        wide[column] = values[partner]
+    for column, values in product_lookup.items():
+        wide[column] = values[product]
+    wide["EventType"] = np.array(event_types, dtype=object)[fact["EventTypeCode"].to_numpy()]
+    for column in ("EventDate", "EventTimestamp", "SubscriptionStartDate", "SubscriptionEndDate"):
+        wide[column] = fact[column].to_numpy()
+    wide["Quantity"] = fact["Quantity"].to_numpy(dtype=np.int64)
+    wide["MonthlyRecurringRevenue (MRR)"] = fact["MonthlyRecurringRevenue (MRR)"].to_numpy()
+    wide["BillingStatus"] = np.array(billing_status_values, dtype=object)[fact["BillingStatusCode"].to_numpy()]
+    wide["SalesRepresentative"] = np.array(sales_reps, dtype=object)[fact["SalesRepKey"].to_numpy()]
+    wide["SupportTicketRelated"] = fact["SupportTicketRelated"].to_numpy()
+    return pd.DataFrame(wide, index=fact.index)
+
+def generate_subscription_events(start, stop, seed_sequence=None, seed=42):
+    """Generate events start..stop-1 (EventID 50000 + i) as a typed wide DataFrame."""
+    return facts_to_wide(generate_subscription_facts(start, stop, seed_sequence, seed))
+
+def generate_subscription_dataset(num_records=num_records, seed=42, workers=1,
+                                  shard_size=Shard_Pool.DEFAULT_SHARD_SIZE):
+    """Generate num_records events, sharded across worker processes.
+
+    The result depends on seed and shard_size only, not on workers.
+    """
+    return Shard_Pool.run_sharded(generate_subscription_events, num_records, seed=seed,
+                                  shard_size=shard_size, workers=workers)
+
+# --- Star Schema ---
+# The wide dataset repeats partner and product attributes on every event.
+# The star schema keeps one narrow fact row per event (integer keys, dates,
+# Quantity, MRR and small status codes) and moves the attributes into
+# dimension tables. Keys are row positions in the dimension tables.
+WIDE_COLUMNS = [
+    "EventID", "PartnerID", "PartnerName", "PartnerSegment", "PartnerRegion",
+    "ProductID", "ProductName", "VendorName", "ProductCategory", "EventType",
+    "EventDate", "EventTimestamp", "SubscriptionStartDate", "SubscriptionEndDate",
+    "Quantity", "MonthlyRecurringRevenue (MRR)", "BillingStatus", "SalesRepresentative",
+    "SupportTicketRelated",
+]
+
+# Wide column -> (dimension table, key column in the fact table)
+DIMENSION_COLUMNS = {
+    "PartnerID": ("partners", "PartnerKey"),
+    "PartnerName": ("partners", "PartnerKey"),
+    "PartnerSegment": ("partners", "PartnerKey"),
+    "PartnerRegion": ("partners", "PartnerKey"),
+    "ProductID": ("products", "ProductKey"),
+    "ProductName": ("products", "ProductKey"),
+    "VendorName": ("products", "ProductKey"),
+    "ProductCategory": ("products", "ProductKey"),
+    "EventType": ("event_types", "EventTypeCode"),
+    "BillingStatus": ("billing_statuses", "BillingStatusCode"),
+    "SalesRepresentative": ("sales_reps", "SalesRepKey"),
+}
+
+def build_dimension_tables():
+    """Partner, product and status-code dimension tables for the star schema."""
+    return {
+        "partners": pd.DataFrame({
+            "PartnerKey": np.arange(len(partner_ids), dtype=np.int16),
+            "PartnerID": [str(partner_id) for partner_id in partner_ids],
+            "PartnerName": [partners[partner_id]["name"] for partner_id in partner_ids],
+            "PartnerSegment": [partners[partner_id]["segment"] for partner_id in partner_ids],
+            "PartnerRegion": [partners[partner_id]["region"] for partner_id in partner_ids],
+        }),
+        "products": pd.DataFrame({
+            "ProductKey": np.arange(len(product_ids), dtype=np.int16),
+            "ProductID": [str(product_id) for product_id in product_ids],
+            "ProductName": [products[product_id]["name"] for product_id in product_ids],
+            "VendorName": [products[product_id]["vendor"] for product_id in product_ids],
+            "ProductCategory": [products[product_id]["category"] for product_id in product_ids],
+        }),
+        "event_types": pd.DataFrame({
+            "EventTypeCode": np.arange(len(event_types), dtype=np.int8),
+            "EventType": event_types,
+        }),
+        "billing_statuses": pd.DataFrame({
+            "BillingStatusCode": np.arange(len(billing_status_values), dtype=np.int8),
+            "BillingStatus": billing_status_values,
+        }),
+        "sales_reps": pd.DataFrame({
+            "SalesRepKey": np.arange(len(sales_reps), dtype=np.int8),
+            "SalesRepresentative": sales_reps,
+        }),
+    }
+
+def generate_subscription_star_schema(num_records=num_records, seed=42, workers=1,
+                                      shard_size=Shard_Pool.DEFAULT_SHARD_SIZE):
+    """Generate the dataset as a star schema: {"fact": ..., "partners": ..., "products": ..., ...}.
+
+    Shards produce fact rows directly; the wide form is never built.
+    """
+    star = build_dimension_tables()
+    star["fact"] = Shard_Pool.run_sharded(generate_subscription_facts, num_records, seed=seed,
+                                          shard_size=shard_size, workers=workers)
+    return star
+
+def star_schema_wide_view(star, columns=None, start=0, stop=None):
+    """Wide-form columns for fact rows start..stop-1, joined on demand.
+
+    Only the requested columns (default: all of WIDE_COLUMNS) are built.
+    Dimension attributes come back as categoricals over the fact keys, so
+    the join does not copy a string per row.
+    """
+    fact = star["fact"].iloc[start:stop]
+    wide = {}
+    for column in columns or WIDE_COLUMNS:
+        if column in DIMENSION_COLUMNS:
+            table_name, key = DIMENSION_COLUMNS[column]
+            # Attributes such as PartnerSegment repeat across rows of the dimension
+            codes, categories = pd.factorize(star[table_name][column])
+            wide[column] = pd.Categorical.from_codes(codes[fact[key].to_numpy()], categories)
+        else:
+            wide[column] = fact[column].to_numpy()
+    return pd.DataFrame(wide, index=fact.index)
+
+def iter_star_schema_wide(star, chunk_size=1_000_000, columns=None):
+    """Yield the wide form chunk by chunk, for consumers that cannot hold it whole."""
+    for start in range(0, len(star["fact"]), chunk_size):
+        yield star_schema_wide_view(star, columns, start, start + chunk_size)
+
+# --- MRR Cube ---
+# Pre-aggregated rollups for the dashboards. The cube keeps MRR, Quantity
+# and event counts per (partner, product, month) cell; vendor, segment,
+# region and category rollups are derived from the dimension tables, so
+# queries read at most partners x products x months cells and never the
+# fact table. Cubes from separate shards or appended batches add up.
+CUBE_MEASURES = ["MonthlyRecurringRevenue (MRR)", "Quantity", "EventCount"]
+
+def new_mrr_cube(first_month=None, num_months=0):
+    """An empty cube; the month axis grows as events arrive."""
+    if first_month is None:
+        first_month = np.datetime64(start_date, 'M')
+    return {
+        "first_month": np.datetime64(first_month, 'M'),
+        "values": np.zeros((len(partner_ids), len(product_ids), num_months, len(CUBE_MEASURES))),
+    }
+
+def _resize_month_axis(cube, first_month, num_months):
+    """Return cube values re-laid onto a month axis starting at first_month."""
+    values = np.zeros(cube["values"].shape[:2] + (num_months, len(CUBE_MEASURES)))
+    offset = int((cube["first_month"] - first_month).astype(int))
+    values[:, :, offset:offset + cube["values"].shape[2]] = cube["values"]
+    return {"first_month": first_month, "values": values}
+
+def _cover_months(cube, first_month, last_month):
+    """Grow the cube's month axis so it spans first_month..last_month."""
+    current_last = cube["first_month"] + (cube["values"].shape[2] - 1)
+    if cube["values"].shape[2] and first_month >= cube["first_month"] and last_month <= current_last:
+        return cube
+    if cube["values"].shape[2]:
+        first_month = min(first_month, cube["first_month"])
+        last_month = max(last_month, current_last)
+    return _resize_month_axis(cube, first_month, int((last_month - first_month).astype(int)) + 1)
+
+@Instrumentation.traced('pax8.update_mrr_cube')
+def update_mrr_cube(cube, fact):
+    """Add a batch of fact rows to the cube and return the updated cube."""
+    if len(fact) == 0:
+        return cube
+    months = fact["EventDate"].to_numpy().astype('datetime64[M]')
+    cube = _cover_months(cube, months.min(), months.max())
+    month_index = (months - cube["first_month"]).astype(np.int64)
+    shape = cube["values"].shape[:3]
+    cell = np.ravel_multi_index((fact["PartnerKey"].to_numpy(), fact["ProductKey"].to_numpy(), month_index), shape)
+    size = int(np.prod(shape))
+    weights = (fact["MonthlyRecurringRevenue (MRR)"].to_numpy(), fact["Quantity"].to_numpy(), None)
+    for position, weight in enumerate(weights):
+        cube["values"][..., position] += np.bincount(cell, weights=weight, minlength=size).reshape(shape)
+    return cube
+
+def merge_mrr_cubes(cubes):
+    """Sum partial cubes, e.g. one per shard."""
+    merged = new_mrr_cube()
+    for cube in cubes:
+        if not cube["values"].shape[2]:
+            continue
+        last_month = cube["first_month"] + (cube["values"].shape[2] - 1)
+        merged = _cover_months(merged, cube["first_month"], last_month)
+        offset = int((cube["first_month"] - merged["first_month"]).astype(int))
+        merged["values"][:, :, offset:offset + cube["values"].shape[2]] += cube["values"]
+    return merged
+
+def mrr_cube_cells(cube):
+    """Non-empty cube cells as a small frame with every dimension attribute attached."""
+    partner, product, month = np.nonzero(cube["values"][..., CUBE_MEASURES.index("EventCount")])
+    cells = {column: values[partner] for column, values in partner_lookup.items()}
+    cells.update({column: values[product] for column, values in product_lookup.items()})
+    cells["Month"] = (cube["first_month"] + month).astype('datetime64[s]')
+    for position, measure in enumerate(CUBE_MEASURES):
+        cells[measure] = cube["values"][partner, product, month, position]
+    return pd.DataFrame(cells)
+
+def query_mrr_cube(cube, by=("VendorName",), where=None, months=None):
+    """Roll the cube up to the `by` dimensions, optionally sliced.
+
+    by: any of PartnerID/PartnerName/PartnerSegment/PartnerRegion,
+    ProductID/ProductName/VendorName/ProductCategory and Month (empty for a
+    grand total). where: {dimension: value or list of values}. months:
+    (first, last) inclusive month bounds such as ("2024-01", "2024-06").
+    """
+    cells = mrr_cube_cells(cube)
+    for column, value in (where or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        cells = cells[cells[column].isin(values)]
+    if months is not None:
+        first, last = (np.datetime64(month, 'M').astype('datetime64[s]') for month in months)
+        cells = cells[(cells["Month"] >= first) & (cells["Month"] <= last)]
+    if not by:
+        return cells[CUBE_MEASURES].sum().to_frame().T
+    return cells.groupby(list(by), as_index=False)[CUBE_MEASURES].sum()
+
+def generate_subscription_cube(start, stop, seed_sequence=None, seed=42):
+    """Partial cube for events start..stop-1 (a shard's contribution)."""
+    return update_mrr_cube(new_mrr_cube(), generate_subscription_facts(start, stop, seed_sequence, seed))
+
+def generate_mrr_cube(num_records=num_records, seed=42, workers=1,
+                      shard_size=Shard_Pool.DEFAULT_SHARD_SIZE):
+    """Build the cube for a run without keeping any fact rows; shards return partial cubes."""
+    return Shard_Pool.run_sharded(generate_subscription_cube, num_records, seed=seed,
+                                  shard_size=shard_size, workers=workers, merge=merge_mrr_cubes)
+
+# --- Subscription Index ---
+# Sorted-endpoint index over the subscription intervals carried by each
+# event. A row is active on day D when SubscriptionStartDate <= D <
+# SubscriptionEndDate (NaT end = open-ended). With start and end days sorted
+# and prefix sums of MRR/Quantity kept along each order, the active totals on
+# D are (everything started by D) - (everything ended by D): two binary
+# searches instead of a scan of every event.
+INDEX_MEASURES = {"ActiveMRR": "MonthlyRecurringRevenue (MRR)", "ActiveQuantity": "Quantity"}
+
+def _as_day(date):
+    return np.datetime64(pd.Timestamp(date), 'D')
+
+def _prefix_sums(values):
+    return np.concatenate([[0], np.cumsum(values)])
+
+def build_subscription_index(events):
+    """Index the subscription intervals of fact or wide event rows (positional row ids)."""
+    start = events["SubscriptionStartDate"].to_numpy().astype('datetime64[D]')
+    end = events["SubscriptionEndDate"].to_numpy().astype('datetime64[D]')
+    # Rows that end before they start are never active
+    valid = ~np.isnat(start) & (np.isnat(end) | (end > start))
+    rows = np.flatnonzero(valid)
+    measures = {name: events[column].to_numpy(dtype=np.float64)[rows] for name, column in INDEX_MEASURES.items()}
+
+    start_order = np.argsort(start[rows], kind='stable')
+    ended = np.flatnonzero(~np.isnat(end[rows]))
+    end_order = ended[np.argsort(end[rows][ended], kind='stable')]
+    index = {
+        "start": start[rows][start_order],
+        "start_rows": rows[start_order],
+        "end_by_start": end[rows][start_order],
+        "end": end[rows][end_order],
+    }
+    for name, values in measures.items():
+        index["start_" + name] = _prefix_sums(values[start_order])
+        index["end_" + name] = _prefix_sums(values[end_order])
+    return index
+
+def _totals(index, started, ended):
+    """Active totals given the number of intervals started and ended."""
+    totals = {"ActiveSubscriptions": started - ended}
+    for name in INDEX_MEASURES:
+        totals[name] = index["start_" + name][started] - index["end_" + name][ended]
+    return totals
+
+def active_totals_at(index, date):
+    """Active subscriptions, Quantity and MRR on one day."""
+    day = _as_day(date)
+    started = int(np.searchsorted(index["start"], day, side='right'))
+    ended = int(np.searchsorted(index["end"], day, side='right'))
+    return _totals(index, started, ended)
+
+def active_totals_between(index, first, last):
+    """Totals over subscriptions active on any day of first..last (inclusive)."""
+    started = int(np.searchsorted(index["start"], _as_day(last), side='right'))
+    ended = int(np.searchsorted(index["end"], _as_day(first), side='right'))
+    return _totals(index, started, ended)
+
+def active_subscription_rows(index, date):
+    """Row positions of the events whose subscription is active on date."""
+    day = _as_day(date)
+    started = int(np.searchsorted(index["start"], day, side='right'))
+    end = index["end_by_start"][:started]
+    return np.sort(index["start_rows"][:started][np.isnat(end) | (end > day)])
+
+def daily_active_mrr(index, first=start_date, last=end_date):
+    """Active subscriptions, Quantity and MRR for every day first..last in one sweep."""
+    days = np.arange(_as_day(first), _as_day(last) + 1)
+    started = np.searchsorted(index["start"], days, side='right')
+    ended = np.searchsorted(index["end"], days, side='right')
+    series = {"Date": days.astype('datetime64[s]')}
+    series.update(_totals(index, started, ended))
+    for name in INDEX_MEASURES:
+        series[name] = np.round(series[name], 2)
+    return pd.DataFrame(series)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the sample Pax8 subscription dataset.")
+    parser.add_argument('--num-records', type=int, default=num_records)
+    parser.add_argument('--workers', type=int, default=1, help="worker processes for sharded generation")
+    parser.add_argument('--star-schema', action='store_true',
+                        help="write a fact table plus dimension tables instead of the wide dataset")
+    Dataset_Output.add_output_arguments(parser)
+    Instrumentation.add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    Instrumentation.start_from_args(args)
+
+    if args.star_schema:
+        star = generate_subscription_star_schema(args.num_records, workers=args.workers)
+        for table_name, table in star.items():
+            output_filename = Dataset_Output.output_path(f"sample_pax8_subscription_{table_name}", args.format)
+            Dataset_Output.write_frame(table, output_filename,
+                                       row_group_size=args.row_group_size, compression=args.compression)
+            print(f"Saved {table_name} ({len(table)} rows) to: {os.path.abspath(output_filename)}")
+        Instrumentation.finish_from_args(args)
+        raise SystemExit
+
+    star = generate_subscription_star_schema(args.num_records, workers=args.workers)
+    df = facts_to_wide(star["fact"])
+    cube = update_mrr_cube(new_mrr_cube(), star["fact"])
+
+    # --- Display Sample Data and Info ---
+    print("--- Sample Cloud Subscription Dataset ---")
+    print(f"Generated {len(df)} records.")
+    print("\n--- First 5 Rows ---")
+    # Using markdown for potentially better display in some environments
+    try:
+        print(df.head().to_markdown(index=False))
+    except ImportError:
+         print(df.head()) # Fallback to default print
+
+
+    print("\n--- DataFrame Info ---")
+    df.info()
+
+    print("\n--- Example Aggregation (MRR by Vendor) ---")
+    # This is the type of analysis the BI Analyst would perform
+    # Answered from the MRR cube rather than a groupby over every event
+    mrr_by_vendor = query_mrr_cube(cube, by=['VendorName'])[['VendorName', 'MonthlyRecurringRevenue (MRR)']]
+    mrr_by_vendor = mrr_by_vendor.sort_values('MonthlyRecurringRevenue (MRR)', ascending=False)
+    # Using markdown for potentially better display in some environments
+    try:
+        print(mrr_by_vendor.to_markdown(index=False))
+    except ImportError:
+        print(mrr_by_vendor) # Fallback to default print
+
+
+    # --- Save DataFrame to CSV File (or the --format chosen) ---
+    output_filename = Dataset_Output.output_path("sample_pax8_subscription_data", args.format)
+    try:
+        Dataset_Output.write_frame(df, output_filename, categorical_columns=CATEGORICAL_COLUMNS,
+                                   row_group_size=args.row_group_size, compression=args.compression)
+        print(f"\n--- Success ---")
+        print(f"Dataset successfully saved to: {os.path.abspath(output_filename)}") # Show absolute path
+    except Exception as e:
+        print(f"\n--- Error ---")
+        print(f"Could not save dataset to {args.format}: {e}")
+
+    Instrumentation.finish_from_args(args)
\ No newline at end of file
@@ -1,79 +1,368 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+import argparse
+
+import Dataset_Output
+import Shard_Pool
 
 # Number of data points to generate
 num_rows = 2000
 
 # Generate a list of vehicle IDs
 vehicle_ids = [f"Vehicle_{i+1:03d}" for i in range(200)]
-random_vehicle = [random.choice(vehicle_ids) for _ in range(num_rows)]
 
 # Generate timestamps for the data
 start_date = datetime(2025, 5, 1)
-time_stamps = [start_date + timedelta(hours=i) for i in range(num_rows)]
+start_date64 = np.datetime64(start_date, 's')
+ONE_HOUR = np.timedelta64(3600, 's')
 
 # Generate driver IDs
 driver_ids = [f"Driver_{i+1:03d}" for i in range(100)]
-random_driver = [random.choice(driver_ids) for _ in range(num_rows)]
 
 # Generate trip IDs
 trip_ids = [f"Trip_{i+1:04d}" for i in range(500)]
-random_trip = [random.choice(trip_ids) for _ in range(num_rows)]
+
+# Diagnostic trouble codes DTC_100..DTC_999
+dtc_code_values = [f"DTC_{code}" for code in range(100, 1000)]
+
+# Low-cardinality columns stored as dictionary columns in Parquet/Arrow output
+CATEGORICAL_COLUMNS = {
+    'vehicle_id': vehicle_ids,
+    'driver_id': driver_ids,
+    'trip_id': trip_ids,
+    'dtc_code': dtc_code_values,
+}
+# The simulated fleet can be larger than vehicle_ids; its vehicle and driver dictionaries grow as it streams
+SIMULATION_CATEGORICAL_COLUMNS = {'vehicle_id': [], 'driver_id': [], 'trip_id': [], 'dtc_code': dtc_code_values}
+
+# Approximate range around a central location (e.g., within a region)
+FLEET_CENTER = (47.6062, -122.3321)  # Approximate latitude/longitude of Seattle
+FLEET_SPREAD = (0.5, 0.7)
 
 # Generate location data (latitude and longitude)
-def generate_location():
-    # Approximate range around a central location (e.g., within a region)
-    base_lat = 47.6062  # Approximate latitude of Seattle
-    base_lon = -122.3321 # Approximate longitude of Seattle
-    lat = np.random.normal(base_lat, 0.5)
-    lon = np.random.normal(base_lon, 0.7)
-    return round(lat, 4), round(lon, 4)
-
-locations = [generate_location() for _ in range(num_rows)]
-latitude = [loc[0] for loc in locations]
-longitude = [loc[1] for loc in locations]
-
-# Generate speed data (in mph)
-speed = np.random.normal(loc=55, scale=20, size=num_rows).clip(0, 80).round(1)
-
-# Generate fuel consumption data (in gallons per hour)
-fuel_consumption = np.random.normal(loc=5, scale=1.5, size=num_rows).clip(1, 15).round(2)
-
-# Generate engine load (%)
-engine_load = np.random.randint(0, 101, size=num_rows)
-
-# Generate diagnostic trouble codes (as strings, some might be NaN)
-dtc_codes = [f"DTC_{random.randint(100, 999)}" if random.random() < 0.1 else None for _ in range(num_rows)]
-
-# Generate harsh driving events (boolean)
-harsh_braking = np.random.choice([True, False], size=num_rows, p=[0.05, 0.95])
-harsh_acceleration = np.random.choice([True, False], size=num_rows, p=[0.03, 0.97])
-harsh_cornering = np.random.choice([True, False], size=num_rows, p=[0.02, 0.98])
-
-# Generate idling status (boolean)
-is_idling = np.random.choice([True, False], size=num_rows, p=[0.08, 0.92])
-
-# Create the DataFrame
-data = pd.DataFrame({
-    'timestamp': time_stamps,
-    'vehicle_id': random_vehicle,
-    'driver_id': random_driver,
-    'trip_id': random_trip,
-    'latitude': latitude,
-    'longitude': longitude,
-    'speed_mph': speed,
-    'fuel_consumption_gph': fuel_consumption,
-    'engine_load_percent': engine_load,
-    'dtc_code': dtc_codes,
-    'harsh_braking': harsh_braking,
-    'harsh_acceleration': harsh_acceleration,
-    'harsh_cornering': harsh_cornering,
-    'is_idling': is_idling
-})
-
-# Save the DataFrame to a CSV file
-data.to_csv('fleet_telematics_data.csv', index=False)
-
-print("Dataset 'fleet_telematics_data.csv' generated successfully!")
\ No newline at end of file
+def generate_location(rng=np.random, size=None):
+    """Latitude/longitude around Seattle, rounded to 4 places; arrays when size is given."""
+    lat = rng.normal(FLEET_CENTER[0], FLEET_SPREAD[0], size=size)
+    lon = rng.normal(FLEET_CENTER[1], FLEET_SPREAD[1], size=size)
+    return np.round(lat, 4), np.round(lon, 4)
+
+def generate_telematics_data(start, stop, seed_sequence=None, seed=42):
+    """Generate telematics rows start..stop-1 (one per hour from start_date).
+
+    Every column is drawn as one array: IDs are integer indices into the ID
+    lists, returned as categoricals, and DTCs are assigned through a mask.
+    All randomness comes from seed_sequence (default SeedSequence(seed)),
+    so a shard's rows are reproducible on any worker.
+    """
+    if seed_sequence is None:
+        seed_sequence = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_sequence)
+    rows = stop - start
+
+    random_vehicle = pd.Categorical.from_codes(rng.integers(0, len(vehicle_ids), size=rows), vehicle_ids)
+    time_stamps = start_date64 + np.arange(start, stop) * ONE_HOUR
+    random_driver = pd.Categorical.from_codes(rng.integers(0, len(driver_ids), size=rows), driver_ids)
+    random_trip = pd.Categorical.from_codes(rng.integers(0, len(trip_ids), size=rows), trip_ids)
+
+    latitude, longitude = generate_location(rng, size=rows)
+
+    # Generate speed data (in mph)
+    speed = rng.normal(loc=55, scale=20, size=rows).clip(0, 80).round(1)
+
+    # Generate fuel consumption data (in gallons per hour)
+    fuel_consumption = rng.normal(loc=5, scale=1.5, size=rows).clip(1, 15).round(2)
+
+    # Generate engine load (%)
+    engine_load = rng.integers(0, 101, size=rows)
+
+    # Generate diagnostic trouble codes (about 10% of rows, the rest missing)
+    dtc_codes = np.full(rows, -1, dtype=np.int16)
+    has_dtc = rng.random(rows) < 0.1
+    dtc_codes[has_dtc] = rng.integers(0, len(dtc_code_values), size=int(has_dtc.sum()))
+    dtc_codes = pd.Categorical.from_codes(dtc_codes, dtc_code_values)
+
+    # Generate harsh driving events (boolean)
+    harsh_braking = rng.random(rows) < 0.05
+    harsh_acceleration = rng.random(rows) < 0.03
+    harsh_cornering = rng.random(rows) < 0.02
+
+    # Generate idling status (boolean)
+    is_idling = rng.random(rows) < 0.08
+
+    # Create the DataFrame
+    return pd.DataFrame({
+        'timestamp': time_stamps,
+        'vehicle_id': random_vehicle,
+        'driver_id': random_driver,
+        'trip_id': random_trip,
+        'latitude': latitude,
+        'longitude': longitude,
+        'speed_mph': speed,
+        'fuel_consumption_gph': fuel_consumption,
+        'engine_load_percent': engine_load,
+        'dtc_code': dtc_codes,
+        'harsh_braking': harsh_braking,
+        'harsh_acceleration': harsh_acceleration,
+        'harsh_cornering': harsh_cornering,
+        'is_idling': is_idling
+    })
+
+def generate_telematics_dataset(num_rows=num_rows, seed=42, workers=1,
+                                shard_size=Shard_Pool.DEFAULT_SHARD_SIZE):
+    """Generate num_rows telematics rows, sharded across worker processes.
+
+    The result depends on seed and shard_size only, not on workers.
+    """
+    return Shard_Pool.run_sharded(generate_telematics_data, num_rows, seed=seed,
+                                  shard_size=shard_size, workers=workers)
+
+# --- Trip Simulation ---
+# Each vehicle is simulated as its own trajectory: it alternates between
+# driving and idling, speed follows a mean-reverting walk while driving,
+# heading drifts, and the position integrates speed along the heading. All
+# vehicles of a partition are stepped together as arrays; steps are produced
+# in blocks and the state carried between blocks, so memory is bounded by
+# the block size no matter how long or how often the fleet reports. Trips
+# are counted per vehicle: trip_id Trip_0003 is that vehicle's third trip,
+# so vehicle_id and trip_id together identify one trip.
+SIM_SAMPLE_SECONDS = 60
+SIM_VEHICLES_PER_PARTITION = 1_000
+SIM_BLOCK_ROWS = 1_000_000
+MEAN_DRIVE_SECONDS = 25 * 60     # average driving stretch before a stop
+MEAN_IDLE_SECONDS = 8 * 60       # average stop before moving again
+NEW_TRIP_PROBABILITY = 0.3       # chance that moving off after a stop starts a new trip
+DRIVER_CHANGE_PROBABILITY = 0.1  # chance a new trip gets a different driver
+DRIVERS_PER_VEHICLE = 2          # driver pool size per vehicle; a driver is in at most one vehicle
+CRUISE_SPEED = 55.0              # mph the speed walk reverts to
+SPEED_SD = 12.0                  # stationary spread of the speed walk (mph)
+SPEED_TIME_CONSTANT = 120.0      # seconds for speed deviations to decay by 1/e
+TURN_SD = 0.02                   # heading drift (radians per sqrt(second))
+HARSH_BRAKING_PER_HOUR = 0.5
+HARSH_ACCELERATION_PER_HOUR = 0.3
+HARSH_CORNERING_PER_HOUR = 0.2
+DTC_PER_HOUR = 0.1
+MILES_PER_DEGREE = 69.0
+
+def fleet_vehicle_ids(start, stop):
+    """Vehicle IDs for fleet positions start..stop-1 (Vehicle_001, ... as in vehicle_ids)."""
+    return [f"Vehicle_{i+1:03d}" for i in range(start, stop)]
+
+def fleet_driver_ids(start, stop):
+    """Driver pool of fleet positions start..stop-1: DRIVERS_PER_VEHICLE drivers each, disjoint between partitions."""
+    return [f"Driver_{i+1:03d}" for i in range(start * DRIVERS_PER_VEHICLE, stop * DRIVERS_PER_VEHICLE)]
+
+def new_vehicle_state(rng, size):
+    """Starting position, heading, motion and trip state for size vehicles.
+
+    Drivers are a random permutation of the partition's pool: the first
+    size go to the vehicles, the rest wait in 'free_drivers'.
+    """
+    latitude, longitude = generate_location(rng, size=size)
+    moving = rng.random(size) < MEAN_DRIVE_SECONDS / (MEAN_DRIVE_SECONDS + MEAN_IDLE_SECONDS)
+    drivers = rng.permutation(size * DRIVERS_PER_VEHICLE)
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'heading': rng.uniform(0, 2 * np.pi, size=size),
+        'speed': np.where(moving, rng.normal(CRUISE_SPEED, SPEED_SD, size=size).clip(5, 80), 0.0),
+        'moving': moving,
+        'trip': np.ones(size, dtype=np.int32),
+        'driver': drivers[:size],
+        'free_drivers': drivers[size:],
+        'step': 0,
+    }
+
+def advance_vehicles(state, rng, steps, sample_seconds):
+    """Advance every vehicle in state by steps samples; returns (steps, vehicles) column arrays."""
+    size = len(state['speed'])
+    dt = float(sample_seconds)
+    shape = (steps, size)
+    columns = {
+        'latitude': np.empty(shape), 'longitude': np.empty(shape), 'speed_mph': np.empty(shape),
+        'trip_number': np.empty(shape, dtype=np.int32), 'driver': np.empty(shape, dtype=np.int64),
+        'harsh_braking': np.empty(shape, dtype=bool), 'harsh_acceleration': np.empty(shape, dtype=bool),
+        'harsh_cornering': np.empty(shape, dtype=bool), 'is_idling': np.empty(shape, dtype=bool),
+    }
+    # Per-sample event probabilities and the exact mean-reverting speed update for dt
+    p_stop = 1 - np.exp(-dt / MEAN_DRIVE_SECONDS)
+    p_go = 1 - np.exp(-dt / MEAN_IDLE_SECONDS)
+    p_braking, p_acceleration, p_cornering = (1 - np.exp(-rate * dt / 3600) for rate in
+                                              (HARSH_BRAKING_PER_HOUR, HARSH_ACCELERATION_PER_HOUR,
+                                               HARSH_CORNERING_PER_HOUR))
+    decay = np.exp(-dt / SPEED_TIME_CONSTANT)
+    speed_noise = SPEED_SD * np.sqrt(1 - decay ** 2)
+    turn_sd = TURN_SD * np.sqrt(dt)
+    center_lat, center_lon = FLEET_CENTER
+    max_lat, max_lon = (3 * spread for spread in FLEET_SPREAD)
+
+    uniforms = rng.random((steps, 6, size))
+    normals = rng.standard_normal((steps, 2, size))
+    lat, lon, heading = state['latitude'], state['longitude'], state['heading']
+    speed, moving, trip, driver = state['speed'], state['moving'], state['trip'], state['driver'].copy()
+    free_drivers = state['free_drivers']
+    for step in range(steps):
+        u, z = uniforms[step], normals[step]
+        stop = moving & (u[0] < p_stop)
+        go = ~moving & (u[0] < p_go)
+        new_trip = go & (u[1] < NEW_TRIP_PROBABILITY)
+        trip = trip + new_trip
+        # A driver change swaps the vehicle's driver with a free one, so no driver is in two vehicles
+        change_driver = np.flatnonzero(new_trip & (u[2] < DRIVER_CHANGE_PROBABILITY))
+        if len(change_driver):
+            slots = rng.choice(len(free_drivers), size=len(change_driver), replace=False)
+            driver[change_driver], free_drivers[slots] = free_drivers[slots], driver[change_driver]
+        moving = (moving & ~stop) | go
+
+        braking = moving & ~go & (u[3] < p_braking)
+        acceleration = moving & ~braking & (u[4] < p_acceleration)
+        cornering = moving & (u[5] < p_cornering)
+        speed = np.where(go, 15.0, CRUISE_SPEED + (speed - CRUISE_SPEED) * decay + speed_noise * z[0])
+        speed = np.where(braking, speed * 0.5, speed) + np.where(acceleration, 10.0, 0.0)
+        speed = np.where(moving, speed.clip(3, 80), 0.0)
+
+        # Drift the heading (sharp turn on cornering), and steer back toward the region's center when outside it
+        heading = heading + turn_sd * z[1] + np.where(cornering, np.pi / 2, 0.0)
+        outside = (np.abs(lat - center_lat) > max_lat) | (np.abs(lon - center_lon) > max_lon)
+        if outside.any():
+            home = np.arctan2((center_lon - lon) * np.cos(np.radians(lat)), center_lat - lat)
+            heading = np.where(outside, home, heading)
+        miles = speed * dt / 3600
+        lat = lat + miles * np.cos(heading) / MILES_PER_DEGREE
+        lon = lon + miles * np.sin(heading) / (MILES_PER_DEGREE * np.cos(np.radians(lat)))
+
+        columns['latitude'][step] = lat
+        columns['longitude'][step] = lon
+        columns['speed_mph'][step] = speed
+        columns['trip_number'][step] = trip
+        columns['driver'][step] = driver
+        columns['harsh_braking'][step] = braking
+        columns['harsh_acceleration'][step] = acceleration
+        columns['harsh_cornering'][step] = cornering
+        columns['is_idling'][step] = ~moving
+
+    state.update(latitude=lat, longitude=lon, heading=heading % (2 * np.pi), speed=speed,
+                 moving=moving, trip=trip, driver=driver, step=state['step'] + steps)
+    return columns
+
+def _vehicle_block_frame(columns, rng, vehicles, drivers, first_step, sample_seconds):
+    """Vehicle-major telemetry frame from (steps, vehicles) arrays, with the speed-dependent columns."""
+    steps, size = columns['speed_mph'].shape
+    rows = steps * size
+    flat = {name: values.T.ravel() for name, values in columns.items()}
+    speed, idling = flat['speed_mph'], flat['is_idling']
+
+    offsets = (first_step + np.arange(steps)) * np.timedelta64(sample_seconds, 's')
+    fuel = np.where(idling, rng.normal(0.8, 0.1, size=rows), 2.5 + 0.06 * speed + rng.normal(0, 0.5, size=rows))
+    load = np.where(idling, rng.normal(15, 3, size=rows), 25 + 0.7 * speed + rng.normal(0, 8, size=rows))
+    dtc_codes = np.full(rows, -1, dtype=np.int16)
+    has_dtc = rng.random(rows) < 1 - np.exp(-DTC_PER_HOUR * sample_seconds / 3600)
+    dtc_codes[has_dtc] = rng.integers(0, len(dtc_code_values), size=int(has_dtc.sum()))
+
+    return pd.DataFrame({
+        'timestamp': np.tile(start_date64 + offsets, size),
+        'vehicle_id': pd.Categorical.from_codes(np.repeat(np.arange(size), steps), vehicles),
+        'driver_id': pd.Categorical.from_codes(flat['driver'], drivers),
+        'trip_id': pd.Categorical.from_codes(flat['trip_number'] - 1,
+                                             [f"Trip_{i+1:04d}" for i in range(int(flat['trip_number'].max()))]),
+        'latitude': np.round(flat['latitude'], 5),
+        'longitude': np.round(flat['longitude'], 5),
+        'speed_mph': np.round(speed, 1),
+        'fuel_consumption_gph': fuel.clip(0.3, 15).round(2),
+        'engine_load_percent': load.clip(0, 100).astype(np.int64),
+        'dtc_code': pd.Categorical.from_codes(dtc_codes, dtc_code_values),
+        'harsh_braking': flat['harsh_braking'],
+        'harsh_acceleration': flat['harsh_acceleration'],
+        'harsh_cornering': flat['harsh_cornering'],
+        'is_idling': idling,
+    })
+
+def iter_vehicle_partition(start, stop, hours=24, sample_seconds=SIM_SAMPLE_SECONDS,
+                           block_rows=SIM_BLOCK_ROWS, seed_sequence=None, seed=42):
+    """Yield telemetry for fleet vehicles start..stop-1 over hours, one time block at a time.
+
+    Each block holds every vehicle of the partition for the next
+    block_rows // vehicles samples, ordered by vehicle then timestamp.
+    """
+    if seed_sequence is None:
+        seed_sequence = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_sequence)
+    vehicles = fleet_vehicle_ids(start, stop)
+    drivers = fleet_driver_ids(start, stop)
+    total_steps = int(hours * 3600 // sample_seconds)
+    block_steps = max(1, block_rows // max(1, len(vehicles)))
+    state = new_vehicle_state(rng, len(vehicles))
+    while True:
+        first_step = state['step']
+        columns = advance_vehicles(state, rng, min(block_steps, total_steps - first_step), sample_seconds)
+        yield _vehicle_block_frame(columns, rng, vehicles, drivers, first_step, sample_seconds)
+        if state['step'] >= total_steps:
+            break
+
+def simulate_vehicle_partition(start, stop, seed_sequence=None, seed=42, **simulation):
+    """All telemetry for fleet vehicles start..stop-1 as one frame (a Shard_Pool shard function)."""
+    blocks = list(iter_vehicle_partition(start, stop, seed_sequence=seed_sequence, seed=seed, **simulation))
+    return pd.concat(blocks, ignore_index=True) if len(blocks) > 1 else blocks[0]
+
+def iter_fleet_telemetry(num_vehicles=len(vehicle_ids), hours=24, sample_seconds=SIM_SAMPLE_SECONDS,
+                         vehicles_per_partition=SIM_VEHICLES_PER_PARTITION,
+                         block_rows=SIM_BLOCK_ROWS, seed=42):
+    """Stream the simulated fleet partition by partition, in time blocks.
+
+    Partition k covers vehicles k*vehicles_per_partition onward and draws
+    from child k of SeedSequence(seed), as a Shard_Pool shard would.
+    """
+    partitions = Shard_Pool.plan_shards(num_vehicles, vehicles_per_partition)
+    for (start, stop), seed_sequence in zip(partitions, Shard_Pool.shard_seed_sequences(seed, len(partitions))):
+        yield from iter_vehicle_partition(start, stop, hours, sample_seconds, block_rows, seed_sequence)
+
+def simulate_fleet(num_vehicles=len(vehicle_ids), hours=24, sample_seconds=SIM_SAMPLE_SECONDS,
+                   vehicles_per_partition=SIM_VEHICLES_PER_PARTITION,
+                   block_rows=SIM_BLOCK_ROWS, seed=42, workers=1):
+    """Simulate the fleet in memory, partitions spread across worker processes.
+
+    Same rows as iter_fleet_telemetry for any worker count.
+    """
+    return Shard_Pool.run_sharded(simulate_vehicle_partition, num_vehicles, seed=seed,
+                                  shard_size=vehicles_per_partition, workers=workers,
+                                  shard_kwargs={'hours': hours, 'sample_seconds': sample_seconds,
+                                                'block_rows': block_rows})
+
+def write_fleet_telemetry(path, num_vehicles=len(vehicle_ids), hours=24, sample_seconds=SIM_SAMPLE_SECONDS,
+                          vehicles_per_partition=SIM_VEHICLES_PER_PARTITION, block_rows=SIM_BLOCK_ROWS,
+                          seed=42, file_format=None, row_group_size=Dataset_Output.DEFAULT_ROW_GROUP_SIZE,
+                          compression=Dataset_Output.DEFAULT_COMPRESSION):
+    """Stream the simulated fleet to path one block at a time; returns the row count."""
+    chunks = iter_fleet_telemetry(num_vehicles, hours, sample_seconds, vehicles_per_partition, block_rows, seed)
+    return Dataset_Output.write_chunks(chunks, path, file_format, SIMULATION_CATEGORICAL_COLUMNS,
+                                       row_group_size, compression)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the fleet telematics dataset.")
+    parser.add_argument('--num-rows', type=int, default=num_rows)
+    parser.add_argument('--workers', type=int, default=1, help="worker processes for sharded generation")
+    parser.add_argument('--simulate', action='store_true',
+                        help="simulate per-vehicle trips and stream them to fleet_trip_telemetry")
+    parser.add_argument('--vehicles', type=int, default=len(vehicle_ids), help="fleet size for --simulate")
+    parser.add_argument('--hours', type=float, default=24, help="simulated hours for --simulate")
+    parser.add_argument('--sample-seconds', type=int, default=SIM_SAMPLE_SECONDS,
+                        help="seconds between samples for --simulate (1 for 1 Hz)")
+    parser.add_argument('--vehicles-per-partition', type=int, default=SIM_VEHICLES_PER_PARTITION)
+    Dataset_Output.add_output_arguments(parser)
+    args = parser.parse_args()
+
+    if args.simulate:
+        output_filename = Dataset_Output.output_path('fleet_trip_telemetry', args.format)
+        rows = write_fleet_telemetry(output_filename, args.vehicles, args.hours, args.sample_seconds,
+                                     args.vehicles_per_partition, file_format=args.format,
+                                     row_group_size=args.row_group_size, compression=args.compression)
+        print(f"Dataset '{output_filename}' generated successfully! ({rows:,} rows)")
+    else:
+        data = generate_telematics_dataset(args.num_rows, workers=args.workers)
+
+        # Save the DataFrame to a CSV file (or the --format chosen)
+        output_filename = Dataset_Output.output_path('fleet_telematics_data', args.format)
+        Dataset_Output.write_frame(data, output_filename, categorical_columns=CATEGORICAL_COLUMNS,
+                                   row_group_size=args.row_group_size, compression=args.compression)
+
+        print(f"Dataset '{output_filename}' generated successfully!")
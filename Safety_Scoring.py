@@ -0,0 +1,234 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import Dataset_Output
+
+# Streaming driver/vehicle safety scoring over telematics chunks.
+#
+# Rows are summed into panes (slide-sized time buckets) per key, and a
+# window is the sum of its last width/slide panes; tumbling windows are the
+# case slide == width. Each key keeps only a ring of its most recent panes
+# (width/slide + allowed lateness), so state is constant per key and a
+# stream of any length is scored in one pass. A key's pane is final once
+# that key has reported `lateness` panes past it; windows are emitted then,
+# one per pane in which the key reported data (like a time-based rolling
+# window). Rows older than that are counted as late and dropped. Vehicle
+# keys are in order in every generator's output; the simulated fleet streams
+# partition by partition, so driver keys there need a time-sorted input.
+
+MEASURES = ['samples', 'harsh_braking', 'harsh_acceleration', 'harsh_cornering',
+            'idle_samples', 'idle_fuel_gallons', 'dtc_count', 'engine_load_sum']
+# Safety score penalty points per harsh event per driving hour
+SCORE_WEIGHTS = {'harsh_braking': 10.0, 'harsh_acceleration': 8.0, 'harsh_cornering': 6.0}
+DEFAULT_WINDOWS = {
+    'driver_daily': {'key': 'driver_id', 'width': '1D'},
+    'driver_rolling_24h': {'key': 'driver_id', 'width': '24h', 'slide': '1h'},
+    'vehicle_hourly': {'key': 'vehicle_id', 'width': '1h'},
+}
+NO_PANE = np.iinfo(np.int64).min // 2
+
+def _seconds(value):
+    return int(pd.Timedelta(value).total_seconds())
+
+def new_window_state(key='driver_id', width='1h', slide=None, lateness=1, sample_seconds=3600):
+    """Aggregation state for one window spec.
+
+    key: column to score by (driver_id, vehicle_id). width/slide: window
+    length and step as Timedelta strings (slide defaults to width, i.e.
+    tumbling). lateness: extra panes a key may arrive out of order.
+    sample_seconds: time each row represents, for the fuel volume.
+    """
+    width_seconds = _seconds(width)
+    slide_seconds = _seconds(slide if slide is not None else width)
+    if width_seconds % slide_seconds:
+        raise ValueError("width must be a multiple of slide")
+    panes = width_seconds // slide_seconds
+    return {
+        'key': key, 'slide': slide_seconds, 'panes': panes, 'lateness': lateness,
+        'ring_size': panes + lateness, 'sample_hours': sample_seconds / 3600,
+        'codes': {}, 'keys': [],
+        'latest': np.empty(0, dtype=np.int64),
+        'ring_pane': np.empty((0, panes + lateness), dtype=np.int64),
+        'ring': np.empty((0, panes + lateness, len(MEASURES))),
+        'late_rows': 0,
+    }
+
+def _key_codes(state, values):
+    """Stable integer codes for key values, growing the per-key state for new keys."""
+    local_codes, uniques = pd.factorize(values)
+    codes = state['codes']
+    for value in uniques:
+        if value not in codes:
+            codes[value] = len(state['keys'])
+            state['keys'].append(value)
+    grow = len(state['keys']) - len(state['latest'])
+    if grow:
+        state['latest'] = np.concatenate([state['latest'], np.full(grow, NO_PANE)])
+        state['ring_pane'] = np.concatenate([state['ring_pane'], np.full((grow, state['ring_size']), NO_PANE)])
+        state['ring'] = np.concatenate([state['ring'], np.zeros((grow, state['ring_size'], len(MEASURES)))])
+    mapping = np.array([codes[value] for value in uniques], dtype=np.int64)
+    return mapping[local_codes]
+
+def _row_measures(chunk, sample_hours):
+    """Per-row measure matrix in MEASURES order."""
+    idle = chunk['is_idling'].to_numpy(dtype=bool)
+    return np.column_stack([
+        np.ones(len(chunk)),
+        chunk['harsh_braking'].to_numpy(dtype=np.float64),
+        chunk['harsh_acceleration'].to_numpy(dtype=np.float64),
+        chunk['harsh_cornering'].to_numpy(dtype=np.float64),
+        idle.astype(np.float64),
+        np.where(idle, chunk['fuel_consumption_gph'].to_numpy(dtype=np.float64) * sample_hours, 0.0),
+        chunk['dtc_code'].notna().to_numpy(dtype=np.float64),
+        chunk['engine_load_percent'].to_numpy(dtype=np.float64),
+    ])
+
+def _emit(state, keys, low, high):
+    """Windows for each key's data panes in [low, high) as (key codes, window end panes, sums)."""
+    ring_pane = state['ring_pane'][keys]
+    selected = (ring_pane != NO_PANE) & (ring_pane >= low[:, None]) & (ring_pane < high[:, None])
+    rows, slots = np.nonzero(selected)
+    if not len(rows):
+        return None
+    end_pane = ring_pane[rows, slots]
+    members = ((ring_pane[rows] > (end_pane - state['panes'])[:, None])
+               & (ring_pane[rows] <= end_pane[:, None]))
+    sums = np.einsum('ws,wsm->wm', members.astype(np.float64), state['ring'][keys[rows]])
+    return keys[rows], end_pane, sums
+
+def _step(state, keys, panes, values, emitted):
+    """Fold one pane per key into the rings, emitting panes that become final."""
+    latest = state['latest'][keys]
+    late = panes < latest - state['lateness']
+    state['late_rows'] += int(values[late, 0].sum())
+    keys, panes, values, latest = keys[~late], panes[~late], values[~late], latest[~late]
+
+    advancing = panes > latest
+    if advancing.any():
+        advanced = keys[advancing]
+        result = _emit(state, advanced, latest[advancing] - state['lateness'],
+                       panes[advancing] - state['lateness'])
+        if result is not None:
+            emitted.append(result)
+
+    slots = panes % state['ring_size']
+    stale = state['ring_pane'][keys, slots] != panes
+    state['ring'][keys[stale], slots[stale]] = 0.0
+    state['ring_pane'][keys, slots] = panes
+    state['ring'][keys, slots] += values
+    state['latest'][keys] = np.maximum(latest, panes)
+
+def _windows_frame(state, emitted):
+    """Closed-window DataFrame with the derived safety metrics."""
+    if not emitted:
+        keys, end_pane, sums = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty((0, len(MEASURES)))
+    else:
+        keys, end_pane, sums = (np.concatenate(parts) for parts in zip(*emitted))
+    order = np.lexsort((keys, end_pane))
+    keys, end_pane, sums = keys[order], end_pane[order], sums[order]
+    measures = dict(zip(MEASURES, sums.T))
+
+    window_end = ((end_pane + 1) * state['slide']).astype('datetime64[s]')
+    hours = measures['samples'] * state['sample_hours']
+    driving_hours = (measures['samples'] - measures['idle_samples']) * state['sample_hours']
+    penalty = sum(weight * measures[event] for event, weight in SCORE_WEIGHTS.items())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        penalty_per_hour = np.where(driving_hours > 0, penalty / driving_hours, 0.0)
+        frame = pd.DataFrame({
+            state['key']: np.array(state['keys'], dtype=object)[keys],
+            'window_start': window_end - np.timedelta64(state['panes'] * state['slide'], 's'),
+            'window_end': window_end,
+            'samples': measures['samples'].astype(np.int64),
+            'harsh_braking': measures['harsh_braking'].astype(np.int64),
+            'harsh_acceleration': measures['harsh_acceleration'].astype(np.int64),
+            'harsh_cornering': measures['harsh_cornering'].astype(np.int64),
+            'idle_fraction': measures['idle_samples'] / measures['samples'],
+            'idle_fuel_gallons': measures['idle_fuel_gallons'].round(3),
+            'dtc_per_hour': measures['dtc_count'] / hours,
+            'avg_engine_load': (measures['engine_load_sum'] / measures['samples']).round(1),
+            'safety_score': np.clip(100.0 - penalty_per_hour, 0.0, 100.0).round(1),
+        })
+    return frame
+
+def update_windows(state, chunk):
+    """Add a telemetry chunk; returns the windows it closed (possibly empty)."""
+    emitted = []
+    if len(chunk):
+        keys = _key_codes(state, chunk[state['key']].to_numpy())
+        seconds = chunk['timestamp'].to_numpy().astype('datetime64[s]').astype(np.int64)
+        panes = seconds // state['slide']
+        groups = pd.DataFrame(_row_measures(chunk, state['sample_hours']), columns=MEASURES)
+        groups['key'], groups['pane'] = keys, panes
+        groups = groups.groupby(['key', 'pane'], sort=True).sum().reset_index()
+        # Process the i-th pane of every key together, so each key's panes arrive in order
+        rank = groups.groupby('key').cumcount().to_numpy()
+        key_codes, pane_ids = groups['key'].to_numpy(), groups['pane'].to_numpy()
+        values = groups[MEASURES].to_numpy()
+        for position in range(int(rank.max()) + 1):
+            at = rank == position
+            _step(state, key_codes[at], pane_ids[at], values[at], emitted)
+    return _windows_frame(state, emitted)
+
+def flush_windows(state):
+    """Emit every window still open (end of stream)."""
+    keys = np.arange(len(state['keys']))
+    result = _emit(state, keys, state['latest'] - state['lateness'], np.full(len(keys), np.iinfo(np.int64).max))
+    state['latest'][:] = NO_PANE
+    state['ring_pane'][:] = NO_PANE
+    state['ring'][:] = 0.0
+    return _windows_frame(state, [result] if result is not None else [])
+
+def iter_scored_windows(chunks, windows=DEFAULT_WINDOWS, sample_seconds=3600, lateness=1):
+    """Score a chunk stream under several window specs in one pass.
+
+    windows maps a name to new_window_state keyword arguments. Yields
+    (name, closed windows) after each chunk and once more at the end.
+    """
+    states = {name: new_window_state(sample_seconds=sample_seconds, lateness=lateness, **spec)
+              for name, spec in windows.items()}
+    for chunk in chunks:
+        for name, state in states.items():
+            closed = update_windows(state, chunk)
+            if len(closed):
+                yield name, closed
+    for name, state in states.items():
+        yield name, flush_windows(state)
+
+def score_telemetry(chunks, windows=DEFAULT_WINDOWS, sample_seconds=3600, lateness=1):
+    """All scored windows per spec name, sorted by window end and key."""
+    results = {name: [] for name in windows}
+    for name, closed in iter_scored_windows(chunks, windows, sample_seconds, lateness):
+        results[name].append(closed)
+    return {name: pd.concat(frames, ignore_index=True).sort_values(['window_end', windows[name]['key']],
+                                                                  ignore_index=True)
+            for name, frames in results.items()}
+
+def iter_telemetry_chunks(path, chunk_size=1_000_000):
+    """Read a telematics CSV, Parquet or Arrow/Feather file chunk by chunk."""
+    return Dataset_Output.read_chunks(path, chunk_size, parse_dates=['timestamp'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Windowed driver/vehicle safety scores over telematics output.")
+    parser.add_argument('path', help="fleet_telematics_data / fleet_trip_telemetry CSV, Parquet or Arrow file")
+    parser.add_argument('--key', default='driver_id', choices=['driver_id', 'vehicle_id'])
+    parser.add_argument('--width', default='1D', help="window length, e.g. 1h, 1D")
+    parser.add_argument('--slide', help="window step for sliding windows (default: tumbling)")
+    parser.add_argument('--sample-seconds', type=int, default=3600,
+                        help="seconds each row represents (3600 for the hourly dataset, 60 for the simulation)")
+    parser.add_argument('--lateness', type=int, default=1, help="panes a key's rows may arrive out of order")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--output', help="write all windows here instead of printing the worst scores")
+    args = parser.parse_args()
+
+    spec = {'scores': {'key': args.key, 'width': args.width, 'slide': args.slide}}
+    chunks = iter_telemetry_chunks(args.path, args.chunk_size)
+    if args.output:
+        windows = (closed for _, closed in iter_scored_windows(chunks, spec, args.sample_seconds, args.lateness))
+        rows = Dataset_Output.write_chunks(windows, args.output, categorical_columns=[args.key])
+        print(f"{rows:,} windows written to '{args.output}'")
+    else:
+        scores = score_telemetry(chunks, spec, args.sample_seconds, args.lateness)['scores']
+        print(f"{len(scores):,} windows")
+        print(scores.nsmallest(10, 'safety_score').to_markdown(index=False))
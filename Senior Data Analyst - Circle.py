@@ -1,7 +1,12 @@
 import pandas as pd
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 import numpy as np
+import argparse
+from functools import lru_cache, partial
+
+import Dataset_Output
+import Instrumentation
+import Shard_Pool
 
 # Configuration
 num_records = 75000  # Number of records to generate
@@ -25,146 +30,681 @@ business_types = ['E-commerce', 'FinTech', 'Crypto Exchange', 'Gaming', 'SaaS',
 acquisition_channels = ['Organic', 'Paid Search', 'Referral Program', 'Direct Sales', 'Partnership', 'Content Marketing']
 transaction_statuses = ['Completed', 'Pending', 'Failed', 'Reversed']
 
-data = []
-current_usdc_circulation = 40_000_000_000  # Starting circulation (e.g., early 2023)
+# Low-cardinality columns stored as dictionary columns in Parquet/Arrow output
+CATEGORICAL_COLUMNS = {
+    'UserBusinessType': business_types,
+    'UserRegion': regions,
+    'UserAcquisitionChannel': acquisition_channels,
+    'EventType': event_types,
+    'ProductName': products,
+    'Blockchain': blockchains,
+    'Currency': ['USDC'],
+    'TransactionStatus': transaction_statuses,
+}
+
+initial_usdc_circulation = 40_000_000_000  # Starting circulation (e.g., early 2023)
 usdc_growth_factor_daily = (60/40)**(1/(365*1.5)) # Rough daily growth to reach 60B from 40B in 1.5 years
 
+# --- Lookup tables for the array engine ---
+# Everything the per-event branching used to decide from the event_type
+# string is resolved once per event type here, then applied as masks.
+event_type_weights = [0.2, 0.15, 0.15, 0.05, 0.03, 0.1, 0.1, 0.05, 0.07, 0.03, 0.03, 0.02, 0.02] # Biased towards common events
+transaction_status_weights = [0.90, 0.05, 0.04, 0.01]
+
+EVENT_API_PRODUCT = {'api_call_payments': 'Circle Payments API', 'api_call_accounts': 'Circle Accounts API'}
+is_api_event = np.array(['api_call' in e for e in event_types])
+is_signup_event = np.array(['product_signup' in e for e in event_types])
+is_feature_event = np.array(['product_feature_used' in e for e in event_types])
+is_transaction_event = np.array([
+    ('usdc_' in e or 'circle_account' in e or 'cross_chain' in e) and not (api or signup or feature)
+    for e, api, signup, feature in zip(event_types, is_api_event, is_signup_event, is_feature_event)
+])
+is_other_event = ~(is_api_event | is_signup_event | is_feature_event | is_transaction_event)
+is_mint_event = np.array([e == 'usdc_mint' for e in event_types])
+is_burn_event = np.array([e == 'usdc_burn' for e in event_types])
+is_value_transfer_event = is_transaction_event & ~is_mint_event & ~is_burn_event & np.array([
+    'transfer' in e or 'payment' in e or 'deposit' in e or 'withdrawal' in e for e in event_types
+])
+# Non-transaction usdc_ events would get a random blockchain (none exist today)
+needs_random_blockchain = np.array(['usdc_' in e for e in event_types]) & ~is_transaction_event
+signup_event_code = event_types.index('product_signup_business')
+
+# Object lookup tables end in None so that code -1 means "missing"
+product_table = np.array(products + [None], dtype=object)
+product_code = {name: code for code, name in enumerate(products)}
+signup_products = np.array([product_code[p] for p in products if p not in ['None', 'Circle Mint']])
+feature_products = np.array([product_code[p] for p in products if p != 'None'])
+# Fixed product per event type (-1 where it is drawn or left as 'None')
+event_fixed_product = np.array([
+    product_code[EVENT_API_PRODUCT[e]] if e in EVENT_API_PRODUCT
+    else product_code['Circle Mint'] if e in ('usdc_mint', 'usdc_burn')
+    else product_code['None']
+    for e in event_types
+])
+event_type_table = np.array(event_types, dtype=object)
+blockchain_table = np.array(blockchains + [None], dtype=object)
+status_table = np.array(transaction_statuses + [None], dtype=object)
+business_type_table = np.array(business_types, dtype=object)
+region_table = np.array(regions, dtype=object)
+channel_table = np.array(acquisition_channels + [None], dtype=object)
+
+# Uniform amount ranges: mint/burn by event type, value transfers by business type
+event_amount_range = np.array([
+    (50000, 5000000) if e == 'usdc_mint' else (10000, 2000000) if e == 'usdc_burn' else (0, 0)
+    for e in event_types
+], dtype=float)
+business_amount_range = np.array([
+    (10000, 10000000) if b in ['Institutional Investor', 'Crypto Exchange']
+    else (50, 5000) if b == 'E-commerce' # Smaller B2C or B2B payments
+    else (100, 100000)
+    for b in business_types
+], dtype=float)
+
+start_date64 = np.datetime64(start_date, 's')
+end_date64 = np.datetime64(end_date, 's')
+total_seconds = int((end_date - start_date).total_seconds())
+ONE_DAY = np.timedelta64(1, 'D').astype('timedelta64[s]')
+# usdc_growth_factor_daily ** day for every day an event can fall on
+growth_factor_by_day = usdc_growth_factor_daily ** np.arange((end_date - start_date).days + 1)
+
 # Generate User IDs (businesses or significant individual users)
-num_users = int(num_records / 50) # Average 50 events per user
-user_ids = [f"USER_{1000+i}" for i in range(num_users)]
-user_data = {}
-for user_id in user_ids:
-    user_data[user_id] = {
-        'join_date': start_date + timedelta(days=random.randint(0, (end_date - start_date).days // 2)),
-        'business_type': random.choice(business_types),
-        'region': random.choice(regions),
-        'acquisition_channel': random.choice(acquisition_channels)
+@lru_cache(maxsize=4)
+def build_user_table(num_users, seed=42):
+    """Build the user table as arrays; every shard rebuilds the same table from the seed."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    join_days = rng.integers(0, (end_date - start_date).days // 2 + 1, size=num_users)
+    return {
+        'user_id': np.char.add('USER_', (1000 + np.arange(num_users)).astype(str)).astype(object),
+        'join_date': start_date64 + join_days * ONE_DAY,
+        'business_type': rng.integers(0, len(business_types), size=num_users),
+        'region': rng.integers(0, len(regions), size=num_users),
+        'acquisition_channel': rng.integers(0, len(acquisition_channels), size=num_users),
     }
 
 
-for i in range(num_records):
-    event_timestamp = start_date + timedelta(seconds=random.randint(0, int((end_date - start_date).total_seconds())))
-    user_id = random.choice(user_ids)
-
-    # Ensure event is after user join date
-    if event_timestamp < user_data[user_id]['join_date']:
-        event_timestamp = user_data[user_id]['join_date'] + timedelta(days=random.randint(1, 90))
-        if event_timestamp > end_date: # cap at end_date
-            event_timestamp = end_date - timedelta(days=random.randint(1,5))
-
-
-    event_type = random.choices(
-        event_types,
-        weights=[0.2, 0.15, 0.15, 0.05, 0.03, 0.1, 0.1, 0.05, 0.07, 0.03, 0.03, 0.02, 0.02], # Biased towards common events
-        k=1
-    )[0]
-
-    product_name = 'None'
-    transaction_id = None
-    amount_usdc = None
-    currency = 'USDC'
-    blockchain = 'None'
-    status = 'Completed'
-
-    if 'api_call' in event_type:
-        product_name = event_type.split('_')[-1].capitalize() + " API"
-        if 'Payments' in product_name : product_name = 'Circle Payments API'
-        if 'Accounts' in product_name : product_name = 'Circle Accounts API'
-        amount_usdc = None # API calls might not have direct USDC amount
-    elif 'product_signup' in event_type:
-        product_name = random.choice([p for p in products if p not in ['None', 'Circle Mint']])
-        acquisition_channel_for_event = user_data[user_id]['acquisition_channel']
-    elif 'product_feature_used' in event_type:
-        product_name = random.choice([p for p in products if p != 'None'])
-    elif 'usdc_' in event_type or 'circle_account' in event_type or 'cross_chain' in event_type:
-        transaction_id = f"TXN_{random.randint(100000000, 999999999)}"
-        blockchain = random.choice(blockchains)
-        status = random.choices(transaction_statuses, weights=[0.90, 0.05, 0.04, 0.01], k=1)[0]
-
-        if event_type == 'usdc_mint':
-            amount_usdc = random.uniform(50000, 5000000) # Larger amounts for minting
-            current_usdc_circulation += amount_usdc
-            product_name = 'Circle Mint'
-        elif event_type == 'usdc_burn':
-            amount_usdc = random.uniform(10000, 2000000)
-            current_usdc_circulation -= amount_usdc
-            product_name = 'Circle Mint'
-        elif 'transfer' in event_type or 'payment' in event_type or 'deposit' in event_type or 'withdrawal' in event_type:
-            if user_data[user_id]['business_type'] in ['Institutional Investor', 'Crypto Exchange']:
-                amount_usdc = random.uniform(10000, 10000000)
-            elif user_data[user_id]['business_type'] == 'E-commerce':
-                 amount_usdc = random.uniform(50, 5000) # Smaller B2C or B2B payments
-            else:
-                amount_usdc = random.uniform(100, 100000)
-        if status == 'Failed' or status == 'Reversed':
-            pass # Amount still logged but transaction didn't effectively go through as intended
-    else: # Other event types
-        product_name = random.choice(products)
+# --- Time-ordered generation ---
+# Ordered mode never sorts: the number of events per day is fixed up front
+# for the whole run, and each day's timestamps are drawn (already sorted)
+# from that day's own seed, so any shard can produce its slice of the
+# global time order on its own.
+ORDERED_STREAM_KEY = 2**32 - 1  # spawn_key prefix, disjoint from the per-shard keys
+num_days = (end_date - start_date).days
+
+@lru_cache(maxsize=4)
+def daily_event_counts(total_records, seed=42, first_day=0):
+    """Events per day for a time-ordered run (uniform over days first_day.., summing to total_records)."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(ORDERED_STREAM_KEY,)))
+    counts = np.zeros(num_days, dtype=np.int64)
+    days = max(num_days - first_day, 1)
+    counts[num_days - days:] = rng.multinomial(total_records, np.full(days, 1 / days))
+    return counts
+
+
+def ordered_timestamps(start, stop, total_records, seed=42, first_day=0):
+    """Timestamps for rows start..stop-1 of the global time order, starting on day first_day."""
+    counts = daily_event_counts(total_records, seed, first_day)
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    # The day holding row start (days with no events are skipped)
+    day = int(np.searchsorted(bounds, start, side='right')) - 1
+    parts = []
+    while day < num_days and bounds[day] < stop:
+        day_rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(ORDERED_STREAM_KEY, day)))
+        seconds = np.sort(day_rng.integers(0, 86400, size=counts[day]))
+        lo = max(start, bounds[day]) - bounds[day]
+        hi = min(stop, bounds[day + 1]) - bounds[day]
+        parts.append(start_date64 + day * ONE_DAY + seconds[lo:hi].astype('timedelta64[s]'))
+        day += 1
+    return np.concatenate(parts) if parts else np.array([], dtype='datetime64[s]')
+
+
+@lru_cache(maxsize=4)
+def users_by_join_date(num_users, seed=42):
+    """User indices sorted by join date, with the sorted join dates."""
+    join_date = build_user_table(num_users, seed)['join_date']
+    order = np.argsort(join_date, kind='stable')
+    return order, join_date[order]
+
+
+@Instrumentation.traced('circle.generate_events')
+def generate_circle_events(start, stop, seed_sequence=None, seed=42, num_users=None,
+                           time_ordered=False, total_records=None):
+    """Generate events start..stop-1 (EventID EVT_{10000+i}).
+
+    Event types, timestamps, users and amounts are drawn as arrays and the
+    per-event-type and per-business-type rules are applied as masks.
+    Events draw from seed_sequence (default SeedSequence(seed)); the user
+    table is shared by all shards and built from seed. num_users defaults
+    to one user per 50 records of the module-level num_records.
+
+    With time_ordered=True the rows are slice start..stop-1 of a
+    total_records-event run that is already in timestamp order, and each
+    event goes to a user who had joined by then (instead of moving early
+    events past the join date).
+    """
+    if seed_sequence is None:
+        seed_sequence = np.random.SeedSequence(seed)
+    if num_users is None:
+        num_users = int(num_records / 50) # Average 50 events per user
+    rng = np.random.default_rng(seed_sequence)
+    users = build_user_table(num_users, seed)
+    size = stop - start
+
+    if time_ordered:
+        if total_records is None:
+            total_records = num_records
+        order, sorted_join_date = users_by_join_date(num_users, seed)
+        # Nobody has joined before the first join date, so the days start there
+        first_day = int((sorted_join_date[0] - start_date64) // ONE_DAY)
+        timestamps = ordered_timestamps(start, stop, total_records, seed, first_day)
+        joined = np.searchsorted(sorted_join_date, timestamps, side='right')
+        user = order[(rng.random(size) * joined).astype(np.int64)]
+        join_date = users['join_date'][user]
+    else:
+        timestamps = start_date64 + rng.integers(0, total_seconds + 1, size=size).astype('timedelta64[s]')
+        user = rng.integers(0, num_users, size=size)
+
+        # Ensure event is after user join date
+        join_date = users['join_date'][user]
+        early = np.flatnonzero(timestamps < join_date)
+        timestamps[early] = join_date[early] + rng.integers(1, 91, size=len(early)) * ONE_DAY
+        late = early[timestamps[early] > end_date64] # cap at end_date
+        timestamps[late] = end_date64 - rng.integers(1, 6, size=len(late)) * ONE_DAY
+
+    weights = np.array(event_type_weights)
+    event = rng.choice(len(event_types), size=size, p=weights / weights.sum())
+    transaction = is_transaction_event[event]
+    mint = is_mint_event[event]
+    burn = is_burn_event[event]
+
+    # Products: fixed per event type, or drawn for signups, feature usage and other events
+    product = event_fixed_product[event]
+    for mask, choices in ((is_signup_event[event], signup_products),
+                          (is_feature_event[event], feature_products),
+                          (is_other_event[event], np.arange(len(products)))):
+        product[mask] = choices[rng.integers(0, len(choices), size=int(mask.sum()))]
+
+    blockchain = np.full(size, -1)
+    blockchain_drawn = transaction | needs_random_blockchain[event]
+    blockchain[blockchain_drawn] = rng.integers(0, len(blockchains), size=int(blockchain_drawn.sum()))
 
+    status = np.full(size, -1)
+    status_weights = np.array(transaction_status_weights)
+    status[transaction] = rng.choice(len(transaction_statuses), size=int(transaction.sum()),
+                                     p=status_weights / status_weights.sum())
+    transaction_id = np.full(size, None, dtype=object)
+    transaction_id[transaction] = np.char.add(
+        'TXN_', rng.integers(100000000, 1000000000, size=int(transaction.sum())).astype(str))
+
+    # Amounts: mint/burn ranges by event type, value transfers by business type
+    value_transfer = is_value_transfer_event[event]
+    amount_range = event_amount_range[event]
+    amount_range[value_transfer] = business_amount_range[users['business_type'][user[value_transfer]]]
+    has_amount = mint | burn | value_transfer
+    base_amount = np.zeros(size)
+    low, high = amount_range[has_amount, 0], amount_range[has_amount, 1]
+    base_amount[has_amount] = low + (high - low) * rng.random(int(has_amount.sum()))
 
     # Simulate growth in USDC circulation reflected in overall activity (very simplified)
     # This is a conceptual scaling, not a precise reflection of total circulation in each transaction.
     # A better approach for circulation would be a separate timeseries, but this biases amounts upwards over time.
-    days_from_start = (event_timestamp - start_date).days
-    dynamic_scaling_factor = usdc_growth_factor_daily ** days_from_start
-    if amount_usdc:
-        amount_usdc *= (0.5 + random.random()) # Add some randomness to scaling
-        amount_usdc = round(amount_usdc * dynamic_scaling_factor, 2)
-
-
-    data.append({
-        'EventID': f"EVT_{10000+i}",
-        'Timestamp': event_timestamp,
-        'UserID': user_id,
-        'UserJoinDate': user_data[user_id]['join_date'],
-        'UserBusinessType': user_data[user_id]['business_type'],
-        'UserRegion': user_data[user_id]['region'],
-        'UserAcquisitionChannel': user_data[user_id]['acquisition_channel'] if event_type == 'product_signup_business' else None,
-        'EventType': event_type,
-        'ProductName': product_name,
-        'Blockchain': blockchain if blockchain != 'None' else (random.choice(blockchains) if 'usdc_' in event_type else None),
-        'TransactionID': transaction_id,
-        'AmountUSDC': amount_usdc if amount_usdc else 0.0, # Ensure numeric for aggregation
-        'Currency': currency if amount_usdc else None,
-        'TransactionStatus': status if transaction_id else None,
-        'CurrentEstimatedUSDCSupply': round(current_usdc_circulation * dynamic_scaling_factor,0) if 'mint' in event_type or 'burn' in event_type else None # Only log this for mint/burn events to show supply changes
-    })
+    days_from_start = (timestamps - start_date64) // ONE_DAY
+    dynamic_scaling_factor = growth_factor_by_day[days_from_start]
+    amount = np.zeros(size)
+    amount[has_amount] = np.round(
+        base_amount[has_amount] * (0.5 + rng.random(int(has_amount.sum()))) # Add some randomness to scaling
+        * dynamic_scaling_factor[has_amount], 2)
+
+    # Circulation as seen by this shard, logged only on mint/burn events
+    circulation = initial_usdc_circulation + np.cumsum(np.where(mint, base_amount, np.where(burn, -base_amount, 0.0)))
+    estimated_supply = np.where(mint | burn, np.round(circulation * dynamic_scaling_factor, 0), np.nan)
 
-df = pd.DataFrame(data)
+    channel = np.where(event == signup_event_code, users['acquisition_channel'][user], -1)
+    event_ids = np.char.add('EVT_', (10000 + np.arange(start, stop)).astype(str)).astype(object)
+
+    columns = {
+        'EventID': event_ids,
+        'Timestamp': timestamps,
+        'UserID': users['user_id'][user],
+        'UserJoinDate': join_date,
+        'UserBusinessType': business_type_table[users['business_type'][user]],
+        'UserRegion': region_table[users['region'][user]],
+        'UserAcquisitionChannel': channel_table[channel],
+        'EventType': event_type_table[event],
+        'ProductName': product_table[product],
+        'Blockchain': blockchain_table[blockchain],
+        'TransactionID': transaction_id,
+        'AmountUSDC': amount, # Ensure numeric for aggregation
+        'Currency': np.where(amount != 0, 'USDC', None),
+        'TransactionStatus': status_table[status],
+        'CurrentEstimatedUSDCSupply': estimated_supply # Only log this for mint/burn events to show supply changes
+    }
+    with Instrumentation.span('circle.dataframe', rows=size):
+        return pd.DataFrame(columns)
 
-# Sort by timestamp
-df = df.sort_values(by='Timestamp').reset_index(drop=True)
 
-# Refine CurrentEstimatedUSDCSupply to be a forward fill or based on actual mint/burn sum
-# For simplicity, let's calculate a running total of mints - burns for a 'NetIssuance'
-df['NetAmount'] = df.apply(lambda row: row['AmountUSDC'] if row['EventType'] == 'usdc_mint' and row['TransactionStatus'] == 'Completed'
-                           else (-row['AmountUSDC'] if row['EventType'] == 'usdc_burn' and row['TransactionStatus'] == 'Completed' else 0), axis=1)
+# --- USDC supply ledger ---
 initial_circulation_at_data_start = 40_000_000_000 # The actual circulation at the *start of the dataset's timeframe*
-df['RunningUSDCSupply'] = df['NetAmount'].cumsum() + initial_circulation_at_data_start
-df.drop(columns=['CurrentEstimatedUSDCSupply', 'NetAmount'], inplace=True)
-
-
-print("Sample of the generated dataset:")
-print(df.head())
-print(f"\nGenerated {len(df)} records.")
-print(f"\nDate range: {df['Timestamp'].min()} to {df['Timestamp'].max()}")
-print(f"\nEstimated USDC supply at end of period: {df['RunningUSDCSupply'].iloc[-1]:,}")
-
-# Potential KPIs you can derive for dashboards:
-# - Daily/Weekly/Monthly Active Users (DAU/WAU/MAU)
-# - Transaction Volume (sum of AmountUSDC) over time, by product, by region, by blockchain
-# - Transaction Count over time, by product, by region, by blockchain
-# - Average Transaction Value (ATV)
-# - USDC Mint vs. Burn volume over time
-# - Growth in RunningUSDCSupply
-# - Product Adoption Rate (e.g., count of UserID per ProductName)
-# - User Growth (new UserID by UserJoinDate)
-# - API Call frequency
-# - Failed Transaction Rate (count where TransactionStatus is 'Failed' / total transactions)
-
-# Save to CSV
-try:
-    df.to_csv('circle_business_operations_data.csv', index=False)
-    print("\nDataset saved to circle_business_operations_data.csv")
-except Exception as e:
-    print(f"\nError saving CSV: {e}")
\ No newline at end of file
+
+def usdc_supply_deltas(event_type, transaction_status, amount_usdc):
+    """Net issuance per event: +amount for completed mints, -amount for completed burns, else 0."""
+    event_type = np.asarray(event_type, dtype=object)
+    completed = np.asarray(transaction_status, dtype=object) == 'Completed'
+    amount_usdc = np.asarray(amount_usdc, dtype=float)
+    return np.where((event_type == 'usdc_mint') & completed, amount_usdc,
+                    np.where((event_type == 'usdc_burn') & completed, -amount_usdc, 0.0))
+
+
+def running_usdc_supply(deltas, starting_supply=initial_circulation_at_data_start):
+    """Running supply after each event, accumulated left to right from starting_supply.
+
+    Accumulating from the starting value (rather than adding it afterwards)
+    means a series extended with circle_events_tail is bit-for-bit the
+    same as one computed over the full history.
+    """
+    return np.cumsum(np.concatenate([[starting_supply], deltas]))[1:]
+
+
+def finalize_circle_dataset(df, presorted=False):
+    """Sort merged events by time and derive RunningUSDCSupply.
+
+    Pass presorted=True for time-ordered output to skip the sort.
+    """
+    # Sort by timestamp
+    if not presorted:
+        with Instrumentation.span('circle.sort', rows=len(df)):
+            df = df.sort_values(by='Timestamp', kind='stable').reset_index(drop=True)
+
+    # Refine CurrentEstimatedUSDCSupply to be a forward fill or based on actual mint/burn sum
+    # For simplicity, let's calculate a running total of mints - burns for a 'NetIssuance'
+    with Instrumentation.span('circle.running_supply', rows=len(df)):
+        deltas = usdc_supply_deltas(df['EventType'], df['TransactionStatus'], df['AmountUSDC'])
+        df['RunningUSDCSupply'] = running_usdc_supply(deltas)
+        df.drop(columns=['CurrentEstimatedUSDCSupply'], inplace=True)
+    return df
+
+
+def circle_events_tail(df, new_events):
+    """Ledger rows that change when a new batch of events joins a finalized dataset.
+
+    Returns (split, tail): rows df.iloc[:split] stay as they are, and tail
+    (indexed from split) replaces everything after them. Only the new
+    batch and any existing rows later than its earliest timestamp are
+    sorted, and RunningUSDCSupply continues from row split - 1, so for a
+    batch newer than the history split == len(df) and tail can be
+    appended to a file or list of chunks without touching the history.
+    """
+    new_events = new_events.drop(columns=['CurrentEstimatedUSDCSupply'], errors='ignore')
+    new_events = new_events.sort_values(by='Timestamp', kind='stable')
+    split = int(df['Timestamp'].searchsorted(new_events['Timestamp'].iloc[0], side='right')) \
+        if not new_events.empty else len(df)
+    tail = pd.concat([df.iloc[split:].drop(columns=['RunningUSDCSupply']), new_events])
+    tail = tail.sort_values(by='Timestamp', kind='stable')
+
+    starting_supply = df['RunningUSDCSupply'].iloc[split - 1] if split else initial_circulation_at_data_start
+    deltas = usdc_supply_deltas(tail['EventType'], tail['TransactionStatus'], tail['AmountUSDC'])
+    tail['RunningUSDCSupply'] = running_usdc_supply(deltas, starting_supply)
+    tail.index = pd.RangeIndex(split, split + len(tail))
+    return split, tail
+
+
+def append_circle_events(df, new_events):
+    """Extend a finalized dataset with a new batch of events without recomputing its history.
+
+    The supply is only re-accumulated for circle_events_tail's rows, but
+    the returned frame is a new concatenation, so this still copies the
+    whole history once per call. To extend a large dataset repeatedly,
+    write each circle_events_tail instead.
+    """
+    if new_events.empty:
+        return df
+    split, tail = circle_events_tail(df, new_events)
+    return pd.concat([df.iloc[:split], tail], ignore_index=True)
+
+
+def generate_circle_dataset(num_records=num_records, seed=42, workers=1,
+                            shard_size=Shard_Pool.DEFAULT_SHARD_SIZE, time_ordered=False):
+    """Generate num_records events across worker processes, sorted with running supply.
+
+    The result depends on seed, shard_size and time_ordered only, not on
+    workers. Time-ordered shards come back in order, so no global sort runs.
+    """
+    return Shard_Pool.run_sharded(generate_circle_events, num_records, seed=seed,
+                                  shard_size=shard_size, workers=workers,
+                                  finalize=partial(finalize_circle_dataset, presorted=time_ordered),
+                                  shard_kwargs={'seed': seed, 'num_users': int(num_records / 50),
+                                                'time_ordered': time_ordered,
+                                                'total_records': num_records})
+
+
+def iter_circle_event_chunks(num_records=num_records, chunk_size=1_000_000, seed=42):
+    """Yield a time-ordered dataset in chunks, carrying RunningUSDCSupply across them.
+
+    Chunks match generate_circle_dataset(time_ordered=True, shard_size=chunk_size).
+    """
+    supply = initial_circulation_at_data_start
+    for chunk_index, start in enumerate(range(0, num_records, chunk_size)):
+        stop = min(start + chunk_size, num_records)
+        chunk = generate_circle_events(
+            start, stop, seed_sequence=np.random.SeedSequence(seed, spawn_key=(chunk_index,)),
+            seed=seed, num_users=int(num_records / 50), time_ordered=True, total_records=num_records)
+        chunk.index = pd.RangeIndex(start, stop)
+        deltas = usdc_supply_deltas(chunk['EventType'], chunk['TransactionStatus'], chunk['AmountUSDC'])
+        chunk['RunningUSDCSupply'] = running_usdc_supply(deltas, supply)
+        chunk.drop(columns=['CurrentEstimatedUSDCSupply'], inplace=True)
+        if len(chunk):
+            supply = chunk['RunningUSDCSupply'].iloc[-1]
+        yield chunk
+
+
+def write_circle_dataset(path, num_records=num_records, chunk_size=1_000_000, seed=42, file_format=None,
+                         row_group_size=Dataset_Output.DEFAULT_ROW_GROUP_SIZE,
+                         compression=Dataset_Output.DEFAULT_COMPRESSION):
+    """Stream a time-ordered dataset to CSV, Parquet or Arrow without a global sort."""
+    return Dataset_Output.write_chunks(iter_circle_event_chunks(num_records, chunk_size, seed),
+                                       path, file_format, CATEGORICAL_COLUMNS, row_group_size, compression)
+
+
+# --- Incremental KPI engine ---
+# Time-ordered event batches are folded into per-day state once; every KPI
+# is then read back from that state in O(days) without rescanning events.
+# Distinct users per day are packed bitmaps over integer user codes (any
+# date range ORs its days' bitmaps). The DAU/WAU/MAU series come from one
+# difference array per window: a user active on day a whose previous
+# active day was p counts towards the windows ending in [a, a + width),
+# minus the part of that range still covered by p, so each (user, day)
+# pair costs O(1) however long the stream is. Volume, count and status
+# totals are per-day counter arrays; trailing windows are prefix-sum
+# differences.
+
+KPI_WINDOWS = {'DAU': 1, 'WAU': 7, 'MAU': 30}
+# Dimensions with volume/count counters (the trailing slot counts missing values)
+KPI_DIMENSIONS = {'ProductName': products, 'UserRegion': regions, 'Blockchain': blockchains}
+NO_DAY = np.iinfo(np.int64).min // 2
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.int64)
+_adoption_products = np.array([p != 'None' for p in products] + [False])
+
+def new_kpi_state(origin=start_date, windows=KPI_WINDOWS):
+    """Empty KPI state for events on or after origin; windows maps a name to a width in days."""
+    return {
+        'origin': np.datetime64(origin, 'D'),
+        'windows': dict(windows),
+        'days': 0, # days seen so far: the latest event's day + 1
+        'user_codes': {}, 'user_ids': [],
+        'last_active': np.empty(0, dtype=np.int64),
+        'product_users': np.zeros((0, len(products) + 1), dtype=bool),
+        'day_bitmaps': {},
+        'active_diff': {name: np.zeros(max(windows.values()) + 1, dtype=np.int64) for name in windows},
+        'counters': {
+            'events': np.zeros(0), 'new_users': np.zeros(0),
+            'status': np.zeros((0, len(transaction_statuses) + 1)),
+            'new_adopters': np.zeros((0, len(products) + 1)),
+            **{f'volume:{dimension}': np.zeros((0, len(values) + 1)) for dimension, values in KPI_DIMENSIONS.items()},
+            **{f'count:{dimension}': np.zeros((0, len(values) + 1)) for dimension, values in KPI_DIMENSIONS.items()},
+        },
+    }
+
+def _grow_days(state, days):
+    """Make room in the per-day arrays for day indexes below days (capacity doubles)."""
+    counters = state['counters']
+    capacity = len(counters['events'])
+    if days <= capacity:
+        return
+    grow = max(days, 2 * capacity, 64) - capacity
+    for name, values in counters.items():
+        counters[name] = np.concatenate([values, np.zeros((grow,) + values.shape[1:])])
+    for name, diff in state['active_diff'].items():
+        state['active_diff'][name] = np.concatenate([diff, np.zeros(grow, dtype=np.int64)])
+
+def _user_codes(state, values):
+    """Stable integer codes for UserIDs, growing the per-user state for new users."""
+    local_codes, uniques = pd.factorize(values)
+    codes = state['user_codes']
+    for value in uniques:
+        if value not in codes:
+            codes[value] = len(state['user_ids'])
+            state['user_ids'].append(value)
+    grow = len(state['user_ids']) - len(state['last_active'])
+    if grow:
+        state['last_active'] = np.concatenate([state['last_active'], np.full(grow, NO_DAY)])
+        state['product_users'] = np.concatenate([state['product_users'],
+                                                 np.zeros((grow, len(products) + 1), dtype=bool)])
+    mapping = np.array([codes[value] for value in uniques], dtype=np.int64)
+    return mapping[local_codes]
+
+def _category_codes(values, categories):
+    """Codes into categories, with missing or unknown values mapped to the trailing slot."""
+    codes = pd.Categorical(values, categories=categories).codes.astype(np.int64)
+    codes[codes < 0] = len(categories)
+    return codes
+
+def _add_daily(state, name, day, low, high, codes=None, weights=None):
+    """Add per-row weights (default 1) into counter name for the batch's days [low, high]."""
+    target = state['counters'][name]
+    width = target.shape[1] if target.ndim == 2 else 1
+    slot = (day - low) * width + (codes if codes is not None else 0)
+    totals = np.bincount(slot, weights=weights, minlength=(high - low + 1) * width)
+    target[low:high + 1] += totals.reshape(target[low:high + 1].shape)
+
+def _set_day_bits(state, users, days):
+    """Set each user's bit in the bitmap of each (user, day) pair's day."""
+    bitmaps = state['day_bitmaps']
+    for day in np.unique(days):
+        day_users = users[days == day]
+        bitmap = bitmaps.get(int(day), np.zeros(0, dtype=np.uint8))
+        size = int(day_users.max()) // 8 + 1
+        if len(bitmap) < size:
+            bitmap = np.concatenate([bitmap, np.zeros(size - len(bitmap), dtype=np.uint8)])
+        np.bitwise_or.at(bitmap, day_users >> 3, (128 >> (day_users & 7)).astype(np.uint8))
+        bitmaps[int(day)] = bitmap
+
+@Instrumentation.traced('circle.update_kpis')
+def update_kpis(state, events):
+    """Fold one batch of Circle events into the KPI state.
+
+    Batches must arrive in time order: a batch may not hold events from
+    before the latest day already seen (rows within a batch can be in any
+    order).
+    """
+    if not len(events):
+        return state
+    day = (events['Timestamp'].to_numpy().astype('datetime64[D]') - state['origin']).astype(np.int64)
+    low, high = int(day.min()), int(day.max())
+    if low < 0:
+        raise ValueError(f"events before the KPI origin {state['origin']}")
+    if low < state['days'] - 1:
+        raise ValueError("event batches must be in time order")
+    _grow_days(state, high + max(state['windows'].values()) + 1)
+    state['days'] = max(state['days'], high + 1)
+    user = _user_codes(state, events['UserID'].to_numpy())
+    _add_daily(state, 'events', day, low, high)
+
+    # Distinct (user, day) pairs that are new to the state, sorted by user then day
+    pairs = np.unique(user * (high + 1) + day)
+    pair_user, pair_day = pairs // (high + 1), pairs % (high + 1)
+    fresh = pair_day != state['last_active'][pair_user]
+    pair_user, pair_day = pair_user[fresh], pair_day[fresh]
+    first_of_user = np.concatenate([[True], pair_user[1:] != pair_user[:-1]])
+    previous = np.where(first_of_user, state['last_active'][pair_user], np.roll(pair_day, 1))
+    new_user = previous == NO_DAY
+    _add_daily(state, 'new_users', pair_day[new_user], low, high)
+    for name, width in state['windows'].items():
+        diff = state['active_diff'][name]
+        np.add.at(diff, pair_day, 1)
+        np.add.at(diff, pair_day + width, -1)
+        covered = previous + width > pair_day
+        np.add.at(diff, pair_day[covered], -1)
+        np.add.at(diff, previous[covered] + width, 1)
+    state['last_active'][pair_user] = pair_day
+    _set_day_bits(state, pair_user, pair_day)
+
+    # Product adoption: the first event of each user with each product
+    product = _category_codes(events['ProductName'].to_numpy(), products)
+    adopting = _adoption_products[product] & ~state['product_users'][user, product]
+    if adopting.any():
+        keys, first = np.unique(user[adopting] * (len(products) + 1) + product[adopting], return_index=True)
+        first_day = day[adopting][first]
+        adopted_user, adopted_product = keys // (len(products) + 1), keys % (len(products) + 1)
+        state['product_users'][adopted_user, adopted_product] = True
+        _add_daily(state, 'new_adopters', first_day, low, high, adopted_product)
+
+    # Transactions are the rows with a TransactionStatus
+    status = _category_codes(events['TransactionStatus'].to_numpy(), transaction_statuses)
+    transaction = status < len(transaction_statuses)
+    transaction_day = day[transaction]
+    _add_daily(state, 'status', transaction_day, low, high, status[transaction])
+    amount = events['AmountUSDC'].to_numpy(dtype=np.float64)[transaction]
+    for dimension, values in KPI_DIMENSIONS.items():
+        codes = _category_codes(events[dimension].to_numpy(), values)[transaction]
+        _add_daily(state, f'count:{dimension}', transaction_day, low, high, codes)
+        _add_daily(state, f'volume:{dimension}', transaction_day, low, high, codes, amount)
+    return state
+
+def kpi_dates(state):
+    """Calendar date of each day index seen so far."""
+    return pd.DatetimeIndex(state['origin'] + np.arange(state['days']), name='Date')
+
+def trailing_sum(values, window):
+    """Sum over each day's trailing window of days (inclusive), along the first axis."""
+    totals = np.cumsum(values, axis=0)
+    totals[window:] = totals[window:] - totals[:-window].copy()
+    return totals
+
+def active_user_series(state):
+    """Distinct active users per day for each configured window (DAU, WAU, MAU)."""
+    return pd.DataFrame({name: np.cumsum(diff)[:state['days']] for name, diff in state['active_diff'].items()},
+                        index=kpi_dates(state))
+
+def active_users_between(state, first, last):
+    """Distinct users active on any day in [first, last], from the per-day bitmaps."""
+    first_day = (np.datetime64(first, 'D') - state['origin']).astype(np.int64)
+    last_day = (np.datetime64(last, 'D') - state['origin']).astype(np.int64)
+    bitmaps = [state['day_bitmaps'][day] for day in range(max(first_day, 0), last_day + 1)
+               if day in state['day_bitmaps']]
+    if not bitmaps:
+        return 0
+    union = np.zeros(max(len(bitmap) for bitmap in bitmaps), dtype=np.uint8)
+    for bitmap in bitmaps:
+        union[:len(bitmap)] |= bitmap
+    return int(_POPCOUNT[union].sum())
+
+def daily_kpis(state, window=1):
+    """Headline KPIs per day; counts and volumes are summed over the trailing window of days."""
+    days = state['days']
+    counters = {name: values[:days] for name, values in state['counters'].items()}
+    status = trailing_sum(counters['status'], window)
+    transactions = status[:, :len(transaction_statuses)].sum(axis=1)
+    failed = status[:, transaction_statuses.index('Failed')]
+    volume = trailing_sum(counters['volume:ProductName'], window).sum(axis=1)
+    kpis = active_user_series(state)
+    kpis['events'] = trailing_sum(counters['events'], window).astype(np.int64)
+    kpis['new_users'] = trailing_sum(counters['new_users'], window).astype(np.int64)
+    kpis['transactions'] = transactions.astype(np.int64)
+    kpis['failed_transactions'] = failed.astype(np.int64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kpis['failed_rate'] = np.where(transactions > 0, failed / transactions, np.nan)
+        kpis['volume_usdc'] = volume.round(2)
+        kpis['avg_transaction_value'] = np.where(transactions > 0, volume / transactions, np.nan).round(2)
+    return kpis
+
+def volume_by(state, dimension='ProductName', window=1, measure='volume'):
+    """Daily transaction volume (or count, measure='count') per value of a dimension, over trailing windows."""
+    values = list(KPI_DIMENSIONS[dimension]) + ['(missing)']
+    totals = trailing_sum(state['counters'][f'{measure}:{dimension}'][:state['days']], window)
+    frame = pd.DataFrame(totals, index=kpi_dates(state), columns=values)
+    if measure == 'count':
+        frame = frame.astype(np.int64)
+    return frame.loc[:, frame.any(axis=0)]
+
+def product_adoption(state, daily=False):
+    """Users who have used each product, and their share of all users seen.
+
+    daily=True returns the cumulative adopter count per product by day.
+    """
+    adopters = np.cumsum(state['counters']['new_adopters'][:state['days'], :len(products)], axis=0)
+    adopted = _adoption_products[:len(products)]
+    if daily:
+        return pd.DataFrame(adopters[:, adopted].astype(np.int64), index=kpi_dates(state),
+                            columns=np.array(products)[adopted])
+    total = adopters[-1] if len(adopters) else np.zeros(len(products))
+    users = max(len(state['user_ids']), 1)
+    return pd.DataFrame({'ProductName': np.array(products)[adopted],
+                         'adopters': total[adopted].astype(np.int64),
+                         'adoption_rate': (total[adopted] / users).round(4)}
+                        ).sort_values('adopters', ascending=False, ignore_index=True)
+
+def circle_kpis(chunks, origin=start_date, windows=KPI_WINDOWS):
+    """Run a time-ordered chunk stream through a fresh KPI state."""
+    state = new_kpi_state(origin, windows)
+    for chunk in chunks:
+        update_kpis(state, chunk)
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the Circle business operations dataset.")
+    parser.add_argument('--num-records', type=int, default=num_records)
+    parser.add_argument('--workers', type=int, default=1, help="worker processes for sharded generation")
+    parser.add_argument('--time-ordered', action='store_true', help="generate events already in time order")
+    parser.add_argument('--stream', metavar='PATH',
+                        help="stream time-ordered chunks to PATH (.csv, .parquet, .arrow or .feather) and exit")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--kpis', nargs='?', const='', metavar='PATH',
+                        help="report DAU/WAU/MAU, volume, failure and adoption KPIs for a time-ordered "
+                             "dataset file (or freshly streamed events) and exit")
+    Dataset_Output.add_output_arguments(parser)
+    Instrumentation.add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    Instrumentation.start_from_args(args)
+
+    if args.kpis is not None:
+        if args.kpis:
+            chunks = Dataset_Output.read_chunks(args.kpis, args.chunk_size, parse_dates=['Timestamp'])
+        else:
+            chunks = iter_circle_event_chunks(args.num_records, chunk_size=args.chunk_size)
+        state = circle_kpis(chunks)
+        print("Daily KPIs (last 7 days):")
+        print(daily_kpis(state).tail(7).to_markdown())
+        print("\nTransaction volume by product, trailing 30 days:")
+        print(volume_by(state, 'ProductName', window=30).tail(1).T.to_markdown())
+        print("\nProduct adoption:")
+        print(product_adoption(state).to_markdown(index=False))
+        Instrumentation.finish_from_args(args)
+        raise SystemExit
+
+    if args.stream:
+        rows = write_circle_dataset(args.stream, args.num_records, chunk_size=args.chunk_size,
+                                    row_group_size=args.row_group_size, compression=args.compression)
+        print(f"Streamed {rows} time-ordered records to {args.stream}")
+        Instrumentation.finish_from_args(args)
+        raise SystemExit
+
+    df = generate_circle_dataset(args.num_records, workers=args.workers, time_ordered=args.time_ordered)
+
+    print("Sample of the generated dataset:")
+    print(df.head())
+    print(f"\nGenerated {len(df)} records.")
+    print(f"\nDate range: {df['Timestamp'].min()} to {df['Timestamp'].max()}")
+    print(f"\nEstimated USDC supply at end of period: {df['RunningUSDCSupply'].iloc[-1]:,}")
+
+    # Potential KPIs you can derive for dashboards:
+    # - Daily/Weekly/Monthly Active Users (DAU/WAU/MAU)
+    # - Transaction Volume (sum of AmountUSDC) over time, by product, by region, by blockchain
+    # - Transaction Count over time, by product, by region, by blockchain
+    # - Average Transaction Value (ATV)
+    # - USDC Mint vs. Burn volume over time
+    # - Growth in RunningUSDCSupply
+    # - Product Adoption Rate (e.g., count of UserID per ProductName)
+    # - User Growth (new UserID by UserJoinDate)
+    # - API Call frequency
+    # - Failed Transaction Rate (count where TransactionStatus is 'Failed' / total transactions)
+
+    # Save to CSV (or the --format chosen)
+    output_filename = Dataset_Output.output_path('circle_business_operations_data', args.format)
+    try:
+        Dataset_Output.write_frame(df, output_filename, categorical_columns=CATEGORICAL_COLUMNS,
+                                   row_group_size=args.row_group_size, compression=args.compression)
+        print(f"\nDataset saved to {output_filename}")
+    except Exception as e:
+        print(f"\nError saving {args.format}: {e}")
+
+    Instrumentation.finish_from_args(args)
\ No newline at end of file
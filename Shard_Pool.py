@@ -0,0 +1,116 @@
+import importlib.util
+import inspect
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import Instrumentation
+
+# Shared process-pool sharding for the dataset generators.
+#
+# A run of num_records rows is cut into fixed-size shards. Shard k always
+# covers the same row range and draws from child k of SeedSequence(seed),
+# so the merged dataset is identical whether it is built by 1 or 32
+# workers. Only the shard size changes the output.
+
+DEFAULT_SHARD_SIZE = 250_000
+
+def load_script(path):
+    """Import a script by file path and cache it in sys.modules.
+
+    Works for scripts whose file names are not valid module names, such as
+    "Senior Data Analyst - Circle.py". Top-level code runs, but the
+    script's __main__ block does not.
+    """
+    path = os.path.abspath(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = 'script_' + re.sub(r'\W', '_', stem)
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+def plan_shards(num_records, shard_size=DEFAULT_SHARD_SIZE):
+    """Split num_records rows into (start, stop) ranges of at most shard_size rows."""
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least 1")
+    return [(start, min(start + shard_size, num_records)) for start in range(0, num_records, shard_size)]
+
+def shard_seed_sequences(seed, num_shards):
+    """Independent SeedSequence children, one per shard."""
+    return np.random.SeedSequence(seed).spawn(num_shards)
+
+def _run_shard(script_path, func_name, start, stop, seed_sequence, kwargs):
+    """Worker entry point: resolve the shard function by file and call it."""
+    func = getattr(load_script(script_path), func_name)
+    return func(start, stop, seed_sequence=seed_sequence, **kwargs)
+
+def call_script(script_path, func_name, *args):
+    """Worker entry point for other process-pool work: call a script's function by file path."""
+    return getattr(load_script(script_path), func_name)(*args)
+
+def concat_frames(frames):
+    """Default merge: concatenate shard DataFrames in order with a fresh index."""
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+
+def run_sharded(generate_shard, num_records, seed=42, shard_size=DEFAULT_SHARD_SIZE,
+                workers=None, finalize=None, shard_kwargs=None, merge=concat_frames):
+    """Generate num_records rows across a process pool and merge them in shard order.
+
+    generate_shard(start, stop, seed_sequence=..., **shard_kwargs) must be a
+    module-level function returning a DataFrame for rows [start, stop). It
+    is looked up by file path in each worker, so it may live in a script
+    run as __main__. merge combines the list of shard results in shard
+    order (shards may return partial aggregates instead of frames when a
+    matching merge is given). finalize, if given, is applied to the merged
+    result in the parent process (e.g. a global sort).
+
+    workers=1 runs every shard in-process; workers=None uses os.cpu_count().
+    """
+    kwargs = shard_kwargs or {}
+    shards = plan_shards(num_records, shard_size)
+    seed_sequences = shard_seed_sequences(seed, len(shards))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(shards)))
+
+    with Instrumentation.span('shards.generate', shards=len(shards), workers=workers):
+        if workers == 1:
+            frames = [
+                generate_shard(start, stop, seed_sequence=seed_sequence, **kwargs)
+                for (start, stop), seed_sequence in zip(shards, seed_sequences)
+            ]
+        else:
+            # unwrap: an instrumented function's own code lives in Instrumentation.py
+            script_path = inspect.getsourcefile(inspect.unwrap(generate_shard))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                frames = list(executor.map(
+                    _run_shard,
+                    [script_path] * len(shards),
+                    [generate_shard.__name__] * len(shards),
+                    [start for start, _ in shards],
+                    [stop for _, stop in shards],
+                    seed_sequences,
+                    [kwargs] * len(shards),
+                ))
+
+    if not frames:
+        frames = [generate_shard(0, 0, seed_sequence=np.random.SeedSequence(seed), **kwargs)]
+    with Instrumentation.span('shards.merge', shards=len(frames)):
+        merged = merge(frames)
+    if finalize is None:
+        return merged
+    with Instrumentation.span('shards.finalize'):
+        return finalize(merged)
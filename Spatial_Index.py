@@ -0,0 +1,229 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import Dataset_Output
+
+# Uniform-grid spatial index over telematics points.
+#
+# Points are bucketed into cell_degrees x cell_degrees cells and stored in
+# cell order, with an offsets array giving each cell's slice. Cells are
+# numbered row by row, so the cells a bounding box covers in one grid row
+# form a single contiguous slice: a query reads one slice per grid row and
+# then applies the exact test (box, radius, polygon, time window) to those
+# candidates only.
+
+DEFAULT_CELL_DEGREES = 0.01
+MAX_CELLS = 4_000_000
+EARTH_RADIUS_MILES = 3958.8
+INDEX_COLUMNS = ['timestamp', 'vehicle_id', 'latitude', 'longitude']
+
+def load_telemetry(path, columns=INDEX_COLUMNS):
+    """Read the columns an index needs from a telematics CSV, Parquet or Arrow/Feather file."""
+    file_format = Dataset_Output.infer_format(path)
+    if file_format == 'csv':
+        return pd.read_csv(path, usecols=columns, parse_dates=['timestamp'], dtype={'vehicle_id': 'category'})
+    if file_format == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
+
+def grid_cells(values, origin, cell_degrees):
+    """Grid cell along one axis for each value.
+
+    Indexing and queries both go through this one formula: it is monotonic
+    in value, so a point inside [low, high] always falls in a cell between
+    those of low and high, even where rounding puts a value exactly on a
+    cell edge into the neighbouring cell.
+    """
+    return np.floor((np.asarray(values, dtype=np.float64) - origin) / cell_degrees).astype(np.int64)
+
+def build_grid_index(df, cell_degrees=DEFAULT_CELL_DEGREES):
+    """Grid index over the latitude/longitude (plus timestamp and vehicle) of df's rows.
+
+    Query results are positional row numbers into df. cell_degrees is
+    widened if the data's extent would need more than MAX_CELLS cells.
+    """
+    latitude = df['latitude'].to_numpy(dtype=np.float64)
+    longitude = df['longitude'].to_numpy(dtype=np.float64)
+    lat_min, lon_min = (latitude.min(), longitude.min()) if len(df) else (0.0, 0.0)
+    lat_span, lon_span = (latitude.max() - lat_min, longitude.max() - lon_min) if len(df) else (0.0, 0.0)
+    while (lat_span // cell_degrees + 1) * (lon_span // cell_degrees + 1) > MAX_CELLS:
+        cell_degrees *= 2
+    cell_y = grid_cells(latitude, lat_min, cell_degrees)
+    cell_x = grid_cells(longitude, lon_min, cell_degrees)
+    shape = (int(cell_y.max()) + 1, int(cell_x.max()) + 1) if len(df) else (1, 1)
+    cell = cell_y * shape[1] + cell_x
+    order = np.argsort(cell, kind='stable')
+    vehicles = pd.Categorical(df['vehicle_id'])
+    return {
+        'origin': (lat_min, lon_min),
+        'cell_degrees': cell_degrees,
+        'shape': shape,
+        'offsets': np.concatenate([[0], np.cumsum(np.bincount(cell, minlength=shape[0] * shape[1]))]),
+        'rows': order,
+        'latitude': latitude[order],
+        'longitude': longitude[order],
+        'timestamp': df['timestamp'].to_numpy().astype('datetime64[s]')[order],
+        'vehicle_codes': vehicles.codes[order],
+        'vehicles': vehicles.categories,
+    }
+
+def _cell_range(index, axis, low, high):
+    """Inclusive grid cells covering [low, high] on one axis, clipped to the grid (None if outside)."""
+    first, last = grid_cells([low, high], index['origin'][axis], index['cell_degrees']).tolist()
+    first, last = max(first, 0), min(last, index['shape'][axis] - 1)
+    return (first, last) if first <= last else None
+
+def _candidates(index, lat_min, lat_max, lon_min, lon_max):
+    """Positions (in cell order) of every point in the cells a bounding box touches."""
+    rows, columns = _cell_range(index, 0, lat_min, lat_max), _cell_range(index, 1, lon_min, lon_max)
+    if rows is None or columns is None:
+        return np.empty(0, dtype=np.int64)
+    width = index['shape'][1]
+    offsets = index['offsets']
+    slices = [np.arange(offsets[y * width + columns[0]], offsets[y * width + columns[1] + 1])
+              for y in range(rows[0], rows[1] + 1)]
+    return np.concatenate(slices)
+
+def _in_window(index, positions, start, end):
+    """Keep candidates whose timestamp is within [start, end] (either bound optional)."""
+    timestamps = index['timestamp'][positions]
+    keep = np.ones(len(positions), dtype=bool)
+    if start is not None:
+        keep &= timestamps >= np.datetime64(pd.Timestamp(start), 's')
+    if end is not None:
+        keep &= timestamps <= np.datetime64(pd.Timestamp(end), 's')
+    return positions[keep]
+
+def _bbox_positions(index, lat_min, lat_max, lon_min, lon_max, start=None, end=None):
+    positions = _candidates(index, lat_min, lat_max, lon_min, lon_max)
+    lat, lon = index['latitude'][positions], index['longitude'][positions]
+    positions = positions[(lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)]
+    return _in_window(index, positions, start, end)
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance in miles (vectorized)."""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
+
+def _radius_positions(index, latitude, longitude, radius_miles, start=None, end=None):
+    lat_pad = np.degrees(radius_miles / EARTH_RADIUS_MILES)
+    lon_pad = lat_pad / max(np.cos(np.radians(min(abs(latitude) + lat_pad, 89.9))), 1e-9)
+    positions = _bbox_positions(index, latitude - lat_pad, latitude + lat_pad,
+                                longitude - lon_pad, longitude + lon_pad, start, end)
+    distance = haversine_miles(latitude, longitude, index['latitude'][positions], index['longitude'][positions])
+    return positions[distance <= radius_miles]
+
+def points_in_polygon(latitude, longitude, polygon):
+    """Even-odd ray casting for arrays of points; polygon is a sequence of (lat, lon) vertices."""
+    vertices = np.asarray(polygon, dtype=np.float64)
+    inside = np.zeros(len(latitude), dtype=bool)
+    for (lat1, lon1), (lat2, lon2) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        crosses = (lat1 > latitude) != (lat2 > latitude)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            edge_lon = lon1 + (latitude - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        inside ^= crosses & (longitude < edge_lon)
+    return inside
+
+def _polygon_positions(index, polygon, start=None, end=None):
+    vertices = np.asarray(polygon, dtype=np.float64)
+    positions = _bbox_positions(index, vertices[:, 0].min(), vertices[:, 0].max(),
+                                vertices[:, 1].min(), vertices[:, 1].max(), start, end)
+    inside = points_in_polygon(index['latitude'][positions], index['longitude'][positions], vertices)
+    return positions[inside]
+
+def query_bbox(index, lat_min, lat_max, lon_min, lon_max, start=None, end=None):
+    """Rows inside a latitude/longitude box, optionally within the [start, end] time window."""
+    return np.sort(index['rows'][_bbox_positions(index, lat_min, lat_max, lon_min, lon_max, start, end)])
+
+def query_radius(index, latitude, longitude, radius_miles, start=None, end=None):
+    """Rows within radius_miles of a point, optionally within the [start, end] time window."""
+    return np.sort(index['rows'][_radius_positions(index, latitude, longitude, radius_miles, start, end)])
+
+def query_polygon(index, polygon, start=None, end=None):
+    """Rows inside a geofence polygon of (lat, lon) vertices, optionally within [start, end]."""
+    return np.sort(index['rows'][_polygon_positions(index, polygon, start, end)])
+
+def vehicles_in_zone(index, polygon, start=None, end=None):
+    """Vehicles seen inside a geofence during [start, end], with first/last sighting and sample count."""
+    positions = _polygon_positions(index, polygon, start, end)
+    sightings = pd.DataFrame({
+        'vehicle_id': pd.Categorical.from_codes(index['vehicle_codes'][positions], index['vehicles']),
+        'timestamp': index['timestamp'][positions],
+    })
+    zone = sightings.groupby('vehicle_id', observed=True)['timestamp'].agg(['min', 'max', 'size'])
+    zone.columns = ['first_seen', 'last_seen', 'samples']
+    return zone.reset_index().sort_values('first_seen', ignore_index=True)
+
+def verify_index(df, index, queries=1000, seed=0):
+    """Compare point, box and radius queries against a brute-force scan of df.
+
+    Every point is looked up with a zero-size box at its own position, and
+    `queries` random boxes and circles over the data's extent are checked
+    too. Returns the number of mismatching queries per kind.
+    """
+    latitude = df['latitude'].to_numpy(dtype=np.float64)
+    longitude = df['longitude'].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    mismatches = {'point': 0, 'bbox': 0, 'radius': 0}
+    for row in range(len(df)):
+        if row not in query_bbox(index, latitude[row], latitude[row], longitude[row], longitude[row]):
+            mismatches['point'] += 1
+    for _ in range(queries):
+        lat_low, lat_high = np.sort(rng.uniform(latitude.min(), latitude.max(), size=2))
+        lon_low, lon_high = np.sort(rng.uniform(longitude.min(), longitude.max(), size=2))
+        inside = (latitude >= lat_low) & (latitude <= lat_high) & (longitude >= lon_low) & (longitude <= lon_high)
+        if not np.array_equal(query_bbox(index, lat_low, lat_high, lon_low, lon_high), np.flatnonzero(inside)):
+            mismatches['bbox'] += 1
+        center = rng.integers(0, len(df))
+        miles = rng.uniform(0.1, 20)
+        near = haversine_miles(latitude[center], longitude[center], latitude, longitude) <= miles
+        if not np.array_equal(query_radius(index, latitude[center], longitude[center], miles), np.flatnonzero(near)):
+            mismatches['radius'] += 1
+    return mismatches
+
+def bbox_polygon(lat_min, lat_max, lon_min, lon_max):
+    """A bounding box as a polygon, for zone queries over a rectangle."""
+    return [(lat_min, lon_min), (lat_min, lon_max), (lat_max, lon_max), (lat_max, lon_min)]
+
+def parse_polygon(text):
+    """Parse 'lat,lon;lat,lon;...' into a vertex list."""
+    return [tuple(float(value) for value in vertex.split(',')) for vertex in text.split(';') if vertex.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spatial queries over fleet telematics output.")
+    parser.add_argument('path', help="fleet_telematics_data / fleet_trip_telemetry CSV, Parquet or Arrow file")
+    parser.add_argument('--cell-degrees', type=float, default=DEFAULT_CELL_DEGREES)
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument('--verify', type=int, metavar='QUERIES',
+                       help="check every point and QUERIES random boxes and circles against a full scan")
+    query.add_argument('--bbox', type=float, nargs=4, metavar=('LAT_MIN', 'LAT_MAX', 'LON_MIN', 'LON_MAX'))
+    query.add_argument('--radius', type=float, nargs=3, metavar=('LAT', 'LON', 'MILES'))
+    query.add_argument('--polygon', help="geofence as 'lat,lon;lat,lon;...'")
+    parser.add_argument('--start', help="start of the time window (e.g. 2025-05-01T06:00)")
+    parser.add_argument('--end', help="end of the time window")
+    args = parser.parse_args()
+
+    data = load_telemetry(args.path)
+    index = build_grid_index(data, args.cell_degrees)
+    if args.verify is not None:
+        mismatches = verify_index(data, index, args.verify)
+        print(f"Mismatching queries against a full scan: {mismatches}")
+        raise SystemExit(1 if any(mismatches.values()) else 0)
+    if args.bbox:
+        zone = bbox_polygon(*args.bbox)
+        rows = query_bbox(index, *args.bbox, start=args.start, end=args.end)
+    elif args.radius:
+        zone = None
+        rows = query_radius(index, *args.radius, start=args.start, end=args.end)
+    else:
+        zone = parse_polygon(args.polygon)
+        rows = query_polygon(index, zone, start=args.start, end=args.end)
+
+    print(f"{len(rows):,} of {len(data):,} points match")
+    if zone is not None:
+        print(vehicles_in_zone(index, zone, args.start, args.end).to_markdown(index=False))
+    else:
+        print(data.iloc[rows].head(20).to_markdown(index=False))